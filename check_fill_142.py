@@ -1,44 +1,28 @@
-import psycopg2
+from qbank import db
+from qbank.inspector import inspect_questions
 
 try:
-    conn = psycopg2.connect(
-        host="dpg-d63imsvpm1nc73bmh530-a.singapore-postgres.render.com",
-        database="mauriitus_game",
-        user="mauriitus_game_user",
-        password="7mNtoGVnBZiQqiNdxc990ZWsY0Dbw1xt",
-        port=5432,
-        sslmode="require"
-    )
-    cursor = conn.cursor()
-    
+    conn = db.get_connection()
+
+    # Question 142 with its details and stored answers, in one query
+    questions = inspect_questions(conn, ids=[142])
+    db.release(conn)
+
     # Check question 142 - the Denis de Nyon fill-in-the-blank
     print("🔍 CHECKING QUESTION 142 (Denis de Nyon FILL)...")
-    cursor.execute("""
-        SELECT id, question_text, question_type_id
-        FROM questions
-        WHERE id = 142
-    """)
-    
-    result = cursor.fetchone()
-    if result:
-        q_id, q_text, q_type = result
-        print(f"ID: {q_id}")
-        print(f"Type ID: {q_type}")
-        print(f"Text: {q_text}")
-        
-        # Get the stored answer
-        cursor.execute("""
-            SELECT answer_text FROM fill_answers
-            WHERE question_id = %s
-        """, (q_id,))
-        
-        answer_result = cursor.fetchone()
-        if answer_result:
-            stored_answer = answer_result[0]
+    if questions:
+        question = questions[0]
+        print(f"ID: {question['id']}")
+        print(f"Type: {question['type']}")
+        print(f"Text: {question['question_text']}")
+
+        # The stored answer
+        if question['fill_answers']:
+            stored_answer = question['fill_answers'][0]['text']
             print(f"\n✅ STORED ANSWER: '{stored_answer}'")
             print(f"   Answer length: {len(stored_answer)} characters")
             print(f"   Hex representation: {stored_answer.encode('utf-8').hex()}")
-            
+
             # Check if it matches what user should enter
             print(f"\n🧪 TESTING VALIDATION:")
             test_answers = ["1722", "1722 ", " 1722", " 1722 "]
@@ -47,29 +31,18 @@ try:
                 status = "✅ MATCH" if match else "❌ NO MATCH"
                 print(f"   '{test_ans}' -> {status}")
         else:
-            print(f"\n❌ NO ANSWER STORED FOR QUESTION {q_id}!")
+            print(f"\n❌ NO ANSWER STORED FOR QUESTION {question['id']}!")
             print("   This is the problem - no correct answer is configured!")
-    
+
+        # Also check the instruction field
+        print("\n\n🔍 CHECKING QUESTION DETAILS...")
+        print(f"ID: {question['id']}")
+        print(f"Question: {question['question_text']}")
+        print(f"Instruction: {question['instruction']}")
+        print(f"Timer: {question['timer_seconds']}")
+
     else:
         print("❌ Question 142 not found!")
-    
-    # Also check the instruction field
-    print("\n\n🔍 CHECKING QUESTION DETAILS...")
-    cursor.execute("""
-        SELECT id, question_text, instruction, timer_seconds
-        FROM questions
-        WHERE id = 142
-    """)
-    
-    result = cursor.fetchone()
-    if result:
-        print(f"ID: {result[0]}")
-        print(f"Question: {result[1]}")
-        print(f"Instruction: {result[2]}")
-        print(f"Timer: {result[3]}")
-    
-    cursor.close()
-    conn.close()
 
 except Exception as e:
     print(f"❌ Error: {e}")
@@ -1,87 +1,49 @@
-import psycopg2
+from qbank import db
+from qbank.inspector import inspect_questions
 
 try:
-    conn = psycopg2.connect(
-        host="dpg-d63imsvpm1nc73bmh530-a.singapore-postgres.render.com",
-        database="mauriitus_game",
-        user="mauriitus_game_user",
-        password="7mNtoGVnBZiQqiNdxc990ZWsY0Dbw1xt",
-        port=5432,
-        sslmode="require"
-    )
-    cursor = conn.cursor()
-    
-    # Check question 107 - the Denis de Nyon MCQ
+    conn = db.get_connection()
+
+    # Check question 107 - the Denis de Nyon MCQ (question + options in one query)
     print("🔍 CHECKING QUESTION 107 (Denis de Nyon MCQ)...")
-    cursor.execute("""
-        SELECT id, question_text, question_type_id
-        FROM questions
-        WHERE id = 107
-    """)
-    
-    result = cursor.fetchone()
-    if result:
-        print(f"ID: {result[0]}")
-        print(f"Text: {result[1]}")
-        print(f"Type ID: {result[2]}")
-        
-        # Get MCQ options
-        cursor.execute("""
-            SELECT option_order, option_text, is_correct
-            FROM mcq_options
-            WHERE question_id = 107
-            ORDER BY option_order
-        """)
-        
+    questions = inspect_questions(conn, ids=[107])
+    if questions:
+        question = questions[0]
+        print(f"ID: {question['id']}")
+        print(f"Text: {question['question_text']}")
+        print(f"Type: {question['type']}")
+
         print("\n📋 MCQ OPTIONS:")
-        options = cursor.fetchall()
-        for opt in options:
-            order, text, is_correct = opt
-            status = "✓ CORRECT" if is_correct else "✗"
-            print(f"  {chr(65+order)}: {text:60} {status}")
-        
+        options = question['mcq_options']
+        for rank, option in enumerate(options):
+            status = "✓ CORRECT" if option['correct'] else "✗"
+            print(f"  {chr(65 + rank)}: {str(option['text']):60} {status}")
+
         # Check if there's a correct answer marked
-        correct_count = sum(1 for opt in options if opt[2])
+        correct_count = sum(1 for option in options if option['correct'])
         print(f"\n⚠️ CORRECT ANSWERS MARKED: {correct_count}")
         if correct_count == 0:
             print("❌ NO CORRECT ANSWER MARKED FOR THIS MCQ!")
             print("   Students will always get this wrong!")
-    
+
     # Now let's search for the fill-in-the-blank about Denis de Nyon
     print("\n\n🔍 SEARCHING FOR FILL-TYPE QUESTION ABOUT DENIS DE NYON...")
-    cursor.execute("""
-        SELECT q.id, q.question_text, q.question_type_id, qt.name
-        FROM questions q
-        JOIN question_types qt ON q.question_type_id = qt.id
-        WHERE q.question_text ILIKE '%Denis de Nyon%' OR q.question_text ILIKE '%1722%'
-        ORDER BY q.id
-    """)
-    
-    all_matches = cursor.fetchall()
+    all_matches = inspect_questions(conn, search=['Denis de Nyon', '1722'])
     print(f"Found {len(all_matches)} questions matching 'Denis de Nyon' or '1722':\n")
-    
-    for q_id, q_text, q_type_id, q_type_name in all_matches:
-        print(f"ID: {q_id} | Type: {q_type_name}")
-        print(f"Text: {q_text[:80]}")
+
+    for match in all_matches:
+        print(f"ID: {match['id']} | Type: {match['type']}")
+        print(f"Text: {match['question_text'][:80]}")
         print()
-    
-    # Check if there's a fill-type question 
+
+    # Check if there's a fill-type question
     print("\n🔍 CHECKING ALL FILL-TYPE QUESTIONS...")
-    cursor.execute("""
-        SELECT q.id, q.question_text
-        FROM questions q
-        JOIN question_types qt ON q.question_type_id = qt.id
-        WHERE qt.name = 'fill'
-        LIMIT 10
-    """)
-    
-    fill_questions = cursor.fetchall()
+    fill_questions = inspect_questions(conn, qtype='fill', limit=10)
     print(f"First 10 fill-type questions:")
-    for q_id, q_text in fill_questions:
-        print(f"  ID {q_id}: {q_text[:70]}")
-    
-    cursor.close()
-    conn.close()
+    for question in fill_questions:
+        print(f"  ID {question['id']}: {question['question_text'][:70]}")
+
+    db.release(conn)
 
 except Exception as e:
     print(f"❌ Error: {e}")
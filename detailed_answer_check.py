@@ -1,34 +1,21 @@
-import psycopg2
+from qbank import db
+from qbank.inspector import inspect_questions
 
 try:
-    conn = psycopg2.connect(
-        host="dpg-d63imsvpm1nc73bmh530-a.singapore-postgres.render.com",
-        database="mauriitus_game",
-        user="mauriitus_game_user",
-        password="7mNtoGVnBZiQqiNdxc990ZWsY0Dbw1xt",
-        port=5432,
-        sslmode="require"
-    )
-    cursor = conn.cursor()
-    
+    conn = db.get_connection()
+
     # Get the answer with detailed analysis
-    cursor.execute("""
-        SELECT answer_text, LENGTH(answer_text) as length, 
-               OCTET_LENGTH(answer_text) as byte_length,
-               encode(answer_text::bytea, 'hex') as hex_encoding
-        FROM fill_answers
-        WHERE question_id = 142
-    """)
-    
-    result = cursor.fetchone()
-    if result:
-        answer, length, byte_length, hex_code = result
+    questions = inspect_questions(conn, ids=[142])
+    answers = questions[0]['fill_answers'] if questions else []
+
+    if answers:
+        answer = answers[0]['text']
         print("FILL-IN-THE-BLANK ANSWER ANALYSIS (Question 142)")
         print("="*50)
         print(f"Answer stored: '{answer}'")
-        print(f"Character length: {length}")
-        print(f"Byte length: {byte_length}")
-        print(f"Hex encoding: {hex_code}")
+        print(f"Character length: {len(answer)}")
+        print(f"Byte length: {len(answer.encode('utf-8'))}")
+        print(f"Hex encoding: {answer.encode('utf-8').hex()}")
         print()
         
         # Check for common issues
@@ -66,8 +53,7 @@ try:
         print(f"Answer in DB:   '{answer}'")
         print(f"Validation:     {is_correct}")
     
-    cursor.close()
-    conn.close()
+    db.release(conn)
 
 except Exception as e:
     print(f"Error: {e}")
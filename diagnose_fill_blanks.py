@@ -1,18 +1,8 @@
-import psycopg2
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from qbank import db
 
 try:
-    # Connect to database
-    conn = psycopg2.connect(
-        host=os.getenv('POSTGRES_HOST'),
-        database=os.getenv('POSTGRES_DB'),
-        user=os.getenv('POSTGRES_USER'),
-        password=os.getenv('POSTGRES_PASSWORD'),
-        port=os.getenv('POSTGRES_PORT', 5432)
-    )
+    # Connect to database (POSTGRES_* variables are picked up by the resolver)
+    conn = db.get_connection()
     cursor = conn.cursor()
     
     # Check fill-in-blanks question structure
@@ -70,7 +60,7 @@ try:
         print("❌ Question not found")
     
     cursor.close()
-    conn.close()
+    db.release(conn)
 
 except Exception as e:
     print(f"❌ Error: {e}")
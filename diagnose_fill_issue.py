@@ -1,15 +1,8 @@
-import psycopg2
+from qbank import db
 
 try:
     # Connect to Render database using env credentials
-    conn = psycopg2.connect(
-        host="dpg-d63imsvpm1nc73bmh530-a.singapore-postgres.render.com",
-        database="mauriitus_game",
-        user="mauriitus_game_user",
-        password="7mNtoGVnBZiQqiNdxc990ZWsY0Dbw1xt",
-        port=5432,
-        sslmode="require"
-    )
+    conn = db.get_connection()
     cursor = conn.cursor()
     
     # Find Denis de Nyon question
@@ -94,7 +87,7 @@ try:
             print(f"  ID {row[0]}: {row[2]} - {row[1][:60]}")
     
     cursor.close()
-    conn.close()
+    db.release(conn)
 
 except Exception as e:
     print(f"❌ Error: {e}")
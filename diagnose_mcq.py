@@ -2,52 +2,21 @@
 """
 Diagnostic script to check current MCQ status in database
 """
-import psycopg2
-from urllib.parse import urlparse
-import os
+from qbank import db
+from qbank.integrity import audit
 
-database_url = os.getenv('DATABASE_URL', '')
-if not database_url:
-    try:
-        with open('.env.local', 'r') as f:
-            for line in f:
-                if line.startswith('DATABASE_URL='):
-                    database_url = line.split('=', 1)[1].strip().strip('"')
-                    break
-    except:
-        pass
-
-result = urlparse(database_url)
-conn = psycopg2.connect(
-    host=result.hostname,
-    user=result.username,
-    password=result.password,
-    port=result.port or 5432,
-    database=result.path.lstrip('/').split('?')[0]
-)
+conn = db.connect_or_exit()
 cursor = conn.cursor()
 
-# Count MCQ questions
-cursor.execute("""
-    SELECT COUNT(*) as count
-    FROM questions q
-    LEFT JOIN question_types qt ON q.question_type_id = qt.id
-    WHERE qt.name = 'mcq'
-""")
-total_mcq = cursor.fetchone()[0]
+# Count MCQ questions and flag anomalies in one query
+report = audit(conn)
+total_mcq = report.totals.get('mcq', 0)
 
 print(f"Total MCQ questions in database: {total_mcq}")
 
-# Check how many have correct answers set
-cursor.execute("""
-    SELECT COUNT(DISTINCT q.id) as count
-    FROM questions q
-    LEFT JOIN question_types qt ON q.question_type_id = qt.id
-    LEFT JOIN mcq_options mo ON q.id = mo.question_id
-    WHERE qt.name = 'mcq' AND mo.is_correct = TRUE
-""")
-with_correct = cursor.fetchone()[0]
+with_correct = total_mcq - len(report.by_kind('zero_correct'))
 print(f"Questions with is_correct = TRUE for at least one option: {with_correct}")
+print(f"Questions with more than one correct option: {len(report.by_kind('multiple_correct'))}")
 
 # Sample some questions and their options
 print("\n" + "="*100)
@@ -76,4 +45,4 @@ for q_id, question, opt_order, opt_text, is_correct in cursor.fetchall():
     print(f"  [{status}] {label}: {str(opt_text)[:60] if opt_text else 'EMPTY'}")
 
 cursor.close()  
-conn.close()
+db.release(conn)
@@ -1,27 +1,7 @@
 #!/usr/bin/env python3
-import psycopg2
-from urllib.parse import urlparse
-import os
+from qbank import db
 
-database_url = os.getenv('DATABASE_URL', '')
-if not database_url:
-    try:
-        with open('.env.local', 'r') as f:
-            for line in f:
-                if line.startswith('DATABASE_URL='):
-                    database_url = line.split('=', 1)[1].strip().strip('"')
-                    break
-    except:
-        pass
-
-result = urlparse(database_url)
-conn = psycopg2.connect(
-    host=result.hostname,
-    user=result.username,
-    password=result.password,
-    port=result.port or 5432,
-    database=result.path.lstrip('/')
-)
+conn = db.connect_or_exit()
 cursor = conn.cursor()
 
 # Get mcq_options table
@@ -42,6 +22,6 @@ for row in cursor.fetchall():
     print(f"  {row}")
 
 cursor.close()
-conn.close()
+db.release(conn)
 
 
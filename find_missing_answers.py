@@ -6,6 +6,8 @@ Check Excel source for questions ID 46 and ID 74 to find correct answers
 from openpyxl import load_workbook
 import os
 
+from qbank.normalize import normalize_text
+
 excel_file = r"C:\Users\Abdallah Peerally\Downloads\Questions_PSAC_History and Geography_2018.xlsx"
 
 if not os.path.exists(excel_file):
@@ -71,23 +73,17 @@ else:
             print(f"📌 {qtype.upper()} Question:")
             print(f"   Correct Answer: {correct}")
             # Try to match which option
-            if correct.lower() in str(optA).lower():
-                print(f"   Matches: Option A")
-            elif correct.lower() in str(optB).lower():
-                print(f"   Matches: Option B")
-            elif correct.lower() in str(optC).lower():
-                print(f"   Matches: Option C")
-            elif correct.lower() in str(optD).lower():
-                print(f"   Matches: Option D")
+            correct_norm = normalize_text(correct)
+            raw = dict(zip('ABCD', (optA, optB, optC, optD)))
+            options = {label: normalize_text(text) for label, text in raw.items()}
+            for label, text in options.items():
+                if correct_norm in text:
+                    print(f"   Matches: Option {label}")
+                    break
             # Try reverse - check if option is in correct answer
-            if optA and optA.lower() in correct.lower():
-                print(f"   Option A found: {optA}")
-            if optB and optB.lower() in correct.lower():
-                print(f"   Option B found: {optB}")
-            if optC and optC.lower() in correct.lower():
-                print(f"   Option C found: {optC}")
-            if optD and optD.lower() in correct.lower():
-                print(f"   Option D found: {optD}")
+            for label, text in options.items():
+                if text and text in correct_norm:
+                    print(f"   Option {label} found: {raw[label]}")
             print()
 
 wb.close()
@@ -3,63 +3,44 @@
 CORRECTED: Fix ID 74 - Mark the RIGHT option as correct
 """
 
-import psycopg2
-from urllib.parse import urlparse
-import os
+from qbank import db
+from qbank.fixspec import FixSpec, apply_fix_spec
+from qbank.inspector import inspect_questions
+from qbank.journal import run_id
 
-DATABASE_URL = os.getenv('DATABASE_URL', '')
-if not DATABASE_URL:
-    try:
-        with open('.env.local', 'r') as f:
-            for line in f:
-                if line.startswith('DATABASE_URL='):
-                    DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-                    break
-    except:
-        pass
+FIXES = {'mcq': {74: 2}}  # option C (order=2)
 
-result = urlparse(DATABASE_URL)
-conn_params = {
-    'host': result.hostname,
-    'port': result.port or 5432,
-    'database': result.path.lstrip('/').split('?')[0],
-    'user': result.username,
-    'password': result.password,
-    'sslmode': 'require'
-}
 
-conn = psycopg2.connect(**conn_params)
-cursor = conn.cursor()
+def show_options(conn):
+    for question in inspect_questions(conn, ids=[74]):
+        for rank, option in enumerate(question['mcq_options']):
+            mark = "✓" if option['correct'] else " "
+            print(f"  [{mark}] {chr(65 + rank)} (order={option['order']}): {option['text']}")
+
+
+conn = db.connect_or_exit()
 
 print("🔧 CORRECTING ID 74 FIX\n")
 
-# Show current state
 print("Current ID 74 options:")
-cursor.execute("SELECT option_order, option_text, is_correct FROM mcq_options WHERE question_id=74 ORDER BY option_order")
-for order, text, is_correct in cursor.fetchall():
-    label = chr(65 + order)
-    mark = "✓" if is_correct else " "
-    print(f"  [{mark}] {label} (order={order}): {text}")
+show_options(conn)
 
 print("\nProblem: Option B is marked correct, but it's the wrong answer!")
 print("Solution: Mark option C as correct instead\n")
 
-# FIX: Clear all, then mark option C (order=2) as correct
-cursor.execute("UPDATE mcq_options SET is_correct=false WHERE question_id=74")  
-cursor.execute("UPDATE mcq_options SET is_correct=true WHERE question_id=74 AND option_order=2")
-conn.commit()
-
-print("✅ Corrected! Now option C is marked as correct\n")
+# One batched transaction; the pre-image is saved so the fix can be undone
+results, journal_path = apply_fix_spec(conn, FixSpec(FIXES), command='fix_id74_correct.py')
+if results['mcq'].rejected:
+    print(f"❌ No option with order 2 for ID 74: {results['mcq'].rejected}")
+else:
+    print("✅ Corrected! Now option C is marked as correct")
+    if journal_path:
+        print(f"   (undo with: python -m qbank revert {run_id(journal_path)})")
+    print()
 
-# Verify
 print("Verification - ID 74 after correction:")
-cursor.execute("SELECT option_order, option_text, is_correct FROM mcq_options WHERE question_id=74 ORDER BY option_order")
-for order, text, is_correct in cursor.fetchall():
-    label = chr(65 + order)
-    mark = "✓" if is_correct else " "
-    print(f"  [{mark}] {label} (order={order}): {text}")
+show_options(conn)
 
-cursor.close()
-conn.close()
+db.release(conn)
 
 print("\n✅ ID 74 is now correctly fixed!")
@@ -3,44 +3,13 @@
 Fix ID 74: Correct the text variation from "temperatures" to "temperature"
 """
 
-import psycopg2
-from urllib.parse import urlparse
-import os
+from qbank import db
+from qbank.journal import journaled, run_id
+from qbank.writer import touch_questions
 
-# Get database URL
-DATABASE_URL = os.getenv('DATABASE_URL', '')
-if not DATABASE_URL:
-    try:
-        with open('.env.local', 'r') as f:
-            for line in f:
-                if line.startswith('DATABASE_URL='):
-                    DATABASE_URL = line.split('=', 1)[1].strip().strip('"')
-                    break
-    except:
-        pass
-
-if not DATABASE_URL:
-    print("❌ DATABASE_URL not found")
-    exit(1)
-
-# Parse connection string
-result = urlparse(DATABASE_URL)
-conn_params = {
-    'host': result.hostname,
-    'port': result.port or 5432,
-    'database': result.path.lstrip('/').split('?')[0],
-    'user': result.username,
-    'password': result.password,
-    'sslmode': 'require'
-}
-
-try:
-    conn = psycopg2.connect(**conn_params)
-    cursor = conn.cursor()
-    print("✅ Connected to database")
-except Exception as e:
-    print(f"❌ Connection failed: {e}")
-    exit(1)
+conn = db.connect_or_exit()
+cursor = conn.cursor()
+print("✅ Connected to database")
 
 # Find question ID 74
 cursor.execute("""
@@ -51,7 +20,7 @@ question = cursor.fetchone()
 if not question:
     print("❌ Question ID 74 not found")
     cursor.close()
-    conn.close()
+    db.release(conn)
     exit(1)
 
 print(f"\n📋 Question ID 74:")
@@ -87,15 +56,18 @@ if result:
     print(f"   Old: {old_text}")
     print(f"   New: {new_text}")
     
-    # Update
-    cursor.execute("""
-        UPDATE mcq_options 
-        SET option_text = %s 
-        WHERE id = %s
-    """, (new_text, opt_id))
-    
-    conn.commit()
+    # Update (journaled, so "python -m qbank revert" can undo it)
+    with journaled(conn, 'fix_id74_temperature.py') as (write_cursor, journal):
+        journal.capture(write_cursor, 'mcq_options', [74])
+        write_cursor.execute("""
+            UPDATE mcq_options 
+            SET option_text = %s 
+            WHERE id = %s
+        """, (new_text, opt_id))
+        touch_questions(write_cursor, [74])
+
     print(f"\n✅ Fixed! Updated option text from 'temperatures' to 'temperature'")
+    print(f"   (undo with: python -m qbank revert {run_id(journal.path)})")
     
     # Verify
     cursor.execute("""
@@ -114,5 +86,5 @@ else:
     print(f"\n⚠️  No option with 'temperatures' found in ID 74")
 
 cursor.close()
-conn.close()
+db.release(conn)
 print("\n✅ Database fix complete!")
@@ -0,0 +1,6 @@
+"""
+Question bank tooling for the History of Mauritius game.
+
+Shared building blocks for the diagnostic and fix scripts that live at the
+repository root. Run the command line tools with ``python -m qbank``.
+"""
@@ -0,0 +1,58 @@
+"""
+Command line entry point: python -m qbank <command> [options]
+"""
+import argparse
+import os
+import sys
+
+from qbank import (
+    canonical, contenthash, db, dedupe, diagnostics, export, fingerprint, fixspec, fuzzy, importer, inspector, plan, restore,
+    snapdiff, sync, textscan, undo,
+)
+
+COMMANDS = (
+    diagnostics,
+    plan,
+    inspector,
+    fixspec,
+    undo,
+    export,
+    restore,
+    snapdiff,
+    fingerprint,
+    sync,
+    contenthash,
+    importer,
+    fuzzy,
+    dedupe,
+    canonical,
+    textscan,
+)
+
+
+def main(argv=None):
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    parser = argparse.ArgumentParser(prog='python -m qbank', description='Question bank tooling')
+    parser.add_argument('--snapshot', metavar='DIR',
+                        help='run offline against a db_backup_* snapshot directory instead of the database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for module in COMMANDS:
+        module.register(subparsers)
+
+    args = parser.parse_args(argv)
+    if args.snapshot or os.getenv(db.SNAPSHOT_ENV):
+        writes = getattr(args, 'writes', False)
+        if callable(writes):
+            writes = writes(args)
+        if writes:
+            print(f"❌ '{args.command}' writes to the database; it cannot run against an offline snapshot")
+            return 2
+        if args.snapshot:
+            os.environ[db.SNAPSHOT_ENV] = args.snapshot
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
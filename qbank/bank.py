@@ -0,0 +1,121 @@
+"""
+In-memory snapshot of the question bank.
+
+load_bank() pulls the questions (with subject, level and type names) and the
+answer tables in one query per table, so checks can work against plain Python
+objects instead of issuing a query per question.
+"""
+from collections import namedtuple
+
+McqOption = namedtuple('McqOption', 'id question_id option_order option_text is_correct')
+MatchingPair = namedtuple('MatchingPair', 'id question_id pair_order left_item right_item')
+FillAnswer = namedtuple('FillAnswer', 'id question_id answer_text case_sensitive')
+ReorderItem = namedtuple('ReorderItem', 'id question_id item_order item_text correct_position')
+TrueFalseAnswer = namedtuple('TrueFalseAnswer', 'id question_id correct_answer explanation')
+
+# question_types.name -> (table, row type, ORDER BY column)
+CHILD_TABLES = {
+    'mcq': ('mcq_options', McqOption, 'option_order'),
+    'matching': ('matching_pairs', MatchingPair, 'pair_order'),
+    'fill': ('fill_answers', FillAnswer, 'id'),
+    'reorder': ('reorder_items', ReorderItem, 'item_order'),
+    'truefalse': ('truefalse_answers', TrueFalseAnswer, 'id'),
+}
+
+QUESTIONS_SQL = """
+    SELECT q.id, s.name, l.level_number, qt.name, q.question_text,
+           q.instruction, q.timer_seconds, q.updated_at
+    FROM questions q
+    LEFT JOIN subjects s ON q.subject_id = s.id
+    LEFT JOIN levels l ON q.level_id = l.id
+    LEFT JOIN question_types qt ON q.question_type_id = qt.id
+    {where}
+    ORDER BY q.id
+"""
+
+
+class Question:
+    __slots__ = ('id', 'subject', 'level', 'qtype', 'text', 'instruction',
+                 'timer_seconds', 'updated_at', 'children')
+
+    def __init__(self, id, subject, level, qtype, text, instruction, timer_seconds, updated_at):
+        self.id = id
+        self.subject = subject
+        self.level = level
+        self.qtype = qtype
+        self.text = text
+        self.instruction = instruction
+        self.timer_seconds = timer_seconds
+        self.updated_at = updated_at
+        self.children = []
+
+    def __repr__(self):
+        return f"<Question {self.id} {self.qtype} {self.subject} L{self.level}: {str(self.text)[:40]!r}>"
+
+
+class QuestionBank:
+    def __init__(self, questions):
+        self.questions = questions  # id -> Question
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __iter__(self):
+        return iter(self.questions.values())
+
+    def get(self, question_id):
+        return self.questions.get(question_id)
+
+    def by_type(self, qtype):
+        return [q for q in self.questions.values() if q.qtype == qtype]
+
+
+def load_bank(conn, ids=None, updated_since=None, qtypes=None):
+    """
+    Load questions plus their answer rows: 1 + len(CHILD_TABLES) queries.
+
+    With `ids` and/or `updated_since` only those questions (and only their
+    answer rows) are fetched, so partial loads cost O(selected questions).
+    `qtypes` limits the load to some question types and skips the answer
+    tables of the others.
+    """
+    clauses, params = [], []
+    if qtypes is not None:
+        clauses.append("qt.name = ANY(%s)")
+        params.append(list(qtypes))
+    if ids is not None:
+        clauses.append("q.id = ANY(%s)")
+        params.append(list(ids))
+    if updated_since is not None:
+        clauses.append("q.updated_at > %s")
+        params.append(updated_since)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    with conn.cursor() as cursor:
+        cursor.execute(QUESTIONS_SQL.format(where=where), params or None)
+        questions = {row[0]: Question(*row) for row in cursor.fetchall()}
+
+        child_where, child_params = "", []
+        if ids is not None or updated_since is not None:
+            # answer tables are per type, so a qtypes filter alone needs no WHERE here
+            if not questions:
+                return QuestionBank(questions)
+            child_where, child_params = "WHERE question_id = ANY(%s)", [list(questions)]
+
+        for qtype, (table, row_type, order_by) in CHILD_TABLES.items():
+            if qtypes is not None and qtype not in qtypes:
+                continue
+            cursor.execute(
+                f"SELECT {', '.join(row_type._fields)} FROM {table} {child_where} "
+                f"ORDER BY question_id, {order_by}",
+                child_params or None,
+            )
+            for row in cursor.fetchall():
+                child = row_type(*row)
+                question = questions.get(child.question_id)
+                # rows filed under a question of another type are integrity
+                # findings (orphan_child), not answers the comparators understand
+                if question is not None and question.qtype == qtype:
+                    question.children.append(child)
+
+    return QuestionBank(questions)
@@ -0,0 +1,251 @@
+"""
+Canonical subject and level rows: merge lookup rows that differ only in case or spacing.
+
+    python -m qbank canonicalize --dry-run   # show the variant rows and what points at them
+    python -m qbank canonicalize             # remap the references, then remove the variants
+
+subjects holds case variants of the same subject ("history" and
+"History"), so /api/questions (s.name = $1) and /api/admin/questions
+(LOWER(s.name) = LOWER($1), which cannot use subjects_name_key) can
+disagree about which questions a subject has. Rows are grouped on
+normalize_text() of the name (levels on level_number), and one row per
+group is kept:
+
+  - the row already spelled in its stored form (lowercase, whitespace
+    collapsed), else the one most referenced, else the lowest id,
+  - every foreign key pointing at a variant (questions.subject_id,
+    leaderboard.subject_id, ... read from pg_constraint) is remapped with
+    one UPDATE ... FROM a COPY-staged variant -> canonical map,
+  - the variants are deleted, and the kept row renamed to its stored form
+    if it was not already. Accents are kept: "Géographie" becomes
+    "géographie", not the accent-folded matching key.
+
+A subject with a single row is renamed to its stored form too.
+
+Each lookup table is done in one journaled transaction, and the remap
+always runs before the delete: questions.subject_id is ON DELETE CASCADE.
+"revert" restores the lookup rows and the questions that pointed at a
+variant; the other referencing tables (leaderboard, ...) are not journaled
+and keep pointing at the canonical row.
+
+Afterwards every subject name is lowercase, so a plain
+`s.name = lower($1)` finds it through the unique index. The routes
+keep LOWER(s.name) = LOWER($1) until canonicalize has run against the
+production database: switching them first would stop matching the
+capitalized rows that are still there.
+"""
+import psycopg2
+
+from qbank import db
+from qbank.journal import journaled, run_id
+from qbank.normalize import normalize_text
+
+# lookup table -> (columns read, group key of a row, name column kept normalized)
+LOOKUPS = {
+    'subjects': (('id', 'name'), lambda row: normalize_text(row[1]), 'name'),
+    'levels': (('id', 'level_number', 'name'), lambda row: row[1], None),
+}
+
+# single-column foreign keys pointing at a table
+REFERENCES_SQL = """
+    SELECT c.conrelid::regclass::text, a.attname
+    FROM pg_constraint c
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = c.conkey[1]
+    WHERE c.contype = 'f' AND c.confrelid = %s::regclass AND cardinality(c.conkey) = 1
+    ORDER BY 1, 2
+"""
+
+CANONICAL_STAGE_SQL = """
+    CREATE TEMP TABLE canonical_stage (
+        variant_id BIGINT PRIMARY KEY,
+        canonical_id BIGINT NOT NULL
+    ) ON COMMIT DROP
+"""
+
+
+class VariantGroup:
+    __slots__ = ('key', 'canonical', 'variants', 'rename')
+
+    def __init__(self, key, canonical, variants, rename):
+        self.key = key
+        self.canonical = canonical   # (id, ...) row kept
+        self.variants = variants     # [(id, ...) rows merged into it]
+        self.rename = rename         # new name of the kept row, or None
+
+
+class Canonicalization:
+    __slots__ = ('table', 'groups', 'references', 'remapped', 'renamed', 'journal_path')
+
+    def __init__(self, table):
+        self.table = table
+        self.groups = []
+        self.references = {}   # (table, column) -> {lookup id: rows pointing at it}
+        self.remapped = {}     # (table, column) -> rows updated
+        self.renamed = []      # (id, old name, new name)
+        self.journal_path = None
+
+    @property
+    def variant_ids(self):
+        return [row[0] for group in self.groups for row in group.variants]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def references(cursor, table):
+    """Every (table, column) holding a single-column foreign key to `table`."""
+    cursor.execute(REFERENCES_SQL, (f'public.{table}',))
+    return cursor.fetchall()
+
+
+def _count_references(cursor, refs, ids):
+    counts = {}
+    for ref_table, column in refs:
+        cursor.execute(
+            f"SELECT {_quote(column)}, count(*) FROM {ref_table} "
+            f"WHERE {_quote(column)} = ANY(%s::bigint[]) GROUP BY 1",
+            (ids,),
+        )
+        counts[(ref_table, column)] = dict(cursor.fetchall())
+    return counts
+
+
+def stored_name(name):
+    """The spelling a kept row is renamed to: lowercase, whitespace collapsed, accents kept."""
+    return ' '.join(str(name).split()).lower()
+
+
+def find_variants(cursor, table):
+    """
+    Group the rows of a lookup table. Returns a Canonicalization with the
+    groups of 2+ rows, plus the single rows whose name is not yet in its
+    stored_name() form (a group with no variants, only a rename).
+    """
+    columns, key, name_column = LOOKUPS[table]
+    result = Canonicalization(table)
+    name_at = columns.index(name_column) if name_column else None
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+    groups = {}
+    for row in cursor.fetchall():
+        groups.setdefault(key(row), []).append(row)
+    groups = {
+        k: rows for k, rows in groups.items()
+        if len(rows) > 1 or (name_at is not None and rows[0][name_at] != stored_name(rows[0][name_at]))
+    }
+    if not groups:
+        return result
+
+    refs = references(cursor, table)
+    ids = sorted(row[0] for rows in groups.values() for row in rows)
+    result.references = _count_references(cursor, refs, ids)
+
+    def used(row):
+        return sum(counts.get(row[0], 0) for counts in result.references.values())
+
+    for group_key, rows in groups.items():
+        if name_at is None:
+            canonical = max(rows, key=lambda row: (used(row), -row[0]))
+            rename = None
+        else:
+            canonical = max(rows, key=lambda row: (row[name_at] == stored_name(row[name_at]), used(row), -row[0]))
+            rename = stored_name(canonical[name_at])
+            if rename == canonical[name_at]:
+                rename = None
+        variants = [row for row in rows if row is not canonical]
+        result.groups.append(VariantGroup(group_key, canonical, variants, rename))
+    result.groups.sort(key=lambda group: group.canonical[0])
+    return result
+
+
+def canonicalize_table(conn, table, dry_run=False):
+    """
+    Remap every reference to the variants of `table`, then delete them, in one journaled transaction.
+
+    The journal holds the group's lookup rows and the questions rows that
+    pointed at a variant, so "revert" re-creates the variants and points
+    those questions back at them. Other referencing tables (leaderboard,
+    ...) are deliberately not journaled: they can run to millions of rows,
+    and the remap only moves them to an equivalent row.
+    """
+    with journaled(conn, f'canonicalize {table}', dry_run=dry_run) as (cursor, journal):
+        result = find_variants(cursor, table)
+        if result.groups:
+            journal.capture(cursor, table, [group.canonical[0] for group in result.groups] + result.variant_ids)
+            for ref_table, column in result.references:
+                if ref_table == 'questions':
+                    cursor.execute(
+                        f"SELECT id FROM questions WHERE {_quote(column)} = ANY(%s::bigint[])", (result.variant_ids,),
+                    )
+                    journal.capture(cursor, 'questions', [row[0] for row in cursor.fetchall()])
+            cursor.execute(CANONICAL_STAGE_SQL)
+            db.copy_rows(
+                cursor, 'canonical_stage', ('variant_id', 'canonical_id'),
+                ((row[0], group.canonical[0]) for group in result.groups for row in group.variants),
+            )
+            for ref_table, column in result.references:
+                cursor.execute(
+                    f"UPDATE {ref_table} t SET {_quote(column)} = s.canonical_id "
+                    f"FROM canonical_stage s WHERE t.{_quote(column)} = s.variant_id"
+                )
+                result.remapped[(ref_table, column)] = cursor.rowcount
+            cursor.execute(f"DELETE FROM {table} WHERE id = ANY(%s::bigint[])", (result.variant_ids,))
+            name_column = LOOKUPS[table][2]
+            for group in result.groups:
+                if group.rename is not None:
+                    cursor.execute(
+                        f"UPDATE {table} SET {name_column} = %s WHERE id = %s",
+                        (group.rename, group.canonical[0]),
+                    )
+                    result.renamed.append((group.canonical[0], group.canonical[1], group.rename))
+    result.journal_path = journal.path
+    return result
+
+
+def canonicalize(conn, tables=tuple(LOOKUPS), dry_run=False):
+    """Canonicalize each lookup table in its own transaction. Returns [Canonicalization]."""
+    return [canonicalize_table(conn, table, dry_run=dry_run) for table in tables]
+
+
+def _label(row):
+    return ' '.join(repr(value) for value in row[1:])
+
+
+def main(args):
+    with db.connection() as conn:
+        try:
+            results = canonicalize(conn, tables=args.tables or tuple(LOOKUPS), dry_run=args.dry_run)
+        except psycopg2.Error as e:
+            print(f"❌ {e}")
+            return 2
+
+    merged = renamed = 0
+    for result in results:
+        if not result.groups:
+            print(f"✅ {result.table:10s} no variant rows")
+            continue
+        print(f"🔍 {result.table}: {len(result.groups)} group(s) with variant rows or names to lowercase")
+        for group in result.groups:
+            rename = f" (renamed to {group.rename!r})" if group.rename else ''
+            print(f"   keep {result.table}.id {group.canonical[0]} {_label(group.canonical)}{rename}")
+            for row in group.variants:
+                refs = ', '.join(f"{ref_table}.{column}: {counts[row[0]]}"
+                                 for (ref_table, column), counts in result.references.items() if row[0] in counts)
+                print(f"      <- id {row[0]} {_label(row)}  [{refs or 'unreferenced'}]")
+        for (ref_table, column), rows in result.remapped.items():
+            print(f"   🔧 {ref_table}.{column}: {rows} row(s) remapped")
+        if result.journal_path:
+            print(f"   📝 Journaled as {run_id(result.journal_path)} (undo with: python -m qbank revert "
+                  f"{run_id(result.journal_path)})")
+        merged += len(result.variant_ids)
+        renamed += sum(group.rename is not None for group in result.groups)
+    merge_verb, rename_verb = ("Would merge", "rename") if args.dry_run else ("Merged", "renamed")
+    print(f"✅ {merge_verb} {merged} variant row(s) and {rename_verb} {renamed} row(s), one transaction per table")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('canonicalize', help='merge case/spacing variants of subjects and levels')
+    parser.add_argument('--tables', nargs='+', choices=tuple(LOOKUPS), help='lookup tables to canonicalize')
+    parser.add_argument('--dry-run', action='store_true', help='run the remap, then roll it back')
+    parser.set_defaults(func=main, writes=True)
@@ -0,0 +1,197 @@
+"""
+questions.content_hash: the stored matching key of every question.
+
+    python -m qbank content-hash            # add the column, backfill it, create the unique index
+    python -m qbank content-hash --check    # report missing/stale hashes and duplicates only (works on --snapshot)
+
+The hash is reconcile.question_hash(): BLAKE2 over the normalized (subject,
+level, type, text) key, the same key reconcile() matches workbook rows on.
+Storing it behind a unique index turns "which question is this workbook
+row?" into one index probe, instead of a `LIKE 'first 40 chars%'` scan, and
+gives the importer (qbank/importer.py) a conflict target to upsert on.
+
+The hash is computed in Python, so rows inserted or edited by the web app
+carry no hash or a stale one until the next refresh. refresh_hashes() reads
+every question's key in one query and rewrites only the hashes that are
+wrong, with one COPY and one UPDATE; the importer runs it first in its own
+transaction. When several questions share the same content, the lowest id
+owns the hash and the others are left NULL and reported.
+"""
+from qbank import db
+from qbank.reconcile import question_hash
+
+HASH_COLUMN = 'content_hash'
+HASH_INDEX = 'questions_content_hash_key'
+
+KEYS_SQL = """
+    SELECT q.id, s.name, l.level_number, qt.name, q.question_text, q.content_hash
+    FROM questions q
+    LEFT JOIN subjects s ON q.subject_id = s.id
+    LEFT JOIN levels l ON q.level_id = l.id
+    LEFT JOIN question_types qt ON q.question_type_id = qt.id
+    ORDER BY q.id
+"""
+
+HASH_STAGE_SQL = """
+    CREATE TEMP TABLE content_hash_stage (
+        id BIGINT PRIMARY KEY,
+        content_hash TEXT
+    ) ON COMMIT DROP
+"""
+
+# Clear first, then set: a single UPDATE that swaps two hashes would trip
+# the unique index halfway through.
+HASH_CLEAR_SQL = """
+    UPDATE questions q SET content_hash = NULL
+    FROM content_hash_stage s
+    WHERE q.id = s.id AND q.content_hash IS NOT NULL
+"""
+
+HASH_APPLY_SQL = """
+    UPDATE questions q SET content_hash = s.content_hash
+    FROM content_hash_stage s
+    WHERE q.id = s.id AND s.content_hash IS NOT NULL
+"""
+
+
+class HashRefresh:
+    __slots__ = ('questions', 'missing', 'stale', 'duplicates', 'index_created')
+
+    def __init__(self):
+        self.questions = 0
+        self.missing = []      # question ids that had no hash
+        self.stale = []        # question ids whose stored hash no longer matches
+        self.duplicates = []   # [question id, ...] per shared hash, owner first
+        self.index_created = False
+
+    @property
+    def written(self):
+        return len(self.missing) + len(self.stale)
+
+
+def has_column(cursor):
+    if db.dialect(cursor.connection) == 'sqlite':
+        cursor.execute("SELECT 1 FROM pragma_table_info('questions') WHERE name = %s", (HASH_COLUMN,))
+        return cursor.fetchone() is not None
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = 'public' AND table_name = 'questions' AND column_name = %s",
+        (HASH_COLUMN,),
+    )
+    return cursor.fetchone() is not None
+
+
+def has_index(cursor):
+    """True/False on the live database; None on a snapshot, which carries no indexes."""
+    if db.dialect(cursor.connection) == 'sqlite':
+        return None
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (f'public.{HASH_INDEX}',))
+    return cursor.fetchone()[0]
+
+
+def ensure_schema(cursor):
+    """Add the column if needed. Returns True when it was created."""
+    if has_column(cursor):
+        return False
+    cursor.execute(f"ALTER TABLE questions ADD COLUMN {HASH_COLUMN} TEXT")
+    return True
+
+
+def refresh_hashes(cursor, write=True):
+    """
+    Bring every question's content_hash up to date: one read, one COPY, two UPDATEs.
+
+    Returns a HashRefresh. With `write` false nothing is changed (the column
+    must exist either way).
+    """
+    result = HashRefresh()
+    cursor.execute(KEYS_SQL)
+    owners, wanted, stored = {}, {}, {}
+    for question_id, subject, level, qtype, text, current in cursor.fetchall():
+        digest = question_hash(subject, level, qtype, text)
+        stored[question_id] = current
+        owner = owners.setdefault(digest, [])
+        owner.append(question_id)
+        wanted[question_id] = digest if len(owner) == 1 else None
+    result.questions = len(stored)
+    result.duplicates = [ids for ids in owners.values() if len(ids) > 1]
+
+    changes = [(qid, digest) for qid, digest in wanted.items() if stored[qid] != digest]
+    result.missing = [qid for qid, _ in changes if stored[qid] is None]
+    result.stale = [qid for qid, _ in changes if stored[qid] is not None]
+    if write and changes:
+        cursor.execute(HASH_STAGE_SQL)
+        db.copy_rows(cursor, 'content_hash_stage', ('id', 'content_hash'), changes)
+        cursor.execute(HASH_CLEAR_SQL)
+        cursor.execute(HASH_APPLY_SQL)
+    return result
+
+
+def migrate(conn, dry_run=False):
+    """Column, backfill and unique index in one transaction. Returns (HashRefresh, column created)."""
+    try:
+        with conn.cursor() as cursor:
+            created = ensure_schema(cursor)
+            result = refresh_hashes(cursor)
+            if not has_index(cursor):
+                cursor.execute(f"CREATE UNIQUE INDEX {HASH_INDEX} ON questions ({HASH_COLUMN})")
+                result.index_created = True
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return result, created
+
+
+def print_refresh(result, limit=10):
+    for label, ids in (('missing', result.missing), ('stale', result.stale)):
+        if ids:
+            shown = ', '.join(str(qid) for qid in ids[:limit])
+            more = f" ... (+{len(ids) - limit})" if len(ids) > limit else ''
+            print(f"   {label:8s} {len(ids):>6} question(s): {shown}{more}")
+    if result.duplicates:
+        print(f"⚠️  {len(result.duplicates)} group(s) of questions share their content; "
+              f"only the lowest id carries the hash:")
+        for ids in result.duplicates[:limit]:
+            print(f"      Q{ids[0]} (kept) = {', '.join(f'Q{qid}' for qid in ids[1:])}")
+        if len(result.duplicates) > limit:
+            print(f"      ... and {len(result.duplicates) - limit} more")
+
+
+def main(args):
+    with db.connection() as conn:
+        if args.check:
+            with conn.cursor() as cursor:
+                if not has_column(cursor):
+                    print(f"❌ questions.{HASH_COLUMN} does not exist yet (run: python -m qbank content-hash)")
+                    return 1
+                result = refresh_hashes(cursor, write=False)
+                indexed = has_index(cursor)
+            state = {True: 'present', False: 'MISSING', None: 'not recorded in the snapshot'}[indexed]
+            print(f"🔍 {result.questions} question(s), index {HASH_INDEX} {state}")
+            print_refresh(result)
+            failed = result.written or indexed is False
+            print(f"{'❌' if failed else '✅'} {result.written} hash(es) to write")
+            return 1 if failed else 0
+
+        result, created = migrate(conn, dry_run=args.dry_run)
+
+    if created:
+        print(f"📝 Added questions.{HASH_COLUMN}")
+    if result.index_created:
+        print(f"📝 Created unique index {HASH_INDEX}")
+    print_refresh(result)
+    verb = "Would write" if args.dry_run else "Wrote"
+    print(f"✅ {verb} {result.written} hash(es) for {result.questions} question(s) in one transaction")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('content-hash', help='add/backfill questions.content_hash and its unique index')
+    parser.add_argument('--check', action='store_true', help='report missing or stale hashes without writing')
+    parser.add_argument('--dry-run', action='store_true', help='run the migration, then roll it back')
+    # --check only reads, so it may run against an offline snapshot
+    parser.set_defaults(func=main, writes=lambda args: not args.check)
@@ -0,0 +1,268 @@
+"""
+Shared PostgreSQL connection layer.
+
+Every script used to copy the same `.env.local` scan + urlparse + connect
+block. This module resolves the DSN once and hands out connections from a
+process-wide psycopg2 pool, so a run that executes several checks pays for a
+single TLS handshake to the Render instance instead of one per script.
+
+With QBANK_SNAPSHOT set to a db_backup_* directory (or `python -m qbank
+--snapshot DIR`), connections come from an in-process SQLite copy of that
+snapshot instead (qbank/snapshot.py) and nothing touches the network.
+"""
+import atexit
+import io
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import parse_qs, unquote, urlparse
+
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from qbank import snapshot
+
+ENV_FILES = ('.env.local', '.env')
+SNAPSHOT_ENV = 'QBANK_SNAPSHOT'
+
+# libpq does not expose TLS session tickets, so the way to avoid repeated
+# handshakes is to keep the encrypted connection itself alive and reuse it.
+KEEPALIVE_PARAMS = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 5,
+}
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _read_env_file(path):
+    """Parse KEY=VALUE lines from a dotenv style file (missing file -> {})."""
+    values = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '=' not in line:
+                    continue
+                key, value = line.split('=', 1)
+                if key.startswith('export '):
+                    key = key[len('export '):]
+                values[key.strip()] = value.strip().strip('"').strip("'")
+    except OSError:
+        pass
+    return values
+
+
+def _lookup(name, env_files):
+    if os.getenv(name):
+        return os.getenv(name)
+    for values in env_files:
+        if values.get(name):
+            return values[name]
+    return None
+
+
+def resolve_dsn(base_dir=None, database_url=None):
+    """
+    Resolve connection parameters for the question bank database.
+
+    Lookup order: `database_url` if given, DATABASE_URL in the environment,
+    DATABASE_URL in .env.local / .env, then the discrete POSTGRES_* variables
+    used by diagnose_fill_blanks.py. Returns a dict of psycopg2.connect()
+    keywords.
+    """
+    base_dir = base_dir or os.getcwd()
+    env_files = [_read_env_file(os.path.join(base_dir, name)) for name in ENV_FILES]
+
+    database_url = database_url or _lookup('DATABASE_URL', env_files)
+    if database_url:
+        result = urlparse(database_url)
+        params = {
+            'host': result.hostname,
+            'port': result.port or 5432,
+            'dbname': result.path.lstrip('/').split('?')[0],
+            'user': unquote(result.username) if result.username else None,
+            'password': unquote(result.password) if result.password else None,
+        }
+        # libpq style overrides, e.g. ?sslmode=require or ?host=/var/run/postgresql
+        for key, values in parse_qs(result.query).items():
+            if key in ('host', 'sslmode', 'connect_timeout', 'application_name'):
+                params[key] = values[-1]
+    elif _lookup('POSTGRES_HOST', env_files):
+        params = {
+            'host': _lookup('POSTGRES_HOST', env_files),
+            'port': int(_lookup('POSTGRES_PORT', env_files) or 5432),
+            'dbname': _lookup('POSTGRES_DB', env_files),
+            'user': _lookup('POSTGRES_USER', env_files),
+            'password': _lookup('POSTGRES_PASSWORD', env_files),
+        }
+    else:
+        raise RuntimeError(
+            "DATABASE_URL not found (checked environment, .env.local, .env and POSTGRES_* variables)"
+        )
+
+    sslmode = params.get('sslmode') or _lookup('PGSSLMODE', env_files)
+    if not sslmode:
+        host = params.get('host') or ''
+        sslmode = 'prefer' if host in LOCAL_HOSTS or host.startswith('/') else 'require'
+    params['sslmode'] = sslmode
+    params.update(KEEPALIVE_PARAMS)
+    return {k: v for k, v in params.items() if v is not None}
+
+
+def describe(params):
+    """Short host/db label for log output (never includes the password)."""
+    return f"{params.get('user')}@{params.get('host')}:{params.get('port')}/{params.get('dbname')}"
+
+
+def _warm_up(pool, count):
+    """Open `count` connections up front and run a trivial query on each."""
+    conns = []
+    try:
+        for _ in range(count):
+            conn = pool.getconn()
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            conns.append(conn)
+    finally:
+        for conn in conns:
+            pool.putconn(conn)
+
+
+def get_pool(minconn=1, maxconn=4, params=None):
+    """Return the process-wide connection pool, creating and warming it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                params = params or resolve_dsn()
+                new_pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **params)
+                _warm_up(new_pool, minconn)
+                _pool = new_pool
+    return _pool
+
+
+def close_pool():
+    """Close every pooled connection (registered with atexit)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+atexit.register(close_pool)
+
+
+def dialect(conn):
+    """'postgresql' for live connections, 'sqlite' for an offline snapshot."""
+    return getattr(conn, 'dialect', 'postgresql')
+
+
+def get_connection():
+    """
+    Borrow a connection from the pool.
+
+    Pair with release(); prefer the connection() context manager in new code.
+    Connections that are found dead are replaced transparently. When
+    QBANK_SNAPSHOT is set this is the offline snapshot instead.
+    """
+    if os.getenv(SNAPSHOT_ENV):
+        return snapshot.connect(os.environ[SNAPSHOT_ENV])
+    pool = get_pool()
+    conn = pool.getconn()
+    if conn.closed:
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    return conn
+
+
+def release(conn):
+    """Return a borrowed connection to the pool, discarding any open transaction."""
+    if dialect(conn) == 'sqlite':
+        conn.rollback()  # the snapshot stays loaded for the rest of the process
+        return
+    if _pool is None:
+        conn.close()
+        return
+    if not conn.closed:
+        conn.rollback()
+    _pool.putconn(conn, close=bool(conn.closed))
+
+
+@contextmanager
+def connection(database_url=None):
+    """
+    Context manager: commit on success, roll back on error, always release.
+
+    With `database_url` the connection goes to that database instead (a
+    dedicated connection, closed afterwards, not from the pool).
+    """
+    conn = psycopg2.connect(**resolve_dsn(database_url=database_url)) if database_url else get_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        if database_url:
+            conn.close()
+        else:
+            release(conn)
+
+
+@contextmanager
+def cursor():
+    """Shortcut for `with connection() as conn: with conn.cursor() as cur:`."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            yield cur
+
+
+def _copy_value(value):
+    """Encode one value for COPY ... FROM STDIN text format."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    return (text.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def copy_line(row):
+    """One row as a COPY text-format line (newline included)."""
+    return '\t'.join(_copy_value(v) for v in row) + '\n'
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Bulk load rows into `table` with a single COPY FROM STDIN.
+
+    `rows` is any iterable of tuples in `columns` order. Returns the row count.
+    """
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write(copy_line(row))
+        count += 1
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+    return count
+
+
+def connect_or_exit():
+    """Script helper: borrow a connection or print the failure and exit(1)."""
+    try:
+        return get_connection()
+    except (RuntimeError, psycopg2.Error) as e:
+        print(f"❌ Connection failed: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,348 @@
+"""
+Near-duplicate questions, found with MinHash signatures and LSH banding.
+
+    python -m qbank dedupe                                 # report duplicate clusters
+    python -m qbank dedupe --threshold 0.8 -o merge.plan.gz
+    python -m qbank merge merge.plan.gz --dry-run          # delete the duplicates, keep one per cluster
+
+Comparing every question with every other is O(n^2). Instead each question
+becomes a set of features (character trigrams of its text plus one token
+per answer row: option text and which one is correct, matching pairs, fill
+answers, reorder steps, the true/false value) and a MinHash signature of
+NUM_HASHES values. The signature uses one-permutation hashing: every
+feature is hashed once, not NUM_HASHES times, so it costs O(features).
+
+Signatures are cut into BANDS bands of ROWS values; questions of the same
+type, subject name and level whose band matches land in the same bucket.
+Pairs with a true Jaccard similarity of 0.9 collide in some band with
+probability > 99.9%, pairs below ~0.5 rarely do. Every pair within a
+bucket is checked with the exact Jaccard similarity of their feature sets,
+and the confirmed pairs are joined into groups (union-find). A group is
+cut into clusters whose every member is at least the threshold similar to
+the cluster's lowest id, so a chain A~B~C never drops C for A alone. The
+work is linear in the number of questions plus the pairs in the buckets.
+
+A merge plan keeps the lowest id of every cluster (the one that owns the
+content hash) and deletes the others; their answer rows go with them (ON
+DELETE CASCADE). "merge" re-reads the planned questions first, skips a
+cluster when any of them changed since the plan was written, and keeps any
+dropped question that is less than the plan's threshold similar to the
+kept one (an edited plan, say). The deleted questions and answer rows are
+journaled, so "python -m qbank revert" undoes a merge.
+"""
+import gzip
+import hashlib
+import json
+import time
+
+from qbank import db
+from qbank.bank import load_bank
+from qbank.fuzzy import trigrams
+from qbank.journal import PREIMAGE_COLUMNS, journaled, run_id
+from qbank.normalize import normalize_text
+
+PLAN_VERSION = 1
+NUM_HASHES = 64       # bins; a power of two
+BIN_BITS = NUM_HASHES.bit_length() - 1
+BIN_MASK = NUM_HASHES - 1
+HASH_MASK = (1 << 64) - 1
+DENSIFY_OFFSET = 1 << 58  # above any bin value (64 - BIN_BITS bits)
+BANDS = 16
+ROWS = NUM_HASHES // BANDS
+DEFAULT_THRESHOLD = 0.9
+
+
+def _answer_tokens(question):
+    children = question.children
+    if question.qtype == 'mcq':
+        tokens = {f"option|{normalize_text(o.option_text)}" for o in children}
+        tokens.update(f"correct|{normalize_text(o.option_text)}" for o in children if o.is_correct)
+    elif question.qtype == 'matching':
+        tokens = {f"pair|{normalize_text(p.left_item)}|{normalize_text(p.right_item)}" for p in children}
+    elif question.qtype == 'fill':
+        tokens = {f"answer|{normalize_text(a.answer_text)}" for a in children}
+    elif question.qtype == 'reorder':
+        tokens = {f"step|{i.correct_position}|{normalize_text(i.item_text)}" for i in children}
+    elif question.qtype == 'truefalse':
+        tokens = {f"truefalse|{a.correct_answer}" for a in children}
+    else:
+        tokens = set()
+    return tokens
+
+
+def features(question):
+    """Trigrams of the text plus one token per answer row."""
+    return trigrams(question.text) | _answer_tokens(question)
+
+
+def content_digest(question):
+    """Fingerprint of a question's content, to detect drift between plan and merge."""
+    data = json.dumps([question.subject, question.level, question.qtype, question.text,
+                       sorted(_answer_tokens(question))], ensure_ascii=False)
+    return hashlib.blake2b(data.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def signature(feature_set):
+    """
+    One-permutation MinHash: one hash per feature, split into NUM_HASHES bins.
+
+    The low bits of a feature's hash pick its bin, the rest is its value
+    there; each bin keeps its minimum. Empty bins borrow the next non-empty
+    bin's value, shifted by the distance, so two sets agree on a bin with
+    probability close to their Jaccard similarity. str hashes are salted per
+    process, which is fine: signatures never outlive a scan.
+    """
+    bins = [None] * NUM_HASHES
+    for feature in feature_set:
+        h = hash(feature) & HASH_MASK
+        position, value = h & BIN_MASK, h >> BIN_BITS
+        current = bins[position]
+        if current is None or value < current:
+            bins[position] = value
+    if None in bins:
+        # an empty bin borrows from the next filled bin to its right (wrapping
+        # around), found in one right-to-left walk over two laps
+        filled = [value is not None for value in bins]
+        following = None
+        for i in range(2 * NUM_HASHES - 1, -1, -1):
+            position = i & BIN_MASK
+            if filled[position]:
+                following = i
+            elif i < NUM_HASHES and following is not None:
+                bins[position] = bins[following & BIN_MASK] + (following - i) * DENSIFY_OFFSET
+    return tuple(bins)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class _Clusters:
+    """Union-find over question ids; the root is the lowest id."""
+    __slots__ = ('parent',)
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent.get(item, item)
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+class Cluster:
+    __slots__ = ('keep', 'drop', 'similarity')
+
+    def __init__(self, keep, drop, similarity):
+        self.keep = keep              # Question kept (lowest id)
+        self.drop = drop              # [Question] to delete
+        self.similarity = similarity  # {question id: Jaccard similarity to the kept question}
+
+    def __repr__(self):
+        return f"<Cluster keep {self.keep.id} drop {[q.id for q in self.drop]}>"
+
+
+def _split(bank, feature_sets, ids, threshold):
+    """
+    Clusters of one union-find group, each dropped question at least
+    `threshold` similar to the one kept.
+
+    Pairs are joined transitively, so a group can hold questions that are
+    only similar through a third one; those are left for the next cluster
+    of the group, kept on the next lowest id.
+    """
+    result = []
+    while len(ids) > 1:
+        keep, rest = ids[0], ids[1:]
+        scores = {qid: jaccard(feature_sets[keep], feature_sets[qid]) for qid in rest}
+        drop = [qid for qid in rest if scores[qid] >= threshold]
+        if drop:
+            result.append(Cluster(bank.get(keep), [bank.get(qid) for qid in drop],
+                                  {qid: scores[qid] for qid in drop}))
+        ids = [qid for qid in rest if scores[qid] < threshold]
+    return result
+
+
+def find_duplicates(bank, threshold=DEFAULT_THRESHOLD):
+    """Return (clusters, stats): every group of questions at least `threshold` similar."""
+    feature_sets, partitions = {}, {}
+    for question in bank:
+        feature_set = features(question)
+        if not feature_set:
+            continue
+        feature_sets[question.id] = feature_set
+        sig = signature(feature_set)
+        partition = (question.qtype, normalize_text(question.subject), question.level)
+        bands = partitions.get(partition)
+        if bands is None:
+            bands = partitions[partition] = [{} for _ in range(BANDS)]
+        for band, start in enumerate(range(0, NUM_HASHES, ROWS)):
+            bands[band].setdefault(sig[start:start + ROWS], []).append(question.id)
+    buckets = [members for bands in partitions.values() for band in bands for members in band.values()]
+
+    clusters, checked = _Clusters(), set()
+    for members in buckets:
+        for i, first in enumerate(members):
+            for other in members[i + 1:]:
+                if (first, other) in checked:
+                    continue
+                checked.add((first, other))
+                if jaccard(feature_sets[first], feature_sets[other]) >= threshold:
+                    clusters.union(first, other)
+
+    groups = {}
+    for question_id in clusters.parent:
+        groups.setdefault(clusters.find(question_id), []).append(question_id)
+    result = []
+    for root, ids in groups.items():
+        result.extend(_split(bank, feature_sets, sorted(set(ids) | {root}), threshold))
+    result.sort(key=lambda cluster: cluster.keep.id)
+    stats = {
+        'questions': len(feature_sets),
+        'features': sum(map(len, feature_sets.values())),
+        'buckets': len(buckets),
+        'pairs_checked': len(checked),
+    }
+    return result, stats
+
+
+def write_plan(path, clusters, threshold):
+    payload = {
+        'version': PLAN_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'threshold': threshold,
+        'clusters': [
+            {
+                'keep': cluster.keep.id,
+                'drop': [question.id for question in cluster.drop],
+                'digests': {str(q.id): content_digest(q) for q in [cluster.keep] + cluster.drop},
+            }
+            for cluster in clusters
+        ],
+    }
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def read_plan(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported merge plan version {payload.get('version')!r} in {path}")
+    return payload
+
+
+def merge(conn, plan, dry_run=False):
+    """
+    Delete the planned duplicates in one journaled transaction.
+
+    Returns (deleted ids, drifted clusters, dissimilar, journal path). A
+    cluster is skipped (drifted) when any of its questions is gone or no
+    longer has the content it had when the plan was written. Each dropped
+    question is compared with the kept one again and left alone unless it
+    is at least the plan's threshold similar to it; `dissimilar` lists
+    those as (kept id, dropped id, similarity). The deleted questions and
+    their answer rows go to the undo journal first, so "revert" puts them
+    back under their old ids.
+    """
+    ids = [qid for cluster in plan['clusters'] for qid in [cluster['keep']] + cluster['drop']]
+    deleted, drifted, dissimilar = [], [], []
+    with journaled(conn, 'merge', dry_run=dry_run) as (cursor, journal):
+        bank = load_bank(conn, ids=ids)
+        todo = []
+        for cluster in plan['clusters']:
+            current = {qid: bank.get(qid) for qid in [cluster['keep']] + cluster['drop']}
+            if any(q is None or content_digest(q) != cluster['digests'][str(qid)] for qid, q in current.items()):
+                drifted.append(cluster)
+                continue
+            kept = features(current[cluster['keep']])
+            for qid in cluster['drop']:
+                score = jaccard(kept, features(current[qid]))
+                if score >= plan['threshold']:
+                    todo.append(qid)
+                else:
+                    dissimilar.append((cluster['keep'], qid, score))
+        if todo:
+            for table in ('questions',) + tuple(PREIMAGE_COLUMNS):
+                journal.capture(cursor, table, todo)
+            cursor.execute("DELETE FROM questions WHERE id = ANY(%s) RETURNING id", (todo,))
+            deleted = sorted(row[0] for row in cursor.fetchall())
+    return deleted, drifted, dissimilar, journal.path
+
+
+def print_clusters(clusters, limit=None):
+    for cluster in clusters[:limit]:
+        keep = cluster.keep
+        print(f"   Q{keep.id:<6} {keep.qtype:9s} {keep.subject} L{keep.level}: {str(keep.text)[:60]!r}")
+        for question in cluster.drop:
+            print(f"      = Q{question.id:<6} {cluster.similarity[question.id]:.0%}  "
+                  f"{question.subject} L{question.level}: {str(question.text)[:50]!r}")
+    if limit and len(clusters) > limit:
+        print(f"   ... and {len(clusters) - limit} more cluster(s)")
+
+
+def dedupe_main(args):
+    if not 0 < args.threshold <= 1:
+        print(f"❌ --threshold must be in (0, 1], not {args.threshold}")
+        return 2
+    with db.connection() as conn:
+        bank = load_bank(conn)
+    started = time.perf_counter()
+    clusters, stats = find_duplicates(bank, args.threshold)
+    elapsed = time.perf_counter() - started
+
+    duplicates = sum(len(cluster.drop) for cluster in clusters)
+    print(f"🔍 {stats['questions']} question(s), {stats['features']} feature(s), "
+          f"{stats['buckets']} LSH bucket(s), {stats['pairs_checked']} pair(s) verified in {elapsed:.2f}s")
+    print_clusters(clusters, limit=None if args.output else 50)
+    if args.output:
+        write_plan(args.output, clusters, args.threshold)
+        print(f"📝 Merge plan written to {args.output} (apply with: python -m qbank merge {args.output})")
+    print(f"{'⚠️ ' if clusters else '✅'} {len(clusters)} cluster(s), {duplicates} duplicate question(s) "
+          f"at >= {args.threshold:.0%} similarity")
+    return 1 if clusters else 0
+
+
+def merge_main(args):
+    try:
+        plan = read_plan(args.plan)
+    except (OSError, ValueError) as e:
+        print(f"❌ {args.plan}: {e}")
+        return 2
+    planned = sum(len(cluster['drop']) for cluster in plan['clusters'])
+    print(f"📄 {args.plan}: {len(plan['clusters'])} cluster(s), {planned} duplicate(s), created {plan.get('created_at')}")
+
+    with db.connection() as conn:
+        deleted, drifted, dissimilar, journal_path = merge(conn, plan, dry_run=args.dry_run)
+
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"✅ {verb} {len(deleted)} duplicate question(s) in one transaction")
+    if journal_path:
+        print(f"📝 Journaled as {run_id(journal_path)} (undo with: python -m qbank revert {run_id(journal_path)})")
+    for cluster in drifted:
+        print(f"   ⚠️  skipped cluster of Q{cluster['keep']}: changed or deleted since the plan was written")
+    for keep, qid, score in dissimilar:
+        print(f"   ⚠️  kept Q{qid}: only {score:.0%} similar to Q{keep} (plan threshold {plan['threshold']:.0%})")
+    return 1 if drifted or dissimilar else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('dedupe', help='find near-duplicate questions with MinHash/LSH')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'minimum Jaccard similarity, 0-1 (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('-o', '--output', metavar='PLAN', help='write a merge plan (gzip JSON) for "merge"')
+    parser.set_defaults(func=dedupe_main)
+
+    parser = subparsers.add_parser('merge', help='delete the duplicates listed in a merge plan, keeping one each')
+    parser.add_argument('plan', help='merge plan written by "dedupe -o"')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.set_defaults(func=merge_main, writes=True)
@@ -0,0 +1,340 @@
+"""
+Single-process diagnostics runner.
+
+Replaces the separate check_*.py / diagnose_*.py programs. The workbook is
+parsed once and the question bank is pulled once; every registered check then
+runs against those shared in-memory models.
+
+    python -m qbank diagnose              # run every check
+    python -m qbank diagnose --list       # list registered checks
+    python -m qbank diagnose mcq-correct-flags fill-missing-answers
+    python -m qbank diagnose --incremental excel-vs-db-mcq excel-vs-db-fill
+"""
+import time
+from collections import Counter
+
+from qbank import db
+from qbank.bank import load_bank
+from qbank.fuzzy import relink
+from qbank.integrity import audit, describe, format_options
+from qbank.ledger import reconcile_incremental
+from qbank.reconcile import reconcile
+from qbank.workbook import DEFAULT_WORKBOOK, MCQ_LABELS, load_workbook
+from qbank.workbook_cache import load_cached
+
+CHECKS = {}
+
+
+class Check:
+    __slots__ = ('name', 'func', 'needs', 'help')
+
+    def __init__(self, name, func, needs, help):
+        self.name = name
+        self.func = func
+        self.needs = needs
+        self.help = help
+
+
+def check(name, needs=(), help=''):
+    """Register a check. `needs` is a subset of {'workbook', 'bank'}."""
+    def decorator(func):
+        CHECKS[name] = Check(name, func, frozenset(needs), help or (func.__doc__ or '').strip())
+        return func
+    return decorator
+
+
+class Context:
+    """Lazily loaded, shared inputs for a diagnostics run."""
+
+    def __init__(self, workbook_path=None, conn=None, use_cache=True, incremental=False, reset_ledger=False):
+        self.workbook_path = workbook_path or DEFAULT_WORKBOOK
+        self.use_cache = use_cache
+        self.incremental = incremental
+        self.reset_ledger = reset_ledger
+        self.conn = conn
+        self._workbook = None
+        self._bank = None
+        self._integrity = None
+        self._reconciliation = None
+
+    @property
+    def workbook(self):
+        if self._workbook is None:
+            loader = load_cached if self.use_cache else load_workbook
+            self._workbook = loader(self.workbook_path)
+        return self._workbook
+
+    @property
+    def bank(self):
+        if self._bank is None:
+            if self.conn is None:
+                self.conn = db.get_connection()
+            self._bank = load_bank(self.conn)
+        return self._bank
+
+    @property
+    def integrity(self):
+        """Whole-bank integrity report, computed by one query."""
+        if self._integrity is None:
+            if self.conn is None:
+                self.conn = db.get_connection()
+            self._integrity = audit(self.conn)
+        return self._integrity
+
+    @property
+    def reconciliation(self):
+        if self._reconciliation is None:
+            if self.incremental:
+                self._reconciliation = self._reconcile_incremental()
+            else:
+                self._reconciliation = reconcile(self.workbook, self.bank)
+                relink(self._reconciliation)
+        return self._reconciliation
+
+    def _reconcile_incremental(self):
+        if self.conn is None:
+            self.conn = db.get_connection()
+        result, stats = reconcile_incremental(
+            self.conn, self.workbook, self.workbook_path, full=self.reset_ledger,
+        )
+        mode = "full run, ledger rebuilt" if stats['full'] else "incremental"
+        print(f"   Ledger ({mode}): checked {stats['checked']} of {stats['rows']} rows, "
+              f"{stats['questions_changed']} changed question(s), {stats['questions_loaded']} loaded")
+        return result
+
+    def sheet(self, name):
+        return self.workbook.get(name, [])
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+# ---------------------------------------------------------------------------
+# Workbook-only checks
+# ---------------------------------------------------------------------------
+
+@check('mcq-empty-options', needs=('workbook',))
+def check_mcq_empty_options(ctx):
+    """MCQ rows with one or more empty options (check_empty_options.py)."""
+    issues = []
+    for row in ctx.sheet('MCQ'):
+        empty = [label for label, text in zip(MCQ_LABELS, row.options) if not text]
+        if empty:
+            issues.append(f"Row {row.row}: empty option(s) {', '.join(empty)} - {row.question[:60]}")
+    return issues
+
+
+@check('mcq-subject-counts', needs=('workbook',))
+def check_mcq_subject_counts(ctx):
+    """MCQ rows per subject; unknown subjects are issues (check_geography_mcq.py)."""
+    counts = Counter()
+    issues = []
+    for row in ctx.sheet('MCQ'):
+        subject = row.subject.lower()
+        counts[subject] += 1
+        if subject not in ('history', 'geography'):
+            issues.append(f"Row {row.row}: unknown subject '{row.subject}'")
+    for subject, count in sorted(counts.items()):
+        print(f"   {subject or '(blank)'}: {count}")
+    return issues
+
+
+@check('mcq-answer-in-options', needs=('workbook',))
+def check_mcq_answer_in_options(ctx):
+    """MCQ rows whose correctAnswer matches none of the options (find_missing_answers.py)."""
+    issues = []
+    for row in ctx.sheet('MCQ'):
+        correct = row.correct_answer.lower()
+        if correct in [text.lower() for text in row.options]:
+            continue
+        if len(correct) == 1 and correct.upper() in MCQ_LABELS:
+            continue
+        issues.append(
+            f"Row {row.row}: correctAnswer '{row.correct_answer}' not in options "
+            f"{list(row.options)} - {row.question[:50]}"
+        )
+    return issues
+
+
+# ---------------------------------------------------------------------------
+# Database-only checks: all share one integrity query (qbank/integrity.py)
+# ---------------------------------------------------------------------------
+
+@check('mcq-correct-flags', needs=('bank',))
+def check_mcq_correct_flags(ctx):
+    """MCQ questions with zero or multiple correct options (diagnose_mcq.py, final_diagnostic.py)."""
+    issues = []
+    for finding in ctx.integrity.by_kind('zero_correct') + ctx.integrity.by_kind('multiple_correct'):
+        correct = finding.detail.get('correct', 0)
+        kind = 'NO correct option' if not correct else f'{correct} correct options'
+        options = ', '.join(format_options(finding.detail['options']))
+        issues.append(f"ID {finding.question_id}: {kind} - {_text(finding.question_text)[:50]} [{options}]")
+    return issues
+
+
+@check('fill-missing-answers', needs=('bank',))
+def check_fill_missing_answers(ctx):
+    """Fill questions with no stored answer (check_all_fill_answers.py)."""
+    return [describe(finding) for finding in ctx.integrity.by_kind('missing_fill_answer')]
+
+
+@check('order-gaps', needs=('bank',))
+def check_order_gaps(ctx):
+    """Options, pairs or reorder items whose order column has gaps or duplicates."""
+    return [describe(finding) for finding in ctx.integrity.by_kind('order_gap')]
+
+
+@check('orphan-children', needs=('bank',))
+def check_orphan_children(ctx):
+    """Answer rows pointing at a missing question or a question of another type."""
+    return [describe(finding) for finding in ctx.integrity.by_kind('orphan_child')]
+
+
+@check('empty-child-text', needs=('bank',))
+def check_empty_child_text(ctx):
+    """MCQ options, matching items or reorder items stored with blank text."""
+    return [describe(finding) for finding in ctx.integrity.by_kind('empty_text')]
+
+
+@check('reorder-positions', needs=('bank',))
+def check_reorder_positions(ctx):
+    """Reorder questions whose correct_position values are not a permutation of 1..n."""
+    return [describe(finding) for finding in ctx.integrity.by_kind('invalid_reorder_positions')]
+
+
+# ---------------------------------------------------------------------------
+# Workbook vs database checks
+# ---------------------------------------------------------------------------
+
+def _reconciliation_issues(ctx, qtype):
+    result = ctx.reconciliation
+    issues = [
+        f"Row {record.row}: NOT FOUND IN DB - {record.question[:60]}"
+        for record in result.missing if record.qtype == qtype
+    ]
+    issues.extend(
+        f"Row {record.row}: text drifted from ID {question.id} ({score:.0%} similar) - {record.question[:50]}"
+        for record, question, score in result.relinked if record.qtype == qtype
+    )
+    issues.extend(
+        f"Row {record.row}: matches {len(questions)} DB questions "
+        f"{[q.id for q in questions]} - {record.question[:50]}"
+        for record, questions in result.ambiguous if record.qtype == qtype
+    )
+    issues.extend(
+        f"Row {d.row.row}, ID {d.question.id}: {d.field} Excel {d.expected!r} vs DB {d.actual!r}"
+        for d in result.differences if d.row.qtype == qtype
+    )
+    return issues
+
+
+@check('excel-vs-db-fill', needs=('workbook', 'bank'))
+def check_excel_vs_db_fill(ctx):
+    """Fill rows missing from the DB or whose DB answer differs (full_diagnosis.py part 1)."""
+    return _reconciliation_issues(ctx, 'fill')
+
+
+@check('excel-vs-db-mcq', needs=('workbook', 'bank'))
+def check_excel_vs_db_mcq(ctx):
+    """MCQ rows missing from the DB or whose options/correct flag differ (full_diagnosis.py part 2)."""
+    return _reconciliation_issues(ctx, 'mcq')
+
+
+@check('excel-vs-db-matching', needs=('workbook', 'bank'))
+def check_excel_vs_db_matching(ctx):
+    """Matching rows missing from the DB or whose pairs differ from matching_pairs."""
+    return _reconciliation_issues(ctx, 'matching')
+
+
+@check('excel-vs-db-reorder', needs=('workbook', 'bank'))
+def check_excel_vs_db_reorder(ctx):
+    """Reorder rows missing from the DB or whose steps differ from reorder_items by correct_position."""
+    return _reconciliation_issues(ctx, 'reorder')
+
+
+@check('excel-vs-db-truefalse', needs=('workbook', 'bank'))
+def check_excel_vs_db_truefalse(ctx):
+    """TrueFalse rows missing from the DB, with an invalid isTrue, or whose stored answer differs."""
+    return _reconciliation_issues(ctx, 'truefalse')
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def run_checks(names=None, workbook_path=None, skip_db=False, conn=None, verbose=True, use_cache=True,
+               incremental=False, reset_ledger=False):
+    """Run the selected checks against one shared Context. Returns {name: [issue, ...]}."""
+    selected = [CHECKS[name] for name in (names or CHECKS)]
+    if skip_db:
+        selected = [c for c in selected if 'bank' not in c.needs]
+
+    ctx = Context(workbook_path, conn=conn, use_cache=use_cache,
+                  incremental=incremental, reset_ledger=reset_ledger)
+    results = {}
+    try:
+        for entry in selected:
+            print("=" * 80)
+            print(f"🔍 {entry.name}: {entry.help}")
+            print("=" * 80)
+            started = time.perf_counter()
+            issues = entry.func(ctx)
+            elapsed = time.perf_counter() - started
+            results[entry.name] = issues
+            shown = issues if verbose else issues[:10]
+            for issue in shown:
+                print(f"❌ {issue}")
+            if len(shown) < len(issues):
+                print(f"   ... and {len(issues) - len(shown)} more")
+            if not issues:
+                print("✅ No issues found")
+            print(f"   ({elapsed:.2f}s)\n")
+    finally:
+        if ctx.conn is not None and conn is None:
+            db.release(ctx.conn)
+    return results
+
+
+def print_summary(results):
+    print("=" * 80)
+    print("SUMMARY")
+    print("=" * 80)
+    for name, issues in results.items():
+        status = "✅" if not issues else "❌"
+        print(f"{status} {name:30s} {len(issues)} issue(s)")
+    print(f"Total issues: {sum(len(i) for i in results.values())}")
+
+
+def main(args):
+    if args.list:
+        for entry in CHECKS.values():
+            print(f"{entry.name:30s} [{', '.join(sorted(entry.needs))}] {entry.help}")
+        return 0
+
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        print(f"❌ Unknown check(s): {', '.join(unknown)} (use --list)")
+        return 2
+
+    results = run_checks(
+        args.checks, args.workbook, skip_db=args.no_db, verbose=not args.brief, use_cache=not args.no_cache,
+        incremental=args.incremental or args.reset_ledger, reset_ledger=args.reset_ledger,
+    )
+    print_summary(results)
+    return 1 if any(results.values()) else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('diagnose', help='run workbook/database checks in one process')
+    parser.add_argument('checks', nargs='*', help='check names (default: all)')
+    parser.add_argument('--list', action='store_true', help='list registered checks')
+    parser.add_argument('--workbook', help=f'path to the question workbook (default: {DEFAULT_WORKBOOK})')
+    parser.add_argument('--no-cache', action='store_true', help='re-parse the workbook instead of using the on-disk cache')
+    parser.add_argument('--no-db', action='store_true', help='only run checks that do not need the database')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only reconcile rows/questions changed since the last incremental run')
+    parser.add_argument('--reset-ledger', action='store_true',
+                        help='reconcile everything and rebuild the incremental ledger')
+    parser.add_argument('--brief', action='store_true', help='show at most 10 issues per check')
+    parser.set_defaults(func=main)
@@ -0,0 +1,249 @@
+"""
+Parallel COPY exporter, replacing the row-per-INSERT full_backup.sql.
+
+    python -m qbank export                          # ./db_backup_<timestamp>/
+    python -m qbank export --out backups/nightly --jobs 6
+    python -m qbank export --verify db_backup_20260108T144359
+
+Each table is streamed with COPY ... TO STDOUT straight into
+<table>.copy.gz (Postgres text format, gzip'd), several tables at once on
+separate pooled connections. The workers share one exported snapshot
+(pg_export_snapshot), so the files are as consistent as a single
+transaction. Rows are never materialised in Python: memory stays at a few
+COPY buffers however large the tables get.
+
+manifest.json lists the tables in dependency order with their columns, row
+counts and the sha256 of the uncompressed COPY stream. An export directory
+is also a valid --snapshot for offline runs (qbank/snapshot.py).
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from qbank import db
+
+# Same tables, same order (parents first) as scripts/export-database.mjs.
+EXPORT_TABLES = (
+    'subjects',
+    'levels',
+    'question_types',
+    'questions',
+    'mcq_options',
+    'matching_pairs',
+    'fill_answers',
+    'reorder_items',
+    'truefalse_answers',
+    'user_profiles',
+    'leaderboard',
+)
+
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+SUFFIX = '.copy.gz'
+COMPRESS_LEVEL = 6
+DEFAULT_JOBS = 4
+FLUSH_SIZE = 1 << 20
+
+
+class _CopySink:
+    """
+    File-like target for copy_expert: gzip, sha256 and row count in one pass.
+
+    psycopg2 calls write() once per row for COPY TO, so rows are gathered
+    into FLUSH_SIZE blocks before they are hashed and compressed.
+    """
+    __slots__ = ('out', 'sha256', 'rows', 'size', 'buffer')
+
+    def __init__(self, out):
+        self.out = out
+        self.sha256 = hashlib.sha256()
+        self.rows = 0
+        self.size = 0
+        self.buffer = bytearray()
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.buffer += data
+        if len(self.buffer) >= FLUSH_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        data = bytes(self.buffer)
+        # text format escapes embedded newlines, so every \n ends a row
+        self.rows += data.count(b'\n')
+        self.size += len(data)
+        self.sha256.update(data)
+        self.out.write(data)
+        self.buffer.clear()
+
+
+def table_columns(cursor, table):
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = 'public' AND table_name = %s ORDER BY ordinal_position",
+        (table,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def export_table(table, columns, directory, snapshot_id):
+    """COPY one table into <directory>/<table>.copy.gz inside the shared snapshot."""
+    started = time.time()
+    path = os.path.join(directory, table + SUFFIX)
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+            with open(path + '.tmp', 'wb') as raw, \
+                    gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=COMPRESS_LEVEL, mtime=0) as out:
+                sink = _CopySink(out)
+                quoted = ', '.join(f'"{column}"' for column in columns)
+                cursor.copy_expert(f'COPY public."{table}" ({quoted}) TO STDOUT', sink)
+                sink.flush()
+            if cursor.rowcount >= 0 and cursor.rowcount != sink.rows:
+                raise RuntimeError(f"{table}: COPY reported {cursor.rowcount} rows, counted {sink.rows}")
+        os.replace(path + '.tmp', path)
+    finally:
+        db.release(conn)
+    return {
+        'file': table + SUFFIX,
+        'columns': columns,
+        'rows': sink.rows,
+        'bytes': sink.size,
+        'compressed_bytes': os.path.getsize(path),
+        'sha256': sink.sha256.hexdigest(),
+        'seconds': round(time.time() - started, 3),
+    }
+
+
+def export_database(directory, tables=EXPORT_TABLES, jobs=DEFAULT_JOBS):
+    """
+    Export `tables` into `directory` with up to `jobs` parallel COPY streams.
+
+    Returns the manifest dict (also written to <directory>/manifest.json).
+    Tables that do not exist in the database are listed under "skipped".
+    """
+    os.makedirs(directory, exist_ok=True)
+    pool = db.get_pool(maxconn=jobs + 1)
+    # one connection holds the snapshot open; the rest of the pool does the COPYs
+    jobs = max(1, min(jobs, pool.maxconn - 1))
+
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SELECT pg_export_snapshot(), now()")
+            snapshot_id, taken_at = cursor.fetchone()
+            columns = {table: table_columns(cursor, table) for table in tables}
+        present = [table for table in tables if columns[table]]
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                table: executor.submit(export_table, table, columns[table], directory, snapshot_id)
+                for table in present
+            }
+            # dependency order, whatever order the workers finish in
+            exported = {table: futures[table].result() for table in present}
+        source = db.describe(conn.get_dsn_parameters())
+    finally:
+        db.release(conn)
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'format': 'copy-text',
+        'compression': 'gzip',
+        'created_at': taken_at.isoformat(),
+        'source': source,
+        'tables': exported,
+        'skipped': [table for table in tables if not columns[table]],
+    }
+    tmp = os.path.join(directory, MANIFEST + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+    return manifest
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest.get('version')!r} in {directory}")
+    return manifest
+
+
+def verify_export(directory, chunk_size=1 << 20):
+    """Re-hash every table file against the manifest. Returns a list of problems."""
+    problems = []
+    for table, entry in read_manifest(directory)['tables'].items():
+        path = os.path.join(directory, entry['file'])
+        if not os.path.exists(path):
+            problems.append(f"{table}: {entry['file']} is missing")
+            continue
+        sha256, rows = hashlib.sha256(), 0
+        with gzip.open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha256.update(chunk)
+                rows += chunk.count(b'\n')
+        if sha256.hexdigest() != entry['sha256']:
+            problems.append(f"{table}: checksum mismatch")
+        if rows != entry['rows']:
+            problems.append(f"{table}: {rows} rows, manifest says {entry['rows']}")
+    return problems
+
+
+def _size(n):
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def main(args):
+    if args.verify:
+        try:
+            problems = verify_export(args.verify)
+        except (OSError, ValueError) as e:
+            print(f"❌ {args.verify}: {e}")
+            return 2
+        for problem in problems:
+            print(f"❌ {problem}")
+        if not problems:
+            print(f"✅ {args.verify}: every table matches its manifest checksum")
+        return 1 if problems else 0
+
+    if os.getenv(db.SNAPSHOT_ENV):
+        print("❌ export reads from the live database; it cannot run against an offline snapshot")
+        return 2
+    directory = args.out or f"db_backup_{time.strftime('%Y%m%dT%H%M%S')}"
+    tables = args.tables or EXPORT_TABLES
+    started = time.time()
+    manifest = export_database(directory, tables=tables, jobs=args.jobs)
+
+    print(f"📦 {manifest['source']} -> {directory}")
+    for table, entry in manifest['tables'].items():
+        print(f"   {table:20s} {entry['rows']:>9} rows  {_size(entry['bytes']):>8} -> "
+              f"{_size(entry['compressed_bytes']):>8}  ({entry['seconds']:.2f}s)")
+    for table in manifest['skipped']:
+        print(f"   {table:20s} ⚠️  not in the database, skipped")
+    rows = sum(entry['rows'] for entry in manifest['tables'].values())
+    size = sum(entry['compressed_bytes'] for entry in manifest['tables'].values())
+    print(f"✅ Exported {rows} rows from {len(manifest['tables'])} table(s), {_size(size)} "
+          f"in {time.time() - started:.2f}s")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('export', help='back up the database as parallel COPY streams with a manifest')
+    parser.add_argument('--out', metavar='DIR', help='output directory (default: ./db_backup_<timestamp>)')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help='tables exported in parallel')
+    parser.add_argument('--tables', nargs='+', metavar='TABLE', help=f"subset of: {' '.join(EXPORT_TABLES)}")
+    parser.add_argument('--verify', metavar='DIR', help='check an export directory against its manifest')
+    parser.set_defaults(func=main)
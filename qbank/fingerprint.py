@@ -0,0 +1,341 @@
+"""
+Merkle fingerprints of the bank tables, for comparing two databases cheaply.
+
+    python -m qbank fingerprint                                   # one line per table
+    python -m qbank fingerprint --against postgresql://localhost/qbank
+    python -m qbank fingerprint --against "$LOCAL_URL" --tables questions mcq_options
+
+Every hash is computed server-side. A row hashes to md5 of its columns'
+text (columns in name order, timestamps in UTC); a key range hashes to the
+row count plus two 60-bit sums of its row hashes. The sums make the tree
+additive: a node is the sum of its children, and any range is one
+aggregate over the primary-key index.
+
+With --against both databases are compared top-down. The whole-table
+hashes go first; only ranges whose hashes differ are split FANOUT ways,
+one query per tree level per side (width_bucket over the child
+boundaries). Ranges of at most LEAF_ROWS rows are then fetched as
+(id, row hash) pairs to name the rows that were added, removed or
+changed. Two 1M-row tables that differ in a handful of rows cost five or
+six levels of at most FANOUT buckets per differing range: kilobytes, not
+the table.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import psycopg2
+
+from qbank import db
+from qbank.export import EXPORT_TABLES
+
+FANOUT = 16
+LEAF_ROWS = 64
+# tables without an integer key are not split into ranges; up to this many
+# rows they are compared row by row, above it only the table hash is given
+TEXT_KEY_ROWS = 10_000
+KEY = 'id'
+INTEGER_TYPES = ('smallint', 'integer', 'bigint')
+
+# Over a subquery yielding (id, h = row md5). Such subqueries end in OFFSET 0
+# so the planner cannot inline them and compute the md5 once per lane.
+LANES_SQL = """
+    count(*),
+    coalesce(sum(('x' || substr(h, 1, 15))::bit(60)::bigint), 0),
+    coalesce(sum(('x' || substr(h, 16, 15))::bit(60)::bigint), 0)
+"""
+
+COLUMNS_SQL = """
+    SELECT column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = %s
+"""
+
+
+class Side:
+    """One database in a comparison; counts what crosses the wire."""
+    __slots__ = ('label', 'cursor', 'queries', 'rows', 'bytes')
+
+    def __init__(self, label, cursor):
+        self.label = label
+        self.cursor = cursor
+        self.queries = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def begin(self):
+        """A consistent, read-only view with the text forms pinned down."""
+        self.cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        self.cursor.execute("SET LOCAL TimeZone = 'UTC'")
+        self.cursor.execute("SET LOCAL DateStyle = 'ISO, YMD'")
+
+    def query(self, sql, params=()):
+        self.cursor.execute(sql, params)
+        rows = self.cursor.fetchall()
+        self.queries += 1
+        self.rows += len(rows)
+        self.bytes += sum(len(str(value)) for row in rows for value in row)
+        return rows
+
+    def columns(self, table):
+        return dict(self.query(COLUMNS_SQL, (table,)))
+
+
+def _row_hash(columns):
+    return f"md5(ROW({', '.join(f't.{_quote(c)}' for c in columns)})::text)"
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def root_hash(side, table, columns):
+    """(min key, max key, (count, lane, lane)) of the whole table."""
+    rows = side.query(
+        f"SELECT min(id), max(id), {LANES_SQL} "
+        f"FROM (SELECT t.{_quote(KEY)} AS id, {_row_hash(columns)} AS h FROM public.{_quote(table)} t OFFSET 0) s"
+    )
+    low, high, *lanes = rows[0]
+    return low, high, tuple(lanes)
+
+
+def key_bounds(side, table):
+    """(min key, max key) straight from the primary-key index."""
+    return side.query(f"SELECT min({_quote(KEY)}), max({_quote(KEY)}) FROM public.{_quote(table)}")[0]
+
+
+def level_hashes(side, table, columns, boundaries, nodes):
+    """
+    Hash every child range of `nodes` in one query.
+
+    `boundaries` is the sorted list of all child boundaries; the result maps
+    width_bucket's bucket number (the 1-based position of a child's lower
+    bound in `boundaries`) to (count, lane, lane).
+    """
+    rows = side.query(
+        f"SELECT width_bucket(id, %s::bigint[]), {LANES_SQL} FROM ("
+        f"  SELECT t.{_quote(KEY)} AS id, {_row_hash(columns)} AS h FROM public.{_quote(table)} t"
+        f"  JOIN unnest(%s::bigint[], %s::bigint[]) AS r(lo, hi)"
+        f"    ON t.{_quote(KEY)} >= r.lo AND t.{_quote(KEY)} < r.hi"
+        f"  OFFSET 0"
+        f") s GROUP BY 1",
+        (boundaries, [node[0] for node in nodes], [node[1] for node in nodes]),
+    )
+    return {bucket: tuple(lanes) for bucket, *lanes in rows}
+
+
+def leaf_rows(side, table, columns, nodes=None):
+    """{key: row hash} for the rows of `nodes` (every row when None)."""
+    select = f"SELECT t.{_quote(KEY)}, {_row_hash(columns)} FROM public.{_quote(table)} t"
+    if nodes is None:
+        return dict(side.query(select))
+    return dict(side.query(
+        select + f" JOIN unnest(%s::bigint[], %s::bigint[]) AS r(lo, hi)"
+                 f" ON t.{_quote(KEY)} >= r.lo AND t.{_quote(KEY)} < r.hi",
+        ([node[0] for node in nodes], [node[1] for node in nodes]),
+    ))
+
+
+def _children(low, high):
+    """Up to FANOUT contiguous sub-ranges of [low, high)."""
+    width = high - low
+    bounds = sorted({low + (i * width) // FANOUT for i in range(FANOUT + 1)})
+    return list(zip(bounds, bounds[1:]))
+
+
+class TableComparison:
+    __slots__ = (
+        'table', 'counts', 'identical', 'levels', 'added', 'removed', 'changed',
+        'columns_only', 'note',
+    )
+
+    def __init__(self, table, counts):
+        self.table = table
+        self.counts = counts
+        self.identical = False
+        self.levels = 0
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.columns_only = ([], [])
+        self.note = None
+
+
+def _total(hashes):
+    return tuple(sum(lanes[i] for lanes in hashes.values()) for i in range(3))
+
+
+def compare_table(local, other, table, both):
+    """
+    Compare one table top-down, descending only into differing ranges.
+
+    `both(fn, *args)` runs fn(local, *args) and fn(other, *args) (concurrently)
+    and returns both results.
+    """
+    local_columns, other_columns = both(Side.columns, table)
+    columns = sorted(set(local_columns) & set(other_columns))
+    columns_only = (
+        sorted(set(local_columns) - set(other_columns)),
+        sorted(set(other_columns) - set(local_columns)),
+    )
+
+    if local_columns.get(KEY) not in INTEGER_TYPES:
+        (_, _, lanes_a), (_, _, lanes_b) = both(root_hash, table, columns)
+        result = TableComparison(table, (lanes_a[0], lanes_b[0]))
+        result.columns_only = columns_only
+        if lanes_a == lanes_b:
+            result.identical = True
+        elif max(result.counts) > TEXT_KEY_ROWS:
+            result.note = f"no integer {KEY}; only the table hash was compared"
+        else:
+            _diff_leaves(result, *both(leaf_rows, table, columns))
+        return result
+
+    # the first split covers the whole key range, so the table hash is the
+    # sum of its buckets and no separate whole-table pass is needed
+    bounds = [v for pair in both(key_bounds, table) for v in pair if v is not None]
+    nodes = [(min(bounds), max(bounds) + 1, None)] if bounds else []
+    result = None if bounds else TableComparison(table, (0, 0))
+    leaves = []
+    while nodes:
+        split = []
+        for node in nodes:
+            # the root (count unknown yet) is always split
+            if node[2] is None or (node[2] > LEAF_ROWS and node[1] - node[0] > 1):
+                split.append(node)
+            else:
+                leaves.append(node)
+        if not split:
+            break
+        children = [child for low, high, _ in split for child in _children(low, high)]
+        boundaries = sorted({bound for child in children for bound in child})
+        bucket_of = {bound: i for i, bound in enumerate(boundaries, 1)}
+        hashes_a, hashes_b = both(level_hashes, table, columns, boundaries, split)
+        if result is None:
+            lanes_a, lanes_b = _total(hashes_a), _total(hashes_b)
+            result = TableComparison(table, (lanes_a[0], lanes_b[0]))
+            if lanes_a == lanes_b:
+                result.identical = True
+                break
+        result.levels += 1
+        nodes = []
+        for low, high in children:
+            a, b = hashes_a.get(bucket_of[low]), hashes_b.get(bucket_of[low])
+            if a != b:
+                nodes.append((low, high, max(a[0] if a else 0, b[0] if b else 0)))
+
+    result.identical = result.identical or not bounds
+    result.columns_only = columns_only
+    if leaves and not result.identical:
+        _diff_leaves(result, *both(leaf_rows, table, columns, leaves))
+    return result
+
+
+def _diff_leaves(result, local_rows, other_rows):
+    result.added = sorted(key for key in other_rows if key not in local_rows)
+    result.removed = sorted(key for key in local_rows if key not in other_rows)
+    result.changed = sorted(key for key, h in local_rows.items() if key in other_rows and other_rows[key] != h)
+
+
+@contextmanager
+def paired(local, other):
+    """Yield both(fn, *args): fn(local, *args) and fn(other, *args), run concurrently."""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        def both(fn, *args):
+            future = executor.submit(fn, other, *args)
+            return fn(local, *args), future.result()
+        yield both
+
+
+def tables_present(side, wanted):
+    present = {row[0] for row in side.query(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'"
+    )}
+    return [table for table in (wanted or EXPORT_TABLES) if table in present]
+
+
+def _hex(lanes):
+    # sums of 60-bit lanes over many rows outgrow 15 hex digits; keep the low bits
+    return f"{int(lanes[1]) % (1 << 60):015x}{int(lanes[2]) % (1 << 60):015x}"
+
+
+def _ids(keys, limit=10):
+    shown = ', '.join(str(key) for key in keys[:limit])
+    return shown + (f" ... (+{len(keys) - limit})" if len(keys) > limit else '')
+
+
+def fingerprint_main(args, conn):
+    with conn.cursor() as cursor:
+        side = Side('local', cursor)
+        side.begin()
+        for table in tables_present(side, args.tables):
+            columns = sorted(side.columns(table))
+            _, _, lanes = root_hash(side, table, columns)
+            print(f"   {table:20s} {lanes[0]:>9} rows  {_hex(lanes)}")
+    conn.rollback()
+    return 0
+
+
+def compare_main(args, conn):
+    try:
+        other_conn = psycopg2.connect(**db.resolve_dsn(database_url=args.against))
+    except (RuntimeError, psycopg2.Error) as e:
+        print(f"❌ Cannot connect to {args.against}: {e}")
+        return 2
+    try:
+        with conn.cursor() as cursor_a, other_conn.cursor() as cursor_b:
+            local = Side(db.describe(conn.get_dsn_parameters()), cursor_a)
+            other = Side(db.describe(other_conn.get_dsn_parameters()), cursor_b)
+            local.begin()
+            other.begin()
+            print(f"🔍 {local.label} vs {other.label}")
+            tables_b = set(tables_present(other, args.tables))
+            with paired(local, other) as both:
+                results = [
+                    compare_table(local, other, table, both)
+                    for table in tables_present(local, args.tables) if table in tables_b
+                ]
+    finally:
+        conn.rollback()
+        other_conn.close()
+
+    differing = 0
+    for result in results:
+        only_a, only_b = result.columns_only
+        if result.identical:
+            print(f"✅ {result.table:20s} {result.counts[0]:>9} rows, identical")
+        else:
+            differing += 1
+            rows = len(result.added) + len(result.removed) + len(result.changed)
+            print(f"❌ {result.table:20s} {result.counts[0]:>9} vs {result.counts[1]} rows, "
+                  f"{rows} row(s) differ ({result.levels} level(s) descended)")
+            if result.note:
+                print(f"      {result.note}")
+            for label, keys in (('only here', result.removed), ('only there', result.added),
+                                ('changed', result.changed)):
+                if keys:
+                    print(f"      {label:10s} {KEY} {_ids(keys)}")
+        if only_a or only_b:
+            print(f"      columns not compared: {', '.join(only_a + only_b)}")
+
+    for side in (local, other):
+        print(f"   {side.label}: {side.queries} queries, {side.rows} rows, ~{side.bytes / 1024:.1f} KB fetched")
+    print(f"{'❌' if differing else '✅'} {differing} of {len(results)} table(s) differ")
+    return 1 if differing else 0
+
+
+def main(args):
+    if os.getenv(db.SNAPSHOT_ENV):
+        print("❌ fingerprint hashes on the server; it cannot run against an offline snapshot")
+        return 2
+    with db.connection() as conn:
+        if args.against:
+            return compare_main(args, conn)
+        return fingerprint_main(args, conn)
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('fingerprint', help='Merkle table fingerprints; compare two databases by range')
+    parser.add_argument('--against', metavar='DATABASE_URL', help='compare with this database')
+    parser.add_argument('--tables', nargs='+', metavar='TABLE', help=f"subset of: {' '.join(EXPORT_TABLES)}")
+    parser.set_defaults(func=main)
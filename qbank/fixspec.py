@@ -0,0 +1,160 @@
+"""
+Declarative batch fixes for answer rows.
+
+    python -m qbank fix fixes.json --dry-run        # show what would change
+    python -m qbank fix fixes.json                  # apply (journaled)
+    python -m qbank revert <run>                    # undo it
+
+A fix spec is a JSON file keyed by question type, then question id:
+
+    {
+      "mcq":       {"74": 2, "46": 1},           # option_order of the correct option
+      "fill":      {"142": "1722"},              # the accepted answer
+      "truefalse": {"12": false},                # the correct answer
+      "reorder":   {"163": [2, 1, 4, 3]}         # correct_position of each item, in item_order order
+    }
+
+The whole spec goes through the bulk writer in one transaction (one COPY and
+one UPDATE per type, however many questions it names). The answer rows of
+every question in the spec go to the undo journal (qbank/journal.py) first.
+"""
+import json
+import os
+
+from qbank import db
+from qbank.journal import journaled, run_id
+from qbank.writer import (
+    stage_and_apply_fill, stage_and_apply_mcq, stage_and_apply_reorder, stage_and_apply_truefalse,
+)
+
+# spec section -> (answer table, bulk writer)
+FIX_KINDS = {
+    'mcq': ('mcq_options', stage_and_apply_mcq),
+    'fill': ('fill_answers', stage_and_apply_fill),
+    'truefalse': ('truefalse_answers', stage_and_apply_truefalse),
+    'reorder': ('reorder_items', stage_and_apply_reorder),
+}
+
+
+def _check_mcq(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"expected an option_order, got {value!r}")
+    return value
+
+
+def _check_fill(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"expected a non-empty answer, got {value!r}")
+    return value
+
+
+def _check_truefalse(value):
+    if not isinstance(value, bool):
+        raise ValueError(f"expected true or false, got {value!r}")
+    return value
+
+
+def _check_reorder(value):
+    if not isinstance(value, list) or sorted(value) != list(range(1, len(value) + 1)):
+        raise ValueError(f"expected a permutation of 1..n, got {value!r}")
+    return value
+
+
+CHECKS = {
+    'mcq': _check_mcq,
+    'fill': _check_fill,
+    'truefalse': _check_truefalse,
+    'reorder': _check_reorder,
+}
+
+
+class FixSpec:
+    __slots__ = ('fixes',)
+
+    def __init__(self, fixes=None):
+        self.fixes = {kind: dict((fixes or {}).get(kind) or {}) for kind in FIX_KINDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Validate a decoded spec; every problem is reported at once."""
+        unknown = set(data) - set(FIX_KINDS)
+        errors = [f"unknown section {kind!r}" for kind in sorted(unknown)]
+        fixes = {}
+        for kind, check in CHECKS.items():
+            fixes[kind] = {}
+            for question_id, value in (data.get(kind) or {}).items():
+                try:
+                    fixes[kind][int(question_id)] = check(value)
+                except ValueError as e:
+                    errors.append(f"{kind} {question_id}: {e}")
+        if errors:
+            raise ValueError("Invalid fix spec:\n  " + "\n  ".join(errors))
+        return cls(fixes)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def __len__(self):
+        return sum(len(values) for values in self.fixes.values())
+
+    def question_ids(self, kind=None):
+        kinds = [kind] if kind else FIX_KINDS
+        return sorted({question_id for k in kinds for question_id in self.fixes[k]})
+
+
+def apply_fix_spec(conn, spec, dry_run=False, command='fix'):
+    """
+    Apply every fix of `spec` in one journaled transaction.
+
+    Returns ({kind: WriteResult}, journal path or None when nothing was
+    recorded, e.g. on a dry run).
+    """
+    results = {}
+    with journaled(conn, command, dry_run=dry_run) as (cursor, journal):
+        for kind, (_, apply) in FIX_KINDS.items():
+            if spec.fixes[kind]:
+                results[kind] = apply(cursor, spec.fixes[kind].items(), journal)
+    return results, journal.path
+
+
+def print_results(results, limit=20):
+    for kind, result in results.items():
+        print(f"   {kind:10s} staged {result.staged}, changed {result.questions_changed} question(s)"
+              f" ({len(result.changed)} row(s)), rejected {len(result.rejected)}")
+        for row in result.changed[:limit]:
+            print(f"      Q{row[1]:<6} row {row[0]} -> {row[2:]}")
+        if len(result.changed) > limit:
+            print(f"      ... and {len(result.changed) - limit} more")
+        for row in result.rejected:
+            print(f"      ⚠️  rejected Q{row[0]}: {row[1:]}")
+
+
+def main(args):
+    try:
+        spec = FixSpec.load(args.spec)
+    except ValueError as e:
+        print(f"❌ {args.spec}: {e}")
+        return 2
+    print(f"📄 {args.spec}: {len(spec)} fix(es) for {len(spec.question_ids())} question(s)")
+
+    with db.connection() as conn:
+        results, journal_path = apply_fix_spec(
+            conn, spec, dry_run=args.dry_run, command=f"fix {os.path.basename(args.spec)}",
+        )
+
+    print_results(results)
+    changed = sum(r.questions_changed for r in results.values())
+    verb = "Would change" if args.dry_run else "Changed"
+    print(f"✅ {verb} {changed} question(s) in one transaction")
+    if journal_path:
+        print(f"📝 Journaled as {run_id(journal_path)} (undo with: python -m qbank revert {run_id(journal_path)})")
+    return 1 if any(r.rejected for r in results.values()) else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('fix', help='apply a declarative fix spec in one batched transaction')
+    parser.add_argument('spec', help='JSON fix spec: {"mcq": {"74": 2}, "fill": {...}, ...}')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.set_defaults(func=main, writes=True)
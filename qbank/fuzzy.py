@@ -0,0 +1,158 @@
+"""
+Trigram fuzzy matching for workbook rows whose text drifted from the DB.
+
+    python -m qbank relink                       # drifted rows and the question each belongs to
+    python -m qbank relink --threshold 0.7 --workbook X.xlsx
+
+A row whose question text was edited (punctuation, a typo fix) no longer
+hashes to its question and used to come out as NOT FOUND IN DB. relink()
+takes the rows reconcile() left missing and the questions no row matched,
+indexes those questions' texts once in an inverted index of character
+trigrams, and scores every missing row against it:
+
+  - similarity is the Dice coefficient of the two trigram sets,
+  - candidates come from the posting lists of the row's rarest trigrams
+    only: a question reaching the threshold must share enough trigrams
+    with the row that it appears in one of those lists,
+  - rows and questions are paired greedily, best score first, so each
+    question is re-linked to at most one row.
+
+Everything runs on the bank already in memory; no query is issued.
+"""
+import time
+from math import ceil
+
+from qbank import db
+from qbank.bank import load_bank
+from qbank.normalize import normalize_text
+from qbank.reconcile import COMPARATORS, reconcile
+from qbank.workbook import DEFAULT_WORKBOOK
+from qbank.workbook_cache import load_cached
+
+DEFAULT_THRESHOLD = 0.8
+# candidates scored per row before the greedy pairing
+CANDIDATES = 3
+
+
+def trigrams(text):
+    """Character trigrams of the normalized text, padded so short words still count."""
+    text = f"  {normalize_text(text)} "
+    return frozenset(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class TrigramIndex:
+    """Inverted index trigram -> positions of the items whose text contains it."""
+    __slots__ = ('items', 'grams', 'sizes', 'postings')
+
+    def __init__(self, items, text=lambda item: item):
+        self.items = list(items)
+        self.grams = [trigrams(text(item)) for item in self.items]
+        self.sizes = [len(grams) for grams in self.grams]
+        self.postings = {}
+        for position, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, text, threshold=DEFAULT_THRESHOLD, limit=CANDIDATES):
+        """Best `limit` (score, item) with a Dice similarity of at least `threshold`."""
+        grams = trigrams(text)
+        size = len(grams)
+        threshold -= 1e-9  # keep exact ties when the bounds below land on integers
+        # Dice >= t needs a shared count >= t * size / (2 - t); scanning all but
+        # (that count - 1) of the row's trigrams is then enough to meet every
+        # such item, so skip the most common ones.
+        shared = max(1, ceil(threshold * size / (2 - threshold)))
+        rarest = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))[:size - shared + 1]
+        candidates = set()
+        for gram in rarest:
+            candidates.update(self.postings.get(gram, ()))
+
+        low, high = threshold * size / (2 - threshold), (2 - threshold) * size / threshold
+        item_grams, sizes = self.grams, self.sizes
+        scored = []
+        for position in candidates:
+            other = sizes[position]
+            if low <= other <= high:
+                score = 2 * len(grams.intersection(item_grams[position])) / (size + other)
+                if score >= threshold:
+                    scored.append((score, position))
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return [(score, self.items[position]) for score, position in scored[:limit]]
+
+
+def relink(result, threshold=DEFAULT_THRESHOLD):
+    """
+    Re-link the missing rows of a Reconciliation to the unmatched questions.
+
+    Works in place: each re-linked row moves from `missing` to `matched` and
+    `relinked` (record, question, score), its question leaves `extra`, and
+    the row is compared like any other match. Returns the new links.
+    """
+    if not result.missing or not result.extra:
+        return []
+    indexes = {}
+    for question in result.extra:
+        indexes.setdefault(question.qtype, []).append(question)
+    indexes = {qtype: TrigramIndex(questions, lambda q: q.text) for qtype, questions in indexes.items()}
+
+    proposals = []
+    for position, record in enumerate(result.missing):
+        index = indexes.get(record.qtype)
+        if index is not None:
+            for score, question in index.search(record.question, threshold):
+                proposals.append((score, position, question))
+    proposals.sort(key=lambda proposal: (-proposal[0], proposal[1], proposal[2].id))
+
+    linked, taken, links = set(), set(), []
+    for score, position, question in proposals:
+        if position in linked or question.id in taken:
+            continue
+        linked.add(position)
+        taken.add(question.id)
+        links.append((result.missing[position], question, score))
+
+    for record, question, score in links:
+        result.matched.append((record, question))
+        result.differences.extend(COMPARATORS[record.qtype](record, question))
+    result.relinked.extend(links)
+    result.missing = [record for position, record in enumerate(result.missing) if position not in linked]
+    result.extra = [question for question in result.extra if question.id not in taken]
+    return links
+
+
+def main(args):
+    if not 0 < args.threshold <= 1:
+        print(f"❌ --threshold must be in (0, 1], not {args.threshold}")
+        return 2
+    workbook_path = args.workbook or DEFAULT_WORKBOOK
+    sheets = load_cached(workbook_path)
+    with db.connection() as conn:
+        bank = load_bank(conn)
+    result = reconcile(sheets, bank)
+    missing = len(result.missing)
+
+    started = time.perf_counter()
+    links = relink(result, args.threshold)
+    elapsed = time.perf_counter() - started
+
+    print(f"🔍 {missing} row(s) not found verbatim, {len(links)} re-linked at >= {args.threshold:.0%} similarity")
+    for record, question, score in sorted(links, key=lambda link: (link[0].qtype, link[0].row)):
+        print(f"   Row {record.row:<5} {record.qtype:9s} -> ID {question.id:<6} {score:.0%}")
+        print(f"      Excel: {record.question[:70]!r}")
+        print(f"      DB:    {str(question.text)[:70]!r}")
+    for record in result.missing:
+        print(f"   ⚠️  Row {record.row:<5} {record.qtype:9s} no question close enough: {record.question[:50]!r}")
+    per_row = elapsed / missing * 1000 if missing else 0.0
+    print(f"✅ Matched in {elapsed * 1000:.1f} ms ({per_row:.3f} ms per row), no extra queries")
+    return 1 if result.missing else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('relink', help='fuzzy-match workbook rows whose text drifted from the DB')
+    parser.add_argument('--workbook', help=f'path to the question workbook (default: {DEFAULT_WORKBOOK})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'minimum trigram similarity, 0-1 (default: {DEFAULT_THRESHOLD})')
+    parser.set_defaults(func=main)
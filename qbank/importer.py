@@ -0,0 +1,297 @@
+"""
+Idempotent workbook import, keyed on questions.content_hash.
+
+    python -m qbank import --workbook Questions.xlsx --dry-run
+    python -m qbank import --workbook Questions.xlsx --created-by MIE
+
+The web route (app/api/import-excel) inserts every row it is given, so
+importing the same workbook twice duplicates the whole bank. Here every
+workbook row is hashed with reconcile.question_hash() and the questions are
+upserted on the unique content_hash index, set-based:
+
+  - known content only has instruction, image_url and timer_seconds
+    updated, and only where the workbook gives a different value (a blank
+    cell keeps what is stored),
+  - new content is inserted (ON CONFLICT (content_hash) DO NOTHING), with
+    its answer rows (one COPY per table),
+  - everything else is left alone, so an unchanged workbook writes nothing.
+
+The run is journaled (qbank/journal.py): "revert" restores the updated
+questions and deletes the inserted ones with their answer rows.
+
+Answer rows of questions that already exist are not rewritten; answer
+corrections go through "plan" / "apply" as before. Rows are validated as
+the web route does (four MCQ options and a resolvable correct answer, two
+complete matching pairs, two reorder steps, ...). External image URLs are
+stored as given; only the web route downloads them.
+"""
+import psycopg2
+
+from qbank import db
+from qbank.bank import McqOption
+from qbank.contenthash import has_index, print_refresh, refresh_hashes
+from qbank.journal import journaled, run_id
+from qbank.normalize import normalize_text
+from qbank.reconcile import expected_mcq_option, question_hash
+from qbank.workbook import DEFAULT_WORKBOOK, SHEET_TYPES
+from qbank.workbook_cache import load_cached
+
+CREATED_BY = ('MES', 'MIE')
+DEFAULT_TIMER = 30
+
+IMPORT_STAGE_SQL = """
+    CREATE TEMP TABLE import_question_stage (
+        content_hash TEXT PRIMARY KEY,
+        subject_id BIGINT NOT NULL,
+        level_id BIGINT NOT NULL,
+        question_type_id BIGINT NOT NULL,
+        question_text TEXT NOT NULL,
+        instruction TEXT,
+        image_url TEXT,
+        timer_seconds INT,
+        created_by VARCHAR(100)
+    ) ON COMMIT DROP
+"""
+
+IMPORT_KNOWN_SQL = """
+    SELECT q.id FROM questions q JOIN import_question_stage s ON q.content_hash = s.content_hash
+"""
+
+# A blank workbook cell keeps the stored value.
+IMPORT_UPDATE_SQL = """
+    UPDATE questions q
+    SET instruction = COALESCE(s.instruction, q.instruction),
+        image_url = COALESCE(s.image_url, q.image_url),
+        timer_seconds = COALESCE(s.timer_seconds, q.timer_seconds),
+        updated_at = NOW()
+    FROM import_question_stage s
+    WHERE q.content_hash = s.content_hash
+      AND (q.instruction, q.image_url, q.timer_seconds) IS DISTINCT FROM
+          (COALESCE(s.instruction, q.instruction), COALESCE(s.image_url, q.image_url),
+           COALESCE(s.timer_seconds, q.timer_seconds))
+    RETURNING q.id, q.content_hash
+"""
+
+IMPORT_INSERT_SQL = f"""
+    INSERT INTO questions (content_hash, subject_id, level_id, question_type_id, question_text,
+                           instruction, image_url, timer_seconds, created_by)
+    SELECT content_hash, subject_id, level_id, question_type_id, question_text,
+           instruction, image_url, COALESCE(timer_seconds, {DEFAULT_TIMER}), created_by
+    FROM import_question_stage
+    ON CONFLICT (content_hash) DO NOTHING
+    RETURNING id, content_hash
+"""
+
+# question type -> (answer table, columns after question_id)
+ANSWER_COLUMNS = {
+    'mcq': ('mcq_options', ('option_order', 'option_text', 'is_correct')),
+    'matching': ('matching_pairs', ('pair_order', 'left_item', 'right_item')),
+    'fill': ('fill_answers', ('answer_text', 'case_sensitive')),
+    'reorder': ('reorder_items', ('item_order', 'item_text', 'correct_position')),
+    'truefalse': ('truefalse_answers', ('correct_answer', 'explanation')),
+}
+
+
+def _mcq_answers(record):
+    if not all(record.options):
+        missing = [label for label, text in zip('ABCD', record.options) if not text]
+        raise ValueError(f"missing option(s) {', '.join(missing)}")
+    options = [McqOption(None, None, order, text, False) for order, text in enumerate(record.options, 1)]
+    correct = expected_mcq_option(record, options)
+    if correct is None:
+        raise ValueError(f"correct answer {record.correct_answer!r} matches no option")
+    return [(o.option_order, o.option_text, o is correct) for o in options]
+
+
+def _matching_answers(record):
+    pairs = [(left, right) for left, right in record.pairs if left and right]
+    if len(pairs) < 2:
+        raise ValueError(f"{len(pairs)} complete matching pair(s), at least 2 needed")
+    return [(order, left, right) for order, (left, right) in enumerate(pairs, 1)]
+
+
+def _fill_answers(record):
+    if not record.answer:
+        raise ValueError("empty answer")
+    return [(record.answer, False)]
+
+
+def _reorder_answers(record):
+    if len(record.steps) < 2:
+        raise ValueError(f"{len(record.steps)} step(s), at least 2 needed")
+    # workbook steps are listed in their correct order
+    return [(order, step, order) for order, step in enumerate(record.steps, 1)]
+
+
+def _truefalse_answers(record):
+    value = normalize_text(record.is_true)
+    if value not in ('true', 'false'):
+        raise ValueError(f"isTrue must be True or False, not {record.is_true!r}")
+    return [(value == 'true', None)]
+
+
+ANSWER_BUILDERS = {
+    'mcq': _mcq_answers,
+    'matching': _matching_answers,
+    'fill': _fill_answers,
+    'reorder': _reorder_answers,
+    'truefalse': _truefalse_answers,
+}
+
+
+def _timer(value):
+    try:
+        return int(value) or None
+    except (TypeError, ValueError):
+        return None
+
+
+class ImportResult:
+    __slots__ = ('inserted', 'updated', 'unchanged', 'rejected', 'duplicates', 'refresh', 'journal_path')
+
+    def __init__(self):
+        self.inserted = []    # (record, question id)
+        self.updated = []     # (record, question id)
+        self.unchanged = 0
+        self.rejected = []    # (sheet name, record, reason)
+        self.duplicates = []  # (sheet name, record, row it repeats)
+        self.refresh = None   # contenthash.HashRefresh of the run
+        self.journal_path = None
+
+
+def _lookups(cursor):
+    """
+    Subject, level and question type ids. Subjects are keyed on
+    normalize_text(), the form workbook subjects are looked up (and hashed)
+    in; when variant rows share a key (see "canonicalize") the lowest id wins.
+    """
+    cursor.execute("SELECT name, id FROM subjects ORDER BY id")
+    subjects = {}
+    for name, subject_id in cursor.fetchall():
+        subjects.setdefault(normalize_text(name), subject_id)
+    cursor.execute("SELECT level_number, id FROM levels")
+    levels = dict(cursor.fetchall())
+    cursor.execute("SELECT name, id FROM question_types")
+    return subjects, levels, dict(cursor.fetchall())
+
+
+def stage_records(sheets, subjects, levels, qtypes, created_by, result):
+    """Validate every record. Returns {hash: (record, stage row, answer rows)} in workbook order."""
+    staged = {}
+    for sheet_name, record_cls in SHEET_TYPES.items():
+        for record in sheets.get(sheet_name, ()):
+            try:
+                subject_id = subjects.get(normalize_text(record.subject))
+                if subject_id is None:
+                    raise ValueError(f"unknown subject {record.subject!r}")
+                level_id = levels.get(record.level)
+                if level_id is None:
+                    raise ValueError(f"unknown level {record.level!r}")
+                type_id = qtypes.get(record_cls.qtype)
+                if type_id is None:
+                    raise ValueError(f"question type {record_cls.qtype!r} is not in the database")
+                answers = ANSWER_BUILDERS[record_cls.qtype](record)
+            except ValueError as e:
+                result.rejected.append((sheet_name, record, str(e)))
+                continue
+            digest = question_hash(record.subject, record.level, record_cls.qtype, record.question)
+            if digest in staged:
+                result.duplicates.append((sheet_name, record, staged[digest][0].row))
+                continue
+            row = (digest, subject_id, level_id, type_id, record.question,
+                   record.instruction or None, record.image_url or None, _timer(record.timer), created_by)
+            staged[digest] = (record, row, answers)
+    return staged
+
+
+def import_records(conn, sheets, created_by='MES', dry_run=False):
+    """
+    Upsert the workbook's questions on content_hash in one journaled transaction.
+
+    Returns an ImportResult; `dry_run` rolls everything back. The questions
+    rows an update overwrites are journaled, as are the ids of the inserted
+    questions, so "revert" restores the first and deletes the second (with
+    their answer rows). The hash refresh that runs first is not journaled:
+    it only rewrites a value derived from the other columns.
+    """
+    result = ImportResult()
+    with journaled(conn, 'import', dry_run=dry_run) as (cursor, journal):
+        if not has_index(cursor):
+            raise RuntimeError("questions.content_hash is not set up yet (run: python -m qbank content-hash)")
+        result.refresh = refresh_hashes(cursor)
+        staged = stage_records(sheets, *_lookups(cursor), created_by, result)
+
+        cursor.execute(IMPORT_STAGE_SQL)
+        db.copy_rows(
+            cursor, 'import_question_stage',
+            ('content_hash', 'subject_id', 'level_id', 'question_type_id', 'question_text',
+             'instruction', 'image_url', 'timer_seconds', 'created_by'),
+            (row for _, row, _ in staged.values()),
+        )
+        cursor.execute(IMPORT_KNOWN_SQL)
+        captured = journal.capture(cursor, 'questions', [row[0] for row in cursor.fetchall()])
+        cursor.execute(IMPORT_UPDATE_SQL)
+        result.updated = [(staged[digest][0], question_id) for question_id, digest in cursor.fetchall()]
+        journal.discard('questions', captured - {question_id for _, question_id in result.updated})
+        cursor.execute(IMPORT_INSERT_SQL)
+        answers = {qtype: [] for qtype in ANSWER_COLUMNS}
+        for question_id, digest in cursor.fetchall():
+            record, _, rows = staged[digest]
+            result.inserted.append((record, question_id))
+            answers[record.qtype].extend((question_id,) + row for row in rows)
+        if result.inserted:
+            journal.created(cursor, 'questions', [question_id for _, question_id in result.inserted])
+        result.unchanged = len(staged) - len(result.inserted) - len(result.updated)
+
+        for qtype, rows in answers.items():
+            if rows:
+                table, columns = ANSWER_COLUMNS[qtype]
+                db.copy_rows(cursor, table, ('question_id',) + columns, rows)
+    result.journal_path = journal.path
+    result.inserted.sort(key=lambda pair: pair[1])
+    return result
+
+
+def main(args):
+    created_by = args.created_by.strip().upper()
+    if created_by not in CREATED_BY:
+        print(f"❌ --created-by must be one of {', '.join(CREATED_BY)}, not {args.created_by!r}")
+        return 2
+    workbook_path = args.workbook or DEFAULT_WORKBOOK
+    sheets = load_cached(workbook_path)
+    rows = sum(len(records) for records in sheets.values())
+    print(f"📄 {workbook_path}: {rows} row(s)")
+
+    with db.connection() as conn:
+        try:
+            result = import_records(conn, sheets, created_by=created_by, dry_run=args.dry_run)
+        except (RuntimeError, psycopg2.Error) as e:
+            print(f"❌ {e}")
+            return 2
+
+    if result.refresh.written:
+        print(f"📝 Refreshed {result.refresh.written} stored content hash(es) first")
+    print_refresh(result.refresh)
+    for sheet_name, record, reason in result.rejected:
+        print(f"   ⚠️  {sheet_name} row {record.row}: {reason}")
+    for sheet_name, record, first in result.duplicates:
+        print(f"   ⚠️  {sheet_name} row {record.row}: same question as row {first}, skipped")
+    for record, question_id in result.inserted[:20]:
+        print(f"   + Q{question_id:<6} {record.qtype:9s} {record.question[:60]!r}")
+    if len(result.inserted) > 20:
+        print(f"   ... and {len(result.inserted) - 20} more")
+    verb = "Would import" if args.dry_run else "Imported"
+    print(f"✅ {verb} {len(result.inserted)} new question(s), updated {len(result.updated)}, "
+          f"{result.unchanged} already present; rejected {len(result.rejected)}")
+    if result.journal_path:
+        print(f"📝 Journaled as {run_id(result.journal_path)} (undo with: python -m qbank revert "
+              f"{run_id(result.journal_path)})")
+    return 1 if result.rejected else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('import', help='import a workbook idempotently (upsert on content hash)')
+    parser.add_argument('--workbook', help=f'path to the question workbook (default: {DEFAULT_WORKBOOK})')
+    parser.add_argument('--created-by', default='MES', help='author recorded on new questions: MES or MIE')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.set_defaults(func=main, writes=True)
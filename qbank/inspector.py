@@ -0,0 +1,237 @@
+"""
+Bulk question inspector.
+
+    python -m qbank inspect 107 142 46,74 100-120
+    python -m qbank inspect --type fill --search "Denis de Nyon"
+    python -m qbank inspect --subject history --level 2 --format json > dump.json
+
+Every selected question comes back from one query with all of its answer
+rows (from every answer table, so misplaced rows show up too) attached as
+JSON, so inspecting 500 questions is one round trip.
+"""
+import json
+
+from qbank import db
+
+# table -> JSON object built for each child row, and its ORDER BY
+CHILD_JSON = {
+    'mcq_options': (
+        "json_build_object('id', c.id, 'order', c.option_order, 'text', c.option_text, 'correct', c.is_correct)",
+        'c.option_order',
+    ),
+    'matching_pairs': (
+        "json_build_object('id', c.id, 'order', c.pair_order, 'left', c.left_item, 'right', c.right_item)",
+        'c.pair_order',
+    ),
+    'fill_answers': (
+        "json_build_object('id', c.id, 'text', c.answer_text, 'case_sensitive', c.case_sensitive, "
+        "'created_at', c.created_at)",
+        'c.id',
+    ),
+    'reorder_items': (
+        "json_build_object('id', c.id, 'order', c.item_order, 'text', c.item_text, 'position', c.correct_position)",
+        'c.item_order',
+    ),
+    'truefalse_answers': (
+        "json_build_object('id', c.id, 'correct', c.correct_answer, 'explanation', c.explanation)",
+        'c.id',
+    ),
+}
+
+# SQLite (offline snapshot) spelling of CHILD_JSON: json_object, and booleans
+# stored as 0/1 turned back into JSON true/false.
+SQLITE_CHILD_JSON = {
+    'mcq_options': (
+        "json_object('id', c.id, 'order', c.option_order, 'text', c.option_text, "
+        "'correct', json(CASE WHEN c.is_correct THEN 'true' ELSE 'false' END))",
+        'c.option_order',
+    ),
+    'matching_pairs': (
+        "json_object('id', c.id, 'order', c.pair_order, 'left', c.left_item, 'right', c.right_item)",
+        'c.pair_order',
+    ),
+    'fill_answers': (
+        "json_object('id', c.id, 'text', c.answer_text, "
+        "'case_sensitive', json(CASE WHEN c.case_sensitive THEN 'true' ELSE 'false' END), "
+        "'created_at', c.created_at)",
+        'c.id',
+    ),
+    'reorder_items': (
+        "json_object('id', c.id, 'order', c.item_order, 'text', c.item_text, 'position', c.correct_position)",
+        'c.item_order',
+    ),
+    'truefalse_answers': (
+        "json_object('id', c.id, 'correct', json(CASE WHEN c.correct_answer THEN 'true' ELSE 'false' END), "
+        "'explanation', c.explanation)",
+        'c.id',
+    ),
+}
+
+QUESTION_COLUMNS = (
+    'id', 'subject', 'level', 'type', 'question_text', 'instruction', 'image_url',
+    'timer_seconds', 'created_at', 'updated_at',
+)
+
+INSPECT_SQL = """
+    SELECT q.id, s.name, l.level_number, qt.name, q.question_text, q.instruction, q.image_url,
+           q.timer_seconds, q.created_at, q.updated_at,
+           {children}
+    FROM questions q
+    LEFT JOIN subjects s ON q.subject_id = s.id
+    LEFT JOIN levels l ON q.level_id = l.id
+    LEFT JOIN question_types qt ON q.question_type_id = qt.id
+    {where}
+    ORDER BY q.id
+    {limit}
+"""
+
+
+def _children_sql(sqlite=False):
+    if sqlite:
+        return ',\n           '.join(
+            f"(SELECT json_group_array(json(o)) FROM (SELECT {obj} AS o "
+            f"FROM {table} c WHERE c.question_id = q.id ORDER BY {order_by})) AS {table}"
+            for table, (obj, order_by) in SQLITE_CHILD_JSON.items()
+        )
+    return ',\n           '.join(
+        f"(SELECT COALESCE(json_agg({obj} ORDER BY {order_by}), '[]') "
+        f"FROM {table} c WHERE c.question_id = q.id) AS {table}"
+        for table, (obj, order_by) in CHILD_JSON.items()
+    )
+
+
+def parse_ids(specs):
+    """['107', '46,74', '100-120'] -> sorted list of ids."""
+    ids = set()
+    for spec in specs:
+        for part in str(spec).split(','):
+            part = part.strip()
+            if not part:
+                continue
+            if '-' in part:
+                start, end = (int(x) for x in part.split('-', 1))
+                ids.update(range(start, end + 1))
+            else:
+                ids.add(int(part))
+    return sorted(ids)
+
+
+def inspect_questions(conn, ids=None, subject=None, level=None, qtype=None, search=None, limit=None):
+    """
+    Fetch questions plus every answer row in one query.
+
+    `search` is a substring or a list of substrings (any may match). Returns a
+    list of dicts with the question columns and one list per answer table
+    (empty when the question has no rows in it).
+    """
+    clauses, params = [], []
+    if ids:
+        clauses.append("q.id = ANY(%s)")
+        params.append(list(ids))
+    if subject:
+        clauses.append("lower(s.name) = lower(%s)")
+        params.append(subject)
+    if level is not None:
+        clauses.append("l.level_number = %s")
+        params.append(level)
+    if qtype:
+        clauses.append("qt.name = %s")
+        params.append(qtype)
+    if search:
+        terms = [search] if isinstance(search, str) else list(search)
+        clauses.append("q.question_text ILIKE ANY(%s)")
+        params.append([f"%{term}%" for term in terms])
+    sqlite = db.dialect(conn) == 'sqlite'
+    sql = INSPECT_SQL.format(
+        children=_children_sql(sqlite),
+        where=f"WHERE {' AND '.join(clauses)}" if clauses else "",
+        limit="LIMIT %s" if limit else "",
+    )
+    if limit:
+        params.append(limit)
+
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params or None)
+        rows = cursor.fetchall()
+
+    columns = QUESTION_COLUMNS + tuple(CHILD_JSON)
+    questions = [dict(zip(columns, row)) for row in rows]
+    if sqlite:
+        for question in questions:
+            for table in CHILD_JSON:
+                question[table] = json.loads(question[table])
+    return questions
+
+
+def format_question(question):
+    """Human-readable dump of one inspected question."""
+    lines = [
+        f"ID {question['id']} | {question['type']} | {question['subject']} L{question['level']} "
+        f"| timer {question['timer_seconds']}",
+        f"  Text: {question['question_text']}",
+    ]
+    if question['instruction']:
+        lines.append(f"  Instruction: {question['instruction']}")
+    if question['image_url']:
+        lines.append(f"  Image: {question['image_url']}")
+
+    for option in question['mcq_options']:
+        status = "✓ CORRECT" if option['correct'] else "✗"
+        lines.append(f"  [{option['order']}] {str(option['text']):60} {status}")
+    for pair in question['matching_pairs']:
+        lines.append(f"  [{pair['order']}] {pair['left']} <-> {pair['right']}")
+    for answer in question['fill_answers']:
+        text = answer['text'] or ''
+        lines.append(
+            f"  Answer: {text!r} ({len(text)} chars, hex {text.encode('utf-8').hex()}, "
+            f"case_sensitive={answer['case_sensitive']})"
+        )
+    for item in question['reorder_items']:
+        lines.append(f"  [{item['order']}] position {item['position']}: {item['text']}")
+    for answer in question['truefalse_answers']:
+        explanation = f" - {answer['explanation']}" if answer['explanation'] else ""
+        lines.append(f"  Correct answer: {answer['correct']}{explanation}")
+
+    if not any(question[table] for table in CHILD_JSON):
+        lines.append("  ❌ NO ANSWER ROWS STORED")
+    return '\n'.join(lines)
+
+
+def main(args):
+    ids = parse_ids(args.ids)
+    if not (ids or args.subject or args.level is not None or args.type or args.search):
+        print("❌ Give question ids/ranges or at least one filter (--subject, --level, --type, --search)")
+        return 2
+
+    with db.connection() as conn:
+        questions = inspect_questions(
+            conn, ids=ids, subject=args.subject, level=args.level, qtype=args.type,
+            search=args.search, limit=args.limit,
+        )
+
+    if args.format == 'json':
+        print(json.dumps(questions, indent=2, ensure_ascii=False, default=str))
+        return 0
+
+    for question in questions:
+        print(format_question(question))
+        print()
+    missing = sorted(set(ids) - {q['id'] for q in questions})
+    if missing:
+        more = f" ... and {len(missing) - 20} more" if len(missing) > 20 else ""
+        print(f"⚠️  Not found: {', '.join(map(str, missing[:20]))}{more}")
+    print(f"{len(questions)} question(s)")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('inspect', help='dump questions and all their answer rows in one query')
+    parser.add_argument('ids', nargs='*', help='question ids, comma lists or ranges (e.g. 107 46,74 100-120)')
+    parser.add_argument('--subject', help='subject name (case-insensitive)')
+    parser.add_argument('--level', type=int, help='level number')
+    parser.add_argument('--type', choices=('mcq', 'matching', 'fill', 'reorder', 'truefalse'), help='question type')
+    parser.add_argument('--search', action='append',
+                        help='substring of the question text, case-insensitive (repeat to match any of several)')
+    parser.add_argument('--limit', type=int, help='stop after this many questions')
+    parser.add_argument('--format', choices=('text', 'json'), default='text', help='output format (default: text)')
+    parser.set_defaults(func=main)
@@ -0,0 +1,274 @@
+"""
+Database integrity audit in one round trip.
+
+Every anomaly class is computed by a single CTE query that returns one
+structured row per finding, with the offending question's child rows already
+attached as JSON, so printing a report never needs a follow-up query per
+question.
+
+    from qbank.integrity import audit
+    report = audit(conn)
+    for finding in report.by_kind('zero_correct'):
+        print(finding.question_id, finding.detail)
+"""
+import json
+from collections import namedtuple
+
+from qbank import db
+from qbank.workbook import MCQ_LABELS
+
+# kind -> description
+ANOMALIES = {
+    'zero_correct': 'MCQ questions with no correct option',
+    'multiple_correct': 'MCQ questions with more than one correct option',
+    'missing_fill_answer': 'Fill questions with no non-blank answer',
+    'order_gap': 'Child rows whose order column is not a contiguous 0- or 1-based sequence',
+    'orphan_child': 'Child rows whose question is missing or of another type',
+    'empty_text': 'MCQ options, matching items or reorder items with blank text',
+    'invalid_reorder_positions': 'Reorder questions whose correct_position values are not a permutation of 1..n',
+}
+
+Finding = namedtuple('Finding', 'kind question_id qtype subject level question_text detail')
+
+# child table -> (question type it belongs to, order column, text columns that must not be blank)
+CHILD_TABLES = {
+    'mcq_options': ('mcq', 'option_order', ('option_text',)),
+    'matching_pairs': ('matching', 'pair_order', ('left_item', 'right_item')),
+    'fill_answers': ('fill', None, ()),
+    'reorder_items': ('reorder', 'item_order', ('item_text',)),
+    'truefalse_answers': ('truefalse', None, ()),
+}
+
+# How each dialect spells the JSON parts of the audit. SQLite (the offline
+# snapshot, qbank/snapshot.py) has no ordered aggregates, so ordered lists
+# come from a sorted subquery, booleans stored as 0/1 are turned back into
+# JSON true/false, and JSON built in a subquery is re-read with json().
+JSON_DIALECTS = {
+    'postgresql': {
+        'object': "json_build_object({})",
+        'flag': "{}",
+        'embed': "{}",
+        'list': "(SELECT COALESCE(json_agg({value} ORDER BY {order}), '[]') FROM {source})",
+        'object_list': "(SELECT COALESCE(json_agg({value} ORDER BY {order}), '[]') FROM {source})",
+        'object_agg': "json_object_agg({}, {})",
+    },
+    'sqlite': {
+        'object': "json_object({})",
+        'flag': "json(CASE WHEN {} THEN 'true' ELSE 'false' END)",
+        'embed': "json({})",
+        'list': "(SELECT json_group_array(v) FROM (SELECT {value} AS v FROM {source} ORDER BY {order}))",
+        'object_list': (
+            "(SELECT json_group_array(json(v)) FROM (SELECT {value} AS v FROM {source} ORDER BY {order}))"
+        ),
+        'object_agg': "json_group_object({}, {})",
+    },
+}
+
+
+def _blank(alias, columns):
+    return ' OR '.join(f"trim(COALESCE({alias}.{column}, '')) = ''" for column in columns)
+
+
+def integrity_sql(dialect='postgresql'):
+    """
+    The audit query in `dialect`. Every check is written once; only the
+    JSON spelling of the details comes from JSON_DIALECTS.
+    """
+    spell = JSON_DIALECTS[dialect]
+
+    def obj(**pairs):
+        return spell['object'].format(', '.join(f"'{key}', {value}" for key, value in pairs.items()))
+
+    def ordered(value, source, order, objects=False):
+        return spell['object_list' if objects else 'list'].format(value=value, source=source, order=order)
+
+    def embed(column):
+        return spell['embed'].format(column)
+
+    options = ordered(
+        obj(id='mo.id', order='mo.option_order', text='mo.option_text', correct=spell['flag'].format('mo.is_correct')),
+        'mcq_options mo WHERE mo.question_id = q.id', 'mo.option_order', objects=True,
+    )
+    answers = ordered('fa.answer_text', 'fill_answers fa WHERE fa.question_id = q.id', 'fa.id')
+    items = ordered(
+        obj(id='ri.id', text='ri.item_text', position='ri.correct_position'),
+        'reorder_items ri WHERE ri.question_id = r.question_id', 'ri.item_order', objects=True,
+    )
+    union = '\n    UNION ALL\n    '
+    children = union.join(
+        f"SELECT '{table}' AS tbl, '{qtype}' AS qtype, id, question_id FROM {table}"
+        for table, (qtype, _, _) in CHILD_TABLES.items()
+    )
+    gaps = union.join(
+        f"""SELECT '{table}' AS tbl, t.question_id,
+           {ordered(f'o.{order}', f'{table} o WHERE o.question_id = t.question_id', f'o.{order}')} AS orders
+    FROM {table} t
+    GROUP BY t.question_id
+    HAVING min(t.{order}) NOT IN (0, 1)
+        OR max(t.{order}) - min(t.{order}) + 1 <> count(*)
+        OR count(DISTINCT t.{order}) <> count(*)"""
+        for table, (_, order, _) in CHILD_TABLES.items() if order
+    )
+    empty = union.join(
+        f"""SELECT '{table}' AS tbl, t.question_id,
+           {ordered('e.id', f'{table} e WHERE e.question_id = t.question_id AND ({_blank("e", texts)})', 'e.id')}
+           AS child_ids
+    FROM {table} t
+    WHERE {_blank('t', texts)}
+    GROUP BY t.question_id"""
+        for table, (_, _, texts) in CHILD_TABLES.items() if texts
+    )
+    totals = spell['object_agg'].format("COALESCE(qt.name, '?')", 'n')
+
+    return f"""
+WITH
+mcq AS (
+    SELECT q.id AS question_id,
+           (SELECT count(*) FROM mcq_options mo WHERE mo.question_id = q.id AND mo.is_correct) AS correct,
+           {options} AS options
+    FROM questions q
+    JOIN question_types qt ON qt.id = q.question_type_id AND qt.name = 'mcq'
+),
+fill AS (
+    SELECT q.id AS question_id, {answers} AS answers
+    FROM questions q
+    JOIN question_types qt ON qt.id = q.question_type_id AND qt.name = 'fill'
+    WHERE NOT EXISTS (
+        SELECT 1 FROM fill_answers fa WHERE fa.question_id = q.id AND trim(COALESCE(fa.answer_text, '')) <> ''
+    )
+),
+children AS (
+    {children}
+),
+gaps AS (
+    {gaps}
+),
+orphans AS (
+    SELECT c.tbl, c.id AS child_id, c.question_id, qt.name AS actual_type
+    FROM children c
+    LEFT JOIN questions q ON q.id = c.question_id
+    LEFT JOIN question_types qt ON qt.id = q.question_type_id
+    WHERE q.id IS NULL OR qt.name IS NULL OR qt.name <> c.qtype
+),
+empty AS (
+    {empty}
+),
+reorder AS (
+    SELECT r.question_id, {items} AS items
+    FROM reorder_items r
+    GROUP BY r.question_id
+    HAVING count(DISTINCT r.correct_position) <> count(*)
+        OR min(r.correct_position) <> 1
+        OR max(r.correct_position) <> count(*)
+),
+findings AS (
+    SELECT 'zero_correct' AS kind, question_id, CAST(NULL AS TEXT) AS tbl, CAST(NULL AS BIGINT) AS child_id,
+           {obj(options=embed('options'))} AS detail
+    FROM mcq WHERE correct = 0
+    UNION ALL
+    SELECT 'multiple_correct', question_id, NULL, NULL, {obj(options=embed('options'), correct='correct')}
+    FROM mcq WHERE correct > 1
+    UNION ALL
+    SELECT 'missing_fill_answer', question_id, NULL, NULL, {obj(answers=embed('answers'))}
+    FROM fill
+    UNION ALL
+    SELECT 'order_gap', question_id, tbl, NULL, {obj(table='tbl', orders=embed('orders'))}
+    FROM gaps
+    UNION ALL
+    SELECT 'orphan_child', question_id, tbl, child_id,
+           {obj(table='tbl', child_id='child_id', question_type='actual_type')}
+    FROM orphans
+    UNION ALL
+    SELECT 'empty_text', question_id, tbl, NULL, {obj(table='tbl', child_ids=embed('child_ids'))}
+    FROM empty
+    UNION ALL
+    SELECT 'invalid_reorder_positions', question_id, NULL, NULL, {obj(items=embed('items'))}
+    FROM reorder
+)
+SELECT f.kind, f.question_id, qt.name, s.name, l.level_number, q.question_text, f.detail, f.tbl, f.child_id
+FROM findings f
+LEFT JOIN questions q ON q.id = f.question_id
+LEFT JOIN subjects s ON s.id = q.subject_id
+LEFT JOIN levels l ON l.id = q.level_id
+LEFT JOIN question_types qt ON qt.id = q.question_type_id
+UNION ALL
+SELECT 'totals', NULL, NULL, NULL, NULL, NULL,
+       (SELECT {totals} FROM (
+            SELECT q.question_type_id, count(*) AS n FROM questions q GROUP BY q.question_type_id
+        ) t LEFT JOIN question_types qt ON qt.id = t.question_type_id),
+       NULL, NULL
+ORDER BY 1, 2, 8, 9
+"""
+
+
+INTEGRITY_SQL = integrity_sql()
+SQLITE_INTEGRITY_SQL = integrity_sql('sqlite')
+
+
+class IntegrityReport:
+    def __init__(self, findings, totals):
+        self.findings = findings  # [Finding]
+        self.totals = totals      # question type -> number of questions
+
+    def __len__(self):
+        return len(self.findings)
+
+    def by_kind(self, kind):
+        return [f for f in self.findings if f.kind == kind]
+
+    def counts(self):
+        counts = dict.fromkeys(ANOMALIES, 0)
+        for finding in self.findings:
+            counts[finding.kind] += 1
+        return counts
+
+
+def audit(conn):
+    """Run the whole integrity audit in one query."""
+    sqlite = db.dialect(conn) == 'sqlite'
+    with conn.cursor() as cursor:
+        cursor.execute(SQLITE_INTEGRITY_SQL if sqlite else INTEGRITY_SQL)
+        rows = cursor.fetchall()
+    findings, totals = [], {}
+    for row in rows:
+        detail = json.loads(row[6]) if sqlite and row[6] is not None else row[6]
+        if row[0] == 'totals':
+            totals = detail or {}
+        else:
+            findings.append(Finding(*row[:6], detail))
+    return IntegrityReport(findings, totals)
+
+
+def format_options(options):
+    """'[✓] A: text' listing of the options JSON attached to MCQ findings (labels by rank)."""
+    return [
+        f"[{'✓' if option['correct'] else ' '}] {MCQ_LABELS[rank] if rank < len(MCQ_LABELS) else option['order']}: "
+        f"{option['text'] if option['text'] else 'EMPTY'}"
+        for rank, option in enumerate(options)
+    ]
+
+
+def describe(finding):
+    """One-line description of a finding."""
+    detail = finding.detail
+    where = f"ID {finding.question_id}"
+    if finding.kind == 'zero_correct':
+        return f"{where}: NO correct option ({len(detail['options'])} options) - {_preview(finding)}"
+    if finding.kind == 'multiple_correct':
+        return f"{where}: {detail['correct']} correct options - {_preview(finding)}"
+    if finding.kind == 'missing_fill_answer':
+        return f"{where}: NO ANSWER {detail['answers']} - {_preview(finding)}"
+    if finding.kind == 'order_gap':
+        return f"{where}: {detail['table']} order {detail['orders']}"
+    if finding.kind == 'orphan_child':
+        owner = f"question is {detail['question_type']}" if detail['question_type'] else "question does not exist"
+        return f"{where}: {detail['table']} row {detail['child_id']} ({owner})"
+    if finding.kind == 'empty_text':
+        return f"{where}: blank text in {detail['table']} rows {detail['child_ids']} - {_preview(finding)}"
+    if finding.kind == 'invalid_reorder_positions':
+        return f"{where}: positions {[item['position'] for item in detail['items']]} - {_preview(finding)}"
+    return f"{where}: {detail}"
+
+
+def _preview(finding):
+    return str(finding.question_text or '')[:50]
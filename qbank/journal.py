@@ -0,0 +1,219 @@
+"""
+Undo journal for every question and answer-row write the tooling makes.
+
+Each write path (plan apply, fix specs, the bulk MCQ correction scripts,
+import, merge, canonicalize, fix-text) runs inside journaled(): before a
+writer touches answer rows it captures the current rows of the questions it
+staged, one query per table, and the collected pre-image is saved to
+JOURNAL_DIR before the transaction commits. Runs that insert, delete or
+remap whole questions also capture the questions rows (and the subjects /
+levels rows they point at), and record the ids they insert so a revert can
+delete them. A run that lands therefore always has its undo on disk; a dry
+run or a rolled-back run leaves nothing behind.
+
+    python -m qbank journal                 # list recorded runs
+    python -m qbank revert 20260108T144359-fix
+
+See qbank/undo.py for the revert side.
+"""
+import gzip
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+
+JOURNAL_DIR = os.getenv(
+    'QBANK_JOURNAL_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'qbank', 'journal'),
+)
+
+# Same layout as the pre-image files written by "fix" before the journal
+# existed, so those can be reverted too.
+JOURNAL_VERSION = 1
+SUFFIX = '.json.gz'
+
+# Answer tables a pre-image can cover, with the columns every pre-image
+# has. Captures take the whole row (created_at included, so a re-inserted
+# row is the row that was deleted); files written before that hold only
+# these columns, and restore the same way.
+PREIMAGE_COLUMNS = {
+    'mcq_options': ('id', 'question_id', 'option_order', 'option_text', 'is_correct'),
+    'fill_answers': ('id', 'question_id', 'answer_text', 'case_sensitive'),
+    'truefalse_answers': ('id', 'question_id', 'correct_answer', 'explanation'),
+    'reorder_items': ('id', 'question_id', 'item_order', 'item_text', 'correct_position'),
+    'matching_pairs': ('id', 'question_id', 'pair_order', 'left_item', 'right_item'),
+}
+
+# questions and the lookup tables they point at, keyed on their own id, for
+# the runs that insert, delete or remap questions (import, merge,
+# canonicalize).
+ROW_TABLES = ('subjects', 'levels', 'questions')
+
+# Parents first, so a revert re-creates what the later tables point at.
+RESTORE_ORDER = ROW_TABLES + tuple(PREIMAGE_COLUMNS)
+
+
+def preimage_key(table):
+    """Column a pre-image of `table` is keyed on: question_id, or the row's own id."""
+    return 'id' if table in ROW_TABLES else 'question_id'
+
+
+def capture_preimage(cursor, question_ids_by_table):
+    """
+    Snapshot the rows of some questions: one query per table.
+
+    `question_ids_by_table` maps table -> question ids (for ROW_TABLES, the
+    table's own ids). Returns a plain dict (JSON-serialisable) that
+    writer.restore_preimage() can put back.
+    """
+    preimage = {}
+    for table, question_ids in question_ids_by_table.items():
+        question_ids = sorted(set(question_ids))
+        if not question_ids:
+            continue
+        cursor.execute(
+            f"SELECT * FROM {table} WHERE {preimage_key(table)} = ANY(%s) ORDER BY id",
+            (question_ids,),
+        )
+        preimage[table] = {
+            'question_ids': question_ids,
+            'columns': [column[0] for column in cursor.description],
+            'rows': [list(row) for row in cursor.fetchall()],
+        }
+    return preimage
+
+
+class Journal:
+    """Pre-image of one run, built up as its writers stage questions."""
+    __slots__ = ('command', 'tables', 'created_at', 'path')
+
+    def __init__(self, command):
+        self.command = command
+        self.tables = {}
+        self.created_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.path = None
+
+    def capture(self, cursor, table, question_ids):
+        """
+        Record the current rows of `question_ids` in `table`.
+
+        The first capture of a question wins; returns the ids captured now.
+        """
+        image = self.tables.get(table)
+        seen = set(image['question_ids']) if image else set()
+        fresh = set(question_ids) - seen
+        if not fresh:
+            return fresh
+        captured = capture_preimage(cursor, {table: fresh})[table]
+        if image is None:
+            self.tables[table] = captured
+        else:
+            image['question_ids'] = sorted(seen | fresh)
+            image['rows'].extend(captured['rows'])
+        return fresh
+
+    def created(self, cursor, table, ids):
+        """Record rows inserted by the run (no pre-image): a revert deletes them again."""
+        image = self.tables.get(table)
+        if image is None:
+            cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+            image = self.tables[table] = {
+                'question_ids': [], 'columns': [column[0] for column in cursor.description], 'rows': [],
+            }
+        image['question_ids'] = sorted(set(image['question_ids']) | set(ids))
+
+    def discard(self, table, question_ids):
+        """Forget questions a writer captured but then left unchanged."""
+        image = self.tables.get(table)
+        question_ids = set(question_ids)
+        if not image or not question_ids:
+            return
+        key = image['columns'].index(preimage_key(table))
+        image['question_ids'] = [q for q in image['question_ids'] if q not in question_ids]
+        image['rows'] = [row for row in image['rows'] if row[key] not in question_ids]
+        if not image['question_ids']:
+            del self.tables[table]
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    @property
+    def row_count(self):
+        return sum(len(image['rows']) for image in self.tables.values())
+
+    def save(self, directory=None):
+        directory = directory or JOURNAL_DIR
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9_.]+', '-', self.command).strip('-') or 'run'
+        base = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{slug}")
+        path, n = base + SUFFIX, 1
+        while os.path.exists(path):
+            n += 1
+            path = f"{base}-{n}{SUFFIX}"
+        payload = {
+            'version': JOURNAL_VERSION,
+            'command': self.command,
+            'created_at': self.created_at,
+            'tables': self.tables,
+        }
+        tmp = path + '.tmp'
+        with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'), default=str)
+        os.replace(tmp, path)
+        self.path = path
+        return path
+
+
+@contextmanager
+def journaled(conn, command, dry_run=False, directory=None):
+    """
+    One journaled transaction: yields (cursor, journal).
+
+    On success the journal is saved (if anything was captured) and the
+    transaction committed, or everything is rolled back when `dry_run` is
+    set. Any exception rolls back and saves nothing.
+    """
+    journal = Journal(command)
+    try:
+        with conn.cursor() as cursor:
+            yield cursor, journal
+        if dry_run:
+            conn.rollback()
+        else:
+            if journal:
+                journal.save(directory)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def run_id(path):
+    name = os.path.basename(path)
+    return name[:-len(SUFFIX)] if name.endswith(SUFFIX) else name
+
+
+def list_runs(directory=None):
+    """Paths of the recorded runs, oldest first."""
+    directory = directory or JOURNAL_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SUFFIX))
+
+
+def find_run(name, directory=None):
+    """A run id (or unique prefix), or a path to a journal / pre-image file."""
+    if os.path.isfile(name):
+        return name
+    matches = [path for path in list_runs(directory) if run_id(path).startswith(name)]
+    if len(matches) != 1:
+        raise ValueError(f"{len(matches)} journal runs match {name!r}")
+    return matches[0]
+
+
+def read_run(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('version') != JOURNAL_VERSION:
+        raise ValueError(f"Unsupported journal version {payload.get('version')!r} in {path}")
+    return payload
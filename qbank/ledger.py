@@ -0,0 +1,154 @@
+"""
+Incremental reconciliation backed by a run ledger.
+
+A full reconcile() re-checks every workbook row against the whole bank. The
+ledger remembers, per workbook and database:
+
+  - the bank's question index (question id -> content hash, updated_at),
+  - the content hash of every workbook row that reconciled clean, with the
+    question hash it matched on,
+  - a high-water mark on questions.updated_at.
+
+The next run only reconciles rows whose hash is new (edited or added rows, and
+rows that had issues last time) plus rows whose key is touched by a question
+updated, inserted or deleted since the high-water mark. Only the questions
+those rows point at are loaded from the database, so a run costs O(changes)
+rather than O(bank size). The answer-table writers bump questions.updated_at,
+as does the admin panel, so fixes are picked up on the next run.
+"""
+import hashlib
+import marshal
+import os
+from datetime import datetime, timedelta
+
+from qbank.bank import load_bank
+from qbank.reconcile import COMPARATORS, bank_key, reconcile, row_key
+from qbank.workbook import record_to_tuple
+from qbank.workbook_cache import CACHE_DIR, read_entry, write_entry
+
+LEDGER_VERSION = 3
+LEDGER_MAGIC = b'QBLG'
+
+# Re-read questions updated slightly before the high-water mark: NOW() is the
+# transaction start time, so a long transaction can commit a timestamp that is
+# older than a run which finished in the meantime.
+OVERLAP = timedelta(minutes=5)
+
+STATE_SQL = "SELECT count(*), max(updated_at) FROM questions"
+
+
+def ledger_path(workbook_path, conn, ledger_dir=None):
+    dsn = conn.get_dsn_parameters()
+    identity = '|'.join([
+        os.path.abspath(workbook_path),
+        dsn.get('host', ''), dsn.get('port', ''), dsn.get('dbname', ''),
+    ])
+    name = hashlib.blake2b(identity.encode('utf-8'), digest_size=10).hexdigest()
+    return os.path.join(ledger_dir or CACHE_DIR, f'ledger-{name}.bin')
+
+
+def row_hash(sheet_name, record):
+    """Content hash of a workbook row; the row number is left out so inserts above it don't dirty it."""
+    values = record_to_tuple(record)[1:]
+    return hashlib.blake2b(marshal.dumps((sheet_name,) + values), digest_size=12).hexdigest()
+
+
+def _index_entry(question):
+    return (bank_key(question), question.updated_at.isoformat() if question.updated_at else None)
+
+
+def _issue_rows(result):
+    rows = {id(record) for record in result.missing}
+    rows.update(id(record) for record, _ in result.ambiguous)
+    rows.update(id(d.row) for d in result.differences)
+    return rows
+
+
+def reconcile_incremental(conn, sheets, workbook_path, full=False, ledger_dir=None):
+    """
+    Reconcile only what changed since the last run, then update the ledger.
+
+    Returns (Reconciliation, stats). The Reconciliation only covers the rows
+    that were re-checked, and `extra` is left empty since the bank is only
+    partially loaded. With `full` (or no usable ledger) every row is checked.
+    """
+    path = ledger_path(workbook_path, conn, ledger_dir)
+    entry = None if full else read_entry(path, LEDGER_MAGIC, LEDGER_VERSION)
+
+    with conn.cursor() as cursor:
+        cursor.execute(STATE_SQL)
+        count, high_water = cursor.fetchone()
+
+    rows = [
+        (sheet_name, record, row_hash(sheet_name, record))
+        for sheet_name, records in sheets.items() for record in records
+    ]
+
+    if entry is None:
+        bank = load_bank(conn)
+        index = {question.id: _index_entry(question) for question in bank}
+        result = reconcile(sheets, bank)
+        checked, clean = rows, {}
+        changed_questions = len(bank)
+    else:
+        index = entry['index']
+        dirty_keys = set()
+        since = entry['high_water'] and datetime.fromisoformat(entry['high_water']) - OVERLAP
+        changed_questions = 0
+        for question in load_bank(conn, updated_since=since) if since else load_bank(conn):
+            current = _index_entry(question)
+            previous = index.get(question.id)
+            if previous == current:
+                continue  # already seen, re-read because of the overlap window
+            if previous is not None:
+                dirty_keys.add(previous[0])
+            index[question.id] = current
+            dirty_keys.add(current[0])
+            changed_questions += 1
+        if len(index) != count:
+            # some questions were deleted; one id-only scan to find them
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT id FROM questions")
+                live = {row[0] for row in cursor.fetchall()}
+            for question_id in set(index) - live:
+                dirty_keys.add(index.pop(question_id)[0])
+                changed_questions += 1
+
+        clean, checked = {}, []
+        known_clean = entry['clean']
+        for sheet_name, record, digest in rows:
+            key = known_clean.get(digest)
+            if key is not None and key not in dirty_keys:
+                clean[digest] = key
+            else:
+                checked.append((sheet_name, record, digest))
+
+        wanted = {row_key(record) for _, record, _ in checked}
+        bank = load_bank(conn, ids=[qid for qid, (key, _) in index.items() if key in wanted])
+        subset = {}
+        for sheet_name, record, _ in checked:
+            subset.setdefault(sheet_name, []).append(record)
+        result = reconcile(subset, bank)
+        result.extra = []
+
+    issues = _issue_rows(result)
+    for _, record, digest in checked:
+        if record.qtype in COMPARATORS and id(record) not in issues:
+            clean[digest] = row_key(record)
+
+    write_entry(path, {
+        'version': LEDGER_VERSION,
+        'high_water': high_water.isoformat() if high_water else None,
+        'index': index,
+        'clean': clean,
+    }, LEDGER_MAGIC)
+
+    stats = {
+        'full': entry is None,
+        'rows': len(rows),
+        'checked': len(checked),
+        'skipped': len(rows) - len(checked),
+        'questions_loaded': len(bank),
+        'questions_changed': changed_questions,
+    }
+    return result, stats
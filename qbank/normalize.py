@@ -0,0 +1,59 @@
+"""
+The one comparison form of question-bank text, shared by every matcher.
+
+reconcile(), the content hash, the importer, relink, dedupe and
+canonicalize all compare text through normalize_text(), so two strings
+that one of them treats as equal are equal to all of them:
+
+  - NFKC (compatibility forms such as ligatures and full-width letters),
+  - casefolding,
+  - accent folding ("Rivière" == "Riviere", "Mahébourg" == "Mahebourg"),
+  - typographic quotes read as ASCII quotes, format characters (zero-width
+    spaces, soft hyphens, BOMs) dropped,
+  - whitespace runs of any kind (NBSP included) collapsed to one space,
+    and none at either end.
+
+ASCII text, nearly all of the bank, only needs the whitespace and case
+steps. Results are kept in an LRU cache and interned, so a value seen
+again (option texts, subjects, answers compared on every run) costs one
+dict lookup, and equal results share one string object.
+"""
+import sys
+import unicodedata
+from functools import lru_cache
+
+# distinct values kept; the whole bank and workbook fit several times over
+CACHE_SIZE = 1 << 17
+
+SMART_QUOTES = {
+    '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u201b': "'", '\u2032': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': '"', '\u201f': '"', '\u2033': '"',
+}
+QUOTE_TABLE = str.maketrans(SMART_QUOTES)
+
+
+def fold_accents(text):
+    """Drop the combining marks (and format characters) of `text`."""
+    return ''.join(
+        char for char in unicodedata.normalize('NFD', text)
+        if not unicodedata.combining(char) and unicodedata.category(char) != 'Cf'
+    )
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalize(text):
+    if not text.isascii():
+        text = fold_accents(unicodedata.normalize('NFKC', text).casefold()).translate(QUOTE_TABLE)
+    return sys.intern(' '.join(text.lower().split()))
+
+
+def normalize_text(value):
+    """Case-, accent- and whitespace-insensitive comparison form of a cell/column value."""
+    if value is None:
+        return ''
+    return _normalize(value if type(value) is str else str(value))
+
+
+def cache_info():
+    """functools cache statistics of normalize_text()."""
+    return _normalize.cache_info()
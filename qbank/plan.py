@@ -0,0 +1,215 @@
+"""
+Two-phase plan/apply for answer corrections.
+
+    python -m qbank plan --workbook X.xlsx -o fixes.plan.gz   # compute only
+    python -m qbank apply fixes.plan.gz --list                 # review offline
+    python -m qbank apply fixes.plan.gz                        # execute
+
+The plan phase reconciles the workbook against the bank and writes every
+intended change with its before/after values to a gzip'd JSON file. The apply
+phase never recomputes anything: it re-reads the current values of the
+planned questions in one query per table, skips changes whose "before" no
+longer matches (unless --force), and executes the rest through the bulk
+writer in a single journaled transaction (undo with "python -m qbank revert").
+"""
+import gzip
+import json
+import os
+import time
+
+from qbank import db
+from qbank.bank import load_bank
+from qbank.journal import journaled, run_id
+from qbank.reconcile import reconcile
+from qbank.workbook import DEFAULT_WORKBOOK
+from qbank.workbook_cache import content_hash, load_cached
+from qbank.writer import stage_and_apply_fill, stage_and_apply_mcq
+
+PLAN_VERSION = 1
+
+# reconcile Difference.field -> plan change kind
+PLANNED_FIELDS = {
+    'correct_option': 'mcq_correct',
+    'answer': 'fill_answer',
+}
+PLANNED_TYPES = ('mcq', 'fill')
+
+
+class Change:
+    __slots__ = ('kind', 'question_id', 'before', 'after', 'source')
+
+    def __init__(self, kind, question_id, before, after, source=None):
+        self.kind = kind
+        self.question_id = question_id
+        self.before = before
+        self.after = after
+        self.source = source
+
+    def to_list(self):
+        return [self.kind, self.question_id, self.before, self.after, self.source]
+
+    @classmethod
+    def from_list(cls, values):
+        return cls(*values)
+
+    def __repr__(self):
+        return f"<Change {self.kind} Q{self.question_id}: {self.before!r} -> {self.after!r}>"
+
+
+class Plan:
+    def __init__(self, changes, meta=None):
+        self.changes = changes
+        self.meta = meta or {}
+
+    def by_kind(self, kind):
+        return [c for c in self.changes if c.kind == kind]
+
+    def question_ids(self, kind=None):
+        return sorted({c.question_id for c in self.changes if kind is None or c.kind == kind})
+
+
+def build_plan(sheets, bank, workbook_path=None):
+    """Turn a reconciliation into a list of changes (nothing is written)."""
+    result = reconcile(sheets, bank, qtypes=PLANNED_TYPES)
+    changes = []
+    for diff in result.differences:
+        kind = PLANNED_FIELDS.get(diff.field)
+        if kind is None:
+            continue
+        after = diff.expected if kind == 'mcq_correct' else diff.row.answer
+        changes.append(Change(kind, diff.question.id, diff.actual, after, f"row {diff.row.row}"))
+
+    meta = {'version': PLAN_VERSION, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    if workbook_path and os.path.exists(workbook_path):
+        meta['workbook'] = os.path.abspath(workbook_path)
+        meta['workbook_hash'] = content_hash(workbook_path)
+    meta['skipped'] = {
+        'missing': len(result.missing),
+        'ambiguous': len(result.ambiguous),
+        'unmatched_correct': len(result.by_field('correct_unmatched')),
+        'option_count': len(result.by_field('option_count')),
+    }
+    return Plan(changes, meta)
+
+
+def write_plan(path, plan):
+    payload = dict(plan.meta, changes=[c.to_list() for c in plan.changes])
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def read_plan(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version {payload.get('version')!r} in {path}")
+    changes = [Change.from_list(values) for values in payload.pop('changes')]
+    return Plan(changes, payload)
+
+
+CURRENT_SQL = {
+    'mcq_correct': """
+        SELECT q.id, COALESCE(
+            array_agg(mo.option_order ORDER BY mo.option_order) FILTER (WHERE mo.is_correct), '{}')
+        FROM unnest(%s::bigint[]) AS q(id)
+        LEFT JOIN mcq_options mo ON mo.question_id = q.id
+        GROUP BY q.id
+    """,
+    'fill_answer': """
+        SELECT q.id, COALESCE(
+            array_agg(fa.answer_text ORDER BY fa.id) FILTER (WHERE fa.id IS NOT NULL), '{}')
+        FROM unnest(%s::bigint[]) AS q(id)
+        LEFT JOIN fill_answers fa ON fa.question_id = q.id
+        GROUP BY q.id
+    """,
+}
+
+APPLIERS = {
+    'mcq_correct': stage_and_apply_mcq,
+    'fill_answer': stage_and_apply_fill,
+}
+
+
+def apply_plan(conn, plan, force=False, dry_run=False):
+    """
+    Execute a plan in one journaled transaction. Returns (applied, drifted, journal path).
+
+    A change has drifted when the value currently in the database is no
+    longer the plan's "before" value; drifted changes are skipped unless
+    `force` is set.
+    """
+    applied, drifted = [], []
+    with journaled(conn, 'apply', dry_run=dry_run) as (cursor, journal):
+        for kind, apply in APPLIERS.items():
+            changes = plan.by_kind(kind)
+            if not changes:
+                continue
+            cursor.execute(CURRENT_SQL[kind], (plan.question_ids(kind),))
+            current = dict(cursor.fetchall())
+            todo = []
+            for change in changes:
+                if not force and list(current.get(change.question_id) or []) != list(change.before or []):
+                    drifted.append(change)
+                else:
+                    todo.append(change)
+            if todo:
+                apply(cursor, [(c.question_id, c.after) for c in todo], journal)
+                applied.extend(todo)
+    return applied, drifted, journal.path
+
+
+def print_changes(changes, limit=None):
+    for change in changes[:limit]:
+        print(f"   Q{change.question_id:<6} {change.kind:12s} {change.before!r} -> {change.after!r}  ({change.source})")
+    if limit and len(changes) > limit:
+        print(f"   ... and {len(changes) - limit} more")
+
+
+def plan_main(args):
+    workbook_path = args.workbook or DEFAULT_WORKBOOK
+    sheets = load_cached(workbook_path)
+    with db.connection() as conn:
+        bank = load_bank(conn, qtypes=PLANNED_TYPES)
+    plan = build_plan(sheets, bank, workbook_path)
+    write_plan(args.output, plan)
+
+    print(f"📝 Plan written to {args.output}: {len(plan.changes)} change(s)")
+    for kind in PLANNED_FIELDS.values():
+        print(f"   {kind}: {len(plan.by_kind(kind))}")
+    print(f"   skipped: {plan.meta['skipped']}")
+    print_changes(plan.changes, limit=20)
+    return 0
+
+
+def apply_main(args):
+    plan = read_plan(args.plan)
+    print(f"📄 {args.plan}: {len(plan.changes)} change(s), created {plan.meta.get('created_at')}")
+    if args.list:
+        print_changes(plan.changes)
+        return 0
+
+    with db.connection() as conn:
+        applied, drifted, journal_path = apply_plan(conn, plan, force=args.force, dry_run=args.dry_run)
+
+    verb = "Would apply" if args.dry_run else "Applied"
+    print(f"✅ {verb} {len(applied)} change(s) in one transaction")
+    if journal_path:
+        print(f"📝 Journaled as {run_id(journal_path)} (undo with: python -m qbank revert {run_id(journal_path)})")
+    if drifted:
+        print(f"⚠️  Skipped {len(drifted)} change(s) whose current value no longer matches the plan:")
+        print_changes(drifted, limit=20)
+    return 1 if drifted else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('plan', help='compute answer corrections and write them to a plan file')
+    parser.add_argument('-o', '--output', default='fixes.plan.gz', help='plan file to write (default: fixes.plan.gz)')
+    parser.add_argument('--workbook', help=f'path to the question workbook (default: {DEFAULT_WORKBOOK})')
+    parser.set_defaults(func=plan_main)
+
+    parser = subparsers.add_parser('apply', help='execute a plan file in one batched transaction')
+    parser.add_argument('plan', help='plan file written by "plan"')
+    parser.add_argument('--list', action='store_true', help='print the planned changes and exit')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.add_argument('--force', action='store_true', help='apply changes even if the DB drifted since planning')
+    parser.set_defaults(func=apply_main, writes=True)
@@ -0,0 +1,238 @@
+"""
+Set-based Excel <-> database reconciliation.
+
+Instead of one `question_text LIKE 'first 40 chars%'` query per workbook row,
+the whole question bank is pulled with load_bank() (one query per table) and
+indexed in memory on the content hash of its normalized (subject, level,
+type, text) key. Every workbook row is then matched with a dict lookup and
+compared against the answer rows already in memory, so reconciling the full
+workbook costs the handful of bulk queries made by load_bank() and nothing
+per row. The same hash is stored in questions.content_hash
+(qbank/contenthash.py), which is what the importer upserts on. Text is
+compared in the form qbank/normalize.py gives it.
+"""
+import hashlib
+from collections import Counter
+
+from qbank.normalize import normalize_text
+from qbank.workbook import MCQ_LABELS, SHEET_TYPES
+
+
+def question_key(subject, level, qtype, text):
+    try:
+        level = int(level)
+    except (TypeError, ValueError):
+        pass
+    return (normalize_text(subject), level, qtype, normalize_text(text))
+
+
+def question_hash(subject, level, qtype, text):
+    """Content hash of a question: 32 hex digits of BLAKE2 over its normalized key."""
+    key = '\x1f'.join(str(part) for part in question_key(subject, level, qtype, text))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def row_key(record):
+    return question_hash(record.subject, record.level, record.qtype, record.question)
+
+
+def bank_key(question):
+    return question_hash(question.subject, question.level, question.qtype, question.text)
+
+
+class BankIndex:
+    """Hash index of the question bank on the question content hash."""
+
+    def __init__(self, bank, qtypes=None):
+        self.by_key = {}
+        for question in bank:
+            if qtypes and question.qtype not in qtypes:
+                continue
+            self.by_key.setdefault(bank_key(question), []).append(question)
+
+    def lookup(self, record):
+        return self.by_key.get(row_key(record), [])
+
+
+class Difference:
+    __slots__ = ('row', 'question', 'field', 'expected', 'actual')
+
+    def __init__(self, row, question, field, expected, actual):
+        self.row = row
+        self.question = question
+        self.field = field
+        self.expected = expected
+        self.actual = actual
+
+    def __repr__(self):
+        return (f"<Difference row {self.row.row} ID {self.question.id} {self.field}: "
+                f"expected {self.expected!r} actual {self.actual!r}>")
+
+
+class Reconciliation:
+    """Outcome of reconciling workbook records against the bank."""
+
+    def __init__(self):
+        self.matched = []      # (record, question)
+        self.missing = []      # records with no DB question
+        self.ambiguous = []    # (record, [question, ...]) when the key hits several rows
+        self.extra = []        # DB questions no workbook row points at
+        self.relinked = []     # (record, question, score) matched on similar text (qbank/fuzzy.py)
+        self.differences = []  # Difference
+
+    def by_field(self, field):
+        return [d for d in self.differences if d.field == field]
+
+    def summary(self):
+        return {
+            'matched': len(self.matched),
+            'missing': len(self.missing),
+            'ambiguous': len(self.ambiguous),
+            'extra': len(self.extra),
+            'relinked': len(self.relinked),
+            'differences': dict(Counter(d.field for d in self.differences)),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Per-type comparators: (record, question) -> [Difference]
+# ---------------------------------------------------------------------------
+
+def ordered_options(question):
+    return sorted(question.children, key=lambda o: o.option_order)
+
+
+def expected_mcq_option(record, options):
+    """
+    DB option the workbook marks correct, using the import route's 3 tiers:
+    exact text, single letter A-D, then a 10-character prefix.
+    """
+    correct = normalize_text(record.correct_answer)
+    if not correct:
+        return None
+    for option in options:
+        if normalize_text(option.option_text) == correct:
+            return option
+    if len(correct) == 1 and correct.upper() in MCQ_LABELS:
+        index = MCQ_LABELS.index(correct.upper())
+        return options[index] if index < len(options) else None
+    prefix = correct[:10]
+    for option in options:
+        if normalize_text(option.option_text).startswith(prefix):
+            return option
+    return None
+
+
+def workbook_options(record):
+    """The workbook's option texts, without the blank cells after the last one given."""
+    texts = list(record.options)
+    while texts and not texts[-1]:
+        texts.pop()
+    return texts
+
+
+def compare_mcq(record, question):
+    """
+    Options are compared one by one only when the workbook and the bank
+    have as many; otherwise the count is the difference reported, since
+    neither the labels nor a letter answer line up any more.
+    """
+    options = ordered_options(question)
+    texts = workbook_options(record)
+    if len(texts) != len(options):
+        return [Difference(record, question, 'option_count', len(texts), len(options))]
+
+    differences = []
+    for label, text, option in zip(MCQ_LABELS, texts, options):
+        if normalize_text(text) != normalize_text(option.option_text):
+            differences.append(Difference(record, question, f'option{label}', text, option.option_text))
+
+    expected = expected_mcq_option(record, options)
+    actual = [o.option_order for o in options if o.is_correct]
+    if expected is None:
+        differences.append(Difference(record, question, 'correct_unmatched', record.correct_answer, actual))
+    elif actual != [expected.option_order]:
+        differences.append(Difference(record, question, 'correct_option', expected.option_order, actual))
+    return differences
+
+
+def compare_fill(record, question):
+    expected = normalize_text(record.answer)
+    stored = [a.answer_text for a in question.children]
+    if expected not in [normalize_text(s) for s in stored]:
+        return [Difference(record, question, 'answer', record.answer, stored)]
+    return []
+
+
+def compare_matching(record, question):
+    """
+    Pairs are compared as a set: the game shuffles them, so pair_order carries
+    no meaning. Half-filled workbook pairs are skipped, as the import does.
+    """
+    expected = sorted(
+        (normalize_text(left), normalize_text(right)) for left, right in record.pairs if left and right
+    )
+    stored = sorted((normalize_text(p.left_item), normalize_text(p.right_item)) for p in question.children)
+    if expected != stored:
+        actual = [(p.left_item, p.right_item) for p in question.children]
+        return [Difference(record, question, 'pairs', list(record.pairs), actual)]
+    return []
+
+
+def compare_reorder(record, question):
+    """Workbook steps are in the correct order; the DB order is given by correct_position."""
+    items = sorted(question.children, key=lambda item: item.correct_position)
+    if [normalize_text(step) for step in record.steps] != [normalize_text(item.item_text) for item in items]:
+        return [Difference(record, question, 'steps', list(record.steps), [item.item_text for item in items])]
+    return []
+
+
+def compare_truefalse(record, question):
+    expected = {'true': True, 'false': False}.get(normalize_text(record.is_true))
+    actual = [a.correct_answer for a in question.children]
+    if expected is None:
+        return [Difference(record, question, 'is_true_invalid', record.is_true, actual)]
+    if actual != [expected]:
+        return [Difference(record, question, 'is_true', expected, actual)]
+    return []
+
+
+COMPARATORS = {
+    'mcq': compare_mcq,
+    'matching': compare_matching,
+    'fill': compare_fill,
+    'reorder': compare_reorder,
+    'truefalse': compare_truefalse,
+}
+
+
+def reconcile(sheets, bank, qtypes=None):
+    """
+    Reconcile parsed workbook sheets ({sheet name: [record]}) against a bank.
+
+    `qtypes` limits the run to some question types (default: every type with
+    a comparator).
+    """
+    qtypes = set(qtypes or COMPARATORS)
+    index = BankIndex(bank, qtypes)
+    result = Reconciliation()
+    seen = set()
+
+    for sheet_name, record_cls in SHEET_TYPES.items():
+        if record_cls.qtype not in qtypes:
+            continue
+        compare = COMPARATORS[record_cls.qtype]
+        for record in sheets.get(sheet_name, ()):
+            questions = index.lookup(record)
+            if not questions:
+                result.missing.append(record)
+                continue
+            if len(questions) > 1:
+                result.ambiguous.append((record, questions))
+            for question in questions:
+                seen.add(question.id)
+                result.matched.append((record, question))
+                result.differences.extend(compare(record, question))
+
+    result.extra = [q for qs in index.by_key.values() for q in qs if q.id not in seen]
+    return result
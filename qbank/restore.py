@@ -0,0 +1,197 @@
+"""
+Restore a backup directory with COPY instead of replaying INSERTs.
+
+    python -m qbank restore db_backup_20260108T144359 --dry-run
+    python -m qbank restore db_backup_20260108T144359
+    python -m qbank restore backups/nightly --replace     # empty the tables first
+
+Two layouts are accepted. An export directory (qbank/export.py) already
+holds COPY streams, which are fed to the server as they are. A legacy
+backup's full_backup.sql (one INSERT ... ON CONFLICT DO NOTHING per row)
+is parsed in one streaming pass; its rows are spilled to one COPY text
+file per table, so memory stays flat however big the dump is.
+
+Each table is then loaded in dependency order with one COPY into a
+temporary stage and one INSERT ... SELECT ... ON CONFLICT DO NOTHING,
+which keeps the dump's semantics (rows already present are left alone).
+Finally every serial/identity sequence of the restored tables is moved
+past the highest restored id. Everything runs in one transaction.
+"""
+import gzip
+import os
+import tempfile
+import time
+
+import psycopg2
+
+from qbank import db
+from qbank.export import EXPORT_TABLES, MANIFEST, read_manifest
+from qbank.snapshot import DUMP_FILE, iter_dump_rows
+
+SEQUENCES_SQL = """
+    SELECT column_name, pg_get_serial_sequence(quote_ident(table_name), column_name)
+    FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = %s
+      AND pg_get_serial_sequence(quote_ident(table_name), column_name) IS NOT NULL
+"""
+
+
+class Source:
+    """Rows for one table: a COPY text stream plus the columns it carries."""
+    __slots__ = ('table', 'columns', 'rows', 'path', 'compressed')
+
+    def __init__(self, table, columns, rows, path, compressed=False):
+        self.table = table
+        self.columns = tuple(columns)
+        self.rows = rows
+        self.path = path
+        self.compressed = compressed
+
+    def open(self):
+        return gzip.open(self.path, 'rb') if self.compressed else open(self.path, 'rb')
+
+
+def _order(table):
+    """Parents first: the export order, then anything else by name."""
+    return (EXPORT_TABLES.index(table), '') if table in EXPORT_TABLES else (len(EXPORT_TABLES), table)
+
+
+def manifest_sources(directory):
+    manifest = read_manifest(directory)
+    return [
+        Source(table, entry['columns'], entry['rows'], os.path.join(directory, entry['file']), compressed=True)
+        for table, entry in manifest['tables'].items()
+    ]
+
+
+def spill_dump(path, workdir):
+    """
+    Convert the INSERTs of a dump into COPY text files under `workdir`.
+
+    One pass over the dump; rows are written out as they are parsed, one
+    file per (table, column list). Returns the Sources.
+    """
+    files, sources = {}, {}
+    try:
+        for table, columns, row in iter_dump_rows(path):
+            key = (table, columns)
+            if key not in sources:
+                spill = os.path.join(workdir, f"{len(sources):03d}-{table}.copy")
+                files[key] = open(spill, 'w', encoding='utf-8', newline='\n')
+                sources[key] = Source(table, columns, 0, spill)
+            files[key].write(db.copy_line(row))
+            sources[key].rows += 1
+    finally:
+        for f in files.values():
+            f.close()
+    return list(sources.values())
+
+
+def load_source(cursor, source, target_columns):
+    """COPY one source into a stage, then insert what is not there yet. Returns rows inserted."""
+    unknown = [column for column in source.columns if column not in target_columns]
+    if unknown:
+        raise RuntimeError(f"{source.table}: the backup has columns the database lacks: {', '.join(unknown)}")
+    quoted = ', '.join(f'"{column}"' for column in source.columns)
+    cursor.execute("DROP TABLE IF EXISTS restore_stage")
+    cursor.execute(
+        f'CREATE TEMP TABLE restore_stage ON COMMIT DROP AS SELECT {quoted} FROM public."{source.table}" WITH NO DATA'
+    )
+    with source.open() as f:
+        cursor.copy_expert(f"COPY restore_stage ({quoted}) FROM STDIN", f)
+    cursor.execute(
+        f'INSERT INTO public."{source.table}" ({quoted}) OVERRIDING SYSTEM VALUE '
+        f'SELECT {quoted} FROM restore_stage ON CONFLICT DO NOTHING'
+    )
+    return cursor.rowcount
+
+
+def reset_sequences(cursor, table):
+    """Move every serial/identity sequence of `table` past its highest value."""
+    cursor.execute(SEQUENCES_SQL, (table,))
+    for column, sequence in cursor.fetchall():
+        cursor.execute(
+            f'SELECT setval(%s, COALESCE(MAX("{column}"), 1), MAX("{column}") IS NOT NULL) FROM public."{table}"',
+            (sequence,),
+        )
+
+
+def restore(conn, directory, replace=False, dry_run=False):
+    """
+    Restore a backup directory in one transaction.
+
+    Returns ([(source, rows inserted)] in load order, [tables skipped
+    because the database does not have them]). With `replace` the restored
+    tables are truncated first; `dry_run` rolls everything back.
+    """
+    with tempfile.TemporaryDirectory(prefix='qbank-restore-') as workdir:
+        if os.path.exists(os.path.join(directory, MANIFEST)):
+            sources = manifest_sources(directory)
+        elif os.path.exists(os.path.join(directory, DUMP_FILE)):
+            sources = spill_dump(os.path.join(directory, DUMP_FILE), workdir)
+        else:
+            raise RuntimeError(f"{directory}: neither {MANIFEST} nor {DUMP_FILE} found")
+        sources.sort(key=lambda source: _order(source.table))
+        tables = list(dict.fromkeys(source.table for source in sources))
+
+        loaded = []
+        try:
+            with conn.cursor() as cursor:
+                columns = {}
+                for table in tables:
+                    cursor.execute(
+                        "SELECT column_name FROM information_schema.columns "
+                        "WHERE table_schema = 'public' AND table_name = %s",
+                        (table,),
+                    )
+                    columns[table] = {row[0] for row in cursor.fetchall()}
+                skipped = [table for table in tables if not columns[table]]
+                tables = [table for table in tables if columns[table]]
+                if replace:
+                    cursor.execute(
+                        f"TRUNCATE {', '.join(f'public.{table}' for table in tables)} RESTART IDENTITY"
+                    )
+                for source in sources:
+                    if source.table in skipped:
+                        continue
+                    loaded.append((source, load_source(cursor, source, columns[source.table])))
+                for table in tables:
+                    reset_sequences(cursor, table)
+            if dry_run:
+                conn.rollback()
+            else:
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return loaded, skipped
+
+
+def main(args):
+    started = time.time()
+    with db.connection() as conn:
+        target = db.describe(conn.get_dsn_parameters())
+        try:
+            loaded, skipped = restore(conn, args.directory, replace=args.replace, dry_run=args.dry_run)
+        except (OSError, ValueError, RuntimeError, psycopg2.Error) as e:
+            print(f"❌ {e}")
+            return 2
+
+    print(f"📦 {args.directory} -> {target}")
+    for source, inserted in loaded:
+        present = f", {source.rows - inserted} already present" if source.rows != inserted else ""
+        print(f"   {source.table:20s} {inserted:>9} of {source.rows} row(s){present}")
+    for table in skipped:
+        print(f"   {table:20s} ⚠️  not in the database, skipped")
+    verb = "Would restore" if args.dry_run else "Restored"
+    print(f"✅ {verb} {sum(inserted for _, inserted in loaded)} row(s) in one transaction "
+          f"in {time.time() - started:.2f}s")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('restore', help='load a backup directory with COPY, in dependency order')
+    parser.add_argument('directory', help='export directory (manifest.json) or legacy backup with full_backup.sql')
+    parser.add_argument('--replace', action='store_true', help='truncate the restored tables first (fails if other tables reference them)')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.set_defaults(func=main, writes=True)
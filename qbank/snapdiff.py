@@ -0,0 +1,366 @@
+"""
+Row-level diff between two snapshot directories.
+
+    python -m qbank snapdiff db_backup_20260108T144359 db_backup_20260301T090000
+    python -m qbank snapdiff OLD NEW --tables questions mcq_options --limit 50
+    python -m qbank snapdiff OLD NEW --jsonl changes.jsonl     # every delta, one JSON per line
+
+Either side may be an export directory (manifest + COPY files) or a
+legacy backup (<table>.json files, else full_backup.sql), read with the
+same precedence as the offline snapshot loader. Values are compared in
+one canonical text form, so a JSON backup can be diffed against a COPY
+export: booleans as t/f, numbers as text, timestamps as UTC ISO.
+
+Each table is a hash join on its primary key: the old side is loaded into
+a dict, the new side streamed past it. A side larger than --max-rows is
+split into PARTITIONS spill files by key hash (both sides, same hash) and
+the partitions are joined one at a time, recursively if one is still too
+big, so memory stays bounded whatever the table size.
+"""
+import json
+import os
+import pickle
+import re
+import tempfile
+from functools import lru_cache
+from itertools import chain
+
+from qbank.restore import spill_dump
+from qbank.snapshot import (
+    DUMP_FILE, MANIFEST, iter_copy_rows, iter_json_array, normalize_timestamp,
+)
+
+# Tables whose key is not "id"
+PRIMARY_KEYS = {}
+
+MAX_ROWS = 200_000
+PARTITIONS = 32
+MAX_DEPTH = 4
+SPILL_BATCH = 1000
+
+TIMESTAMP_TEXT_RE = re.compile(r'^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}')
+
+MISSING = object()
+
+
+def canonical(value):
+    """One text form for a value, whichever snapshot format it came from."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, sort_keys=True)
+    text = str(value)
+    if TIMESTAMP_TEXT_RE.match(text):
+        try:
+            return normalize_timestamp(text)
+        except ValueError:
+            pass
+    return text
+
+
+# ---------------------------------------------------------------------------
+# Reading a snapshot table by table
+# ---------------------------------------------------------------------------
+
+def _copy_reader(columns, path):
+    columns = tuple(columns)
+    return columns, lambda: ((columns, row) for row in iter_copy_rows(path))
+
+
+def _json_reader(path):
+    first = next(iter(iter_json_array(path)), None)
+    columns = tuple(first) if first else ()
+    return columns, lambda: ((tuple(item), tuple(item.values())) for item in iter_json_array(path))
+
+
+def table_readers(directory, workdir):
+    """
+    {table: [(columns, rows)]} for a snapshot directory, where rows() yields
+    (columns, row) pairs. A legacy dump is spilled to COPY files under
+    `workdir` once, so tables can then be read one at a time.
+    """
+    if not os.path.isdir(directory):
+        raise RuntimeError(f"Snapshot directory not found: {directory}")
+    readers = {}
+    manifest = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            for table, entry in json.load(f)['tables'].items():
+                readers[table] = [_copy_reader(entry['columns'], os.path.join(directory, entry['file']))]
+    for name in sorted(os.listdir(directory)):
+        table = name[:-len('.json')]
+        if name.endswith('.json') and name != MANIFEST and table not in readers:
+            readers[table] = [_json_reader(os.path.join(directory, name))]
+    dump = os.path.join(directory, DUMP_FILE)
+    if os.path.exists(dump):
+        covered = set(readers)
+        for source in spill_dump(dump, tempfile.mkdtemp(dir=workdir)):
+            if source.table not in covered:
+                readers.setdefault(source.table, []).append(_copy_reader(source.columns, source.path))
+    return readers
+
+
+@lru_cache(maxsize=4096)
+def _timestamp_text(text):
+    try:
+        return normalize_timestamp(text)
+    except ValueError:
+        return text
+
+
+def _converter(value):
+    """How to canonicalise a column, judged from its first non-null value."""
+    if isinstance(value, str):
+        return _timestamp_text if TIMESTAMP_TEXT_RE.match(value) else str
+    return canonical
+
+
+def _keyed(readers, columns, key):
+    """(key, values over `columns`) for every row of a table's readers."""
+    layouts = {}
+    width = len(key)
+    for _, rows in readers:
+        for row_columns, row in rows():
+            layout = layouts.get(row_columns)
+            if layout is None:
+                lookup = {column: i for i, column in enumerate(row_columns)}
+                indexes = [lookup.get(column) for column in chain(key, columns)]
+                layout = layouts[row_columns] = (indexes, [None] * len(indexes))
+            indexes, converters = layout
+            out = []
+            for n, i in enumerate(indexes):
+                value = None if i is None else row[i]
+                if value is not None:
+                    convert = converters[n]
+                    if convert is None:
+                        convert = converters[n] = _converter(value)
+                    value = convert(value)
+                out.append(value)
+            yield tuple(out[:width]), tuple(out[width:])
+
+
+# ---------------------------------------------------------------------------
+# Hash join
+# ---------------------------------------------------------------------------
+
+def _partition(rows, workdir, depth):
+    """Spill (key, values) pairs into PARTITIONS files by key hash, pickled in batches."""
+    directory = tempfile.mkdtemp(dir=workdir)
+    paths = [os.path.join(directory, f"{i:02d}.pickle") for i in range(PARTITIONS)]
+    files = [open(path, 'wb') for path in paths]
+    batches = [[] for _ in paths]
+    try:
+        for row in rows:
+            n = hash((depth, row[0])) % PARTITIONS
+            batches[n].append(row)
+            if len(batches[n]) >= SPILL_BATCH:
+                pickle.dump(batches[n], files[n], pickle.HIGHEST_PROTOCOL)
+                batches[n] = []
+        for f, batch in zip(files, batches):
+            if batch:
+                pickle.dump(batch, f, pickle.HIGHEST_PROTOCOL)
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_partition(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                break
+    os.remove(path)
+
+
+def hash_join(old, new, emit, workdir, max_rows=MAX_ROWS, depth=0):
+    """
+    Join two (key, values) streams on key and emit(op, key, before, after).
+
+    op is 'added', 'removed', 'changed' or 'same'. The old side is built into
+    a dict; past `max_rows` both sides are partitioned to disk instead.
+    """
+    build = {}
+    old = iter(old)
+    for key, values in old:
+        build[key] = values
+        if len(build) > max_rows and depth < MAX_DEPTH:
+            old_parts = _partition(chain(build.items(), old), workdir, depth)
+            build = None
+            new_parts = _partition(new, workdir, depth)
+            for old_path, new_path in zip(old_parts, new_parts):
+                hash_join(_read_partition(old_path), _read_partition(new_path), emit, workdir, max_rows, depth + 1)
+            return
+    for key, values in new:
+        before = build.pop(key, MISSING)
+        if before is MISSING:
+            emit('added', key, None, values)
+        elif before != values:
+            emit('changed', key, before, values)
+        else:
+            emit('same', key, before, values)
+    for key, values in build.items():
+        emit('removed', key, values, None)
+
+
+class TableDiff:
+    __slots__ = ('table', 'key', 'columns', 'columns_added', 'columns_removed', 'counts', 'examples', 'limit')
+
+    def __init__(self, table, key, columns, columns_added=(), columns_removed=(), limit=20):
+        self.table = table
+        self.key = key
+        self.columns = columns
+        self.columns_added = list(columns_added)
+        self.columns_removed = list(columns_removed)
+        self.counts = {'added': 0, 'removed': 0, 'changed': 0, 'same': 0}
+        self.examples = []
+        self.limit = limit
+
+    def deltas(self, before, after):
+        """{column: [old, new]} for the columns that differ."""
+        return {
+            column: [old, new]
+            for column, old, new in zip(self.columns, before, after)
+            if old != new
+        }
+
+    def record(self, op, key, before, after):
+        self.counts[op] += 1
+        if op != 'same' and len(self.examples) < self.limit:
+            self.examples.append((op, key, before, after))
+
+    @property
+    def differs(self):
+        return bool(self.columns_added or self.columns_removed or any(
+            self.counts[op] for op in ('added', 'removed', 'changed')
+        ))
+
+
+def diff_table(table, old_readers, new_readers, workdir, max_rows=MAX_ROWS, limit=20, sink=None):
+    """Diff one table; `sink(record)` gets every delta as a JSON-ready dict."""
+    old_columns = list(dict.fromkeys(c for columns, _ in old_readers for c in columns))
+    new_columns = list(dict.fromkeys(c for columns, _ in new_readers for c in columns))
+    key = PRIMARY_KEYS.get(table, ('id',))
+    columns = [c for c in old_columns if c in new_columns and c not in key]
+    if not all(c in old_columns and c in new_columns for c in key):
+        key = tuple(columns)  # no usable key: whole rows, so only adds and removes
+    result = TableDiff(
+        table, key, columns,
+        columns_added=[c for c in new_columns if c not in old_columns],
+        columns_removed=[c for c in old_columns if c not in new_columns],
+        limit=limit,
+    )
+
+    def emit(op, row_key, before, after):
+        result.record(op, row_key, before, after)
+        if sink is not None and op != 'same':
+            record = {'table': table, 'op': op, 'key': dict(zip(key, row_key))}
+            if op == 'changed':
+                record['changes'] = result.deltas(before, after)
+            else:
+                record['row'] = dict(zip(columns, before if op == 'removed' else after))
+            sink(record)
+
+    hash_join(_keyed(old_readers, columns, key), _keyed(new_readers, columns, key), emit, workdir, max_rows)
+    return result
+
+
+def diff_snapshots(old_dir, new_dir, tables=None, max_rows=MAX_ROWS, limit=20, sink=None):
+    """
+    Diff every table of two snapshots. Returns ([TableDiff], tables only in
+    OLD, tables only in NEW).
+    """
+    with tempfile.TemporaryDirectory(prefix='qbank-snapdiff-') as workdir:
+        old = table_readers(old_dir, workdir)
+        new = table_readers(new_dir, workdir)
+        wanted = set(tables or old) | set(tables or new)
+        results = [
+            diff_table(table, old[table], new[table], workdir, max_rows=max_rows, limit=limit, sink=sink)
+            for table in old if table in new and table in wanted
+        ]
+    return results, sorted(set(old) - set(new) & wanted), sorted(set(new) - set(old) & wanted)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def _short(value, width=60):
+    text = repr(value)
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def _key_label(result, key):
+    return ', '.join(f"{name}={value}" for name, value in zip(result.key, key))
+
+
+def print_table(result):
+    counts = result.counts
+    marker = "❌" if result.differs else "✅"
+    print(f"{marker} {result.table:20s} +{counts['added']} -{counts['removed']} ~{counts['changed']}"
+          f" ({counts['same']} unchanged)")
+    for column in result.columns_added:
+        print(f"      column added:   {column}")
+    for column in result.columns_removed:
+        print(f"      column removed: {column}")
+    for op, key, before, after in result.examples:
+        if op == 'changed':
+            changes = ', '.join(
+                f"{column} {_short(old, 30)} -> {_short(new, 30)}"
+                for column, (old, new) in result.deltas(before, after).items()
+            )
+            print(f"      ~ {_key_label(result, key)}: {changes}")
+        else:
+            sign = '+' if op == 'added' else '-'
+            row = after if op == 'added' else before
+            print(f"      {sign} {_key_label(result, key)}: {_short(dict(zip(result.columns, row)), 100)}")
+    shown = len(result.examples)
+    total = counts['added'] + counts['removed'] + counts['changed']
+    if total > shown:
+        print(f"      ... and {total - shown} more")
+
+
+def main(args):
+    out = open(args.jsonl, 'w', encoding='utf-8') if args.jsonl else None
+    sink = (lambda record: out.write(json.dumps(record, ensure_ascii=False) + '\n')) if out else None
+    try:
+        results, only_old, only_new = diff_snapshots(
+            args.old, args.new, tables=args.tables, max_rows=args.max_rows, limit=args.limit, sink=sink,
+        )
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 2
+    finally:
+        if out:
+            out.close()
+
+    print(f"📦 {args.old} -> {args.new}")
+    for result in results:
+        print_table(result)
+    for table in only_old:
+        print(f"❌ {table:20s} only in {args.old}")
+    for table in only_new:
+        print(f"❌ {table:20s} only in {args.new}")
+
+    changed = sum(r.counts['added'] + r.counts['removed'] + r.counts['changed'] for r in results)
+    differs = any(r.differs for r in results) or only_old or only_new
+    print(f"{'❌' if differs else '✅'} {changed} row difference(s) across {len(results)} table(s)")
+    if args.jsonl:
+        print(f"📝 Every delta written to {args.jsonl}")
+    return 1 if differs else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('snapdiff', help='row-level diff between two snapshot directories')
+    parser.add_argument('old', help='older snapshot: export directory or db_backup_* directory')
+    parser.add_argument('new', help='newer snapshot')
+    parser.add_argument('--tables', nargs='+', metavar='TABLE', help='only these tables')
+    parser.add_argument('--limit', type=int, default=20, help='example rows printed per table')
+    parser.add_argument('--jsonl', metavar='FILE', help='write every delta as JSON lines')
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS,
+                        help='rows held in memory per join before partitions are spilled to disk')
+    parser.set_defaults(func=main)
@@ -0,0 +1,520 @@
+"""
+Offline backend: a db_backup_* snapshot loaded into in-process SQLite.
+
+    python -m qbank --snapshot db_backup_20260108T144359 diagnose
+    QBANK_SNAPSHOT=db_backup_20260108T144359 python check_all_fill_answers.py
+
+Two layouts are understood. `python -m qbank export` (qbank/export.py)
+writes <table>.copy.gz files listed in manifest.json; those are read line
+by line. scripts/export-database.mjs writes one <table>.json per table plus
+full_backup.sql. Tables with a JSON file are streamed from it one object
+at a time (never json.load-ed whole); the rest are taken from the INSERT
+statements of full_backup.sql in a single streaming pass. Everything lands
+in an in-memory SQLite database behind a small psycopg2-shaped connection,
+so db.get_connection() can hand it to the same bank, reconciliation,
+integrity and inspector code that normally talks to Render.
+
+The snapshot is read-only: write statements and the bulk writer's COPY are
+refused, and the CLI turns away fix, apply and revert up front.
+"""
+import gzip
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+DUMP_FILE = 'full_backup.sql'
+MANIFEST = 'manifest.json'
+
+INT = 'INTEGER'
+TEXT = 'TEXT'
+BOOL = 'BOOLEAN'
+TS = 'TIMESTAMPTZ'
+
+# SQLite mirror of scripts/01_create_schema.sql plus later migrations. Columns
+# found in a snapshot but not listed here are added untyped.
+SCHEMA = {
+    'subjects': (('id', INT), ('name', TEXT), ('description', TEXT), ('created_at', TS)),
+    'levels': (
+        ('id', INT), ('level_number', INT), ('name', TEXT), ('description', TEXT),
+        ('difficulty', TEXT), ('created_at', TS),
+    ),
+    'question_types': (('id', INT), ('name', TEXT), ('description', TEXT), ('created_at', TS)),
+    'questions': (
+        ('id', INT), ('subject_id', INT), ('level_id', INT), ('question_type_id', INT),
+        ('question_text', TEXT), ('instruction', TEXT), ('image_url', TEXT), ('timer_seconds', INT),
+        ('display_title', TEXT), ('created_by', TEXT), ('created_at', TS), ('updated_at', TS),
+    ),
+    'mcq_options': (
+        ('id', INT), ('question_id', INT), ('option_order', INT), ('option_text', TEXT),
+        ('is_correct', BOOL), ('created_at', TS),
+    ),
+    'matching_pairs': (
+        ('id', INT), ('question_id', INT), ('pair_order', INT), ('left_item', TEXT),
+        ('right_item', TEXT), ('created_at', TS),
+    ),
+    'fill_answers': (
+        ('id', INT), ('question_id', INT), ('answer_text', TEXT), ('case_sensitive', BOOL), ('created_at', TS),
+    ),
+    'reorder_items': (
+        ('id', INT), ('question_id', INT), ('item_order', INT), ('item_text', TEXT),
+        ('correct_position', INT), ('created_at', TS),
+    ),
+    'truefalse_answers': (
+        ('id', INT), ('question_id', INT), ('correct_answer', BOOL), ('explanation', TEXT), ('created_at', TS),
+    ),
+    'leaderboard': (
+        ('id', INT), ('player_name', TEXT), ('subject_id', INT), ('level_id', INT),
+        ('total_points', INT), ('stars_earned', INT), ('game_date', TS), ('created_at', TS),
+    ),
+    'user_profiles': (
+        ('id', TEXT), ('email', TEXT), ('full_name', TEXT), ('phone_number', TEXT),
+        ('avatar_url', TEXT), ('auth_provider', TEXT), ('created_at', TS), ('updated_at', TS),
+    ),
+}
+
+CHILD_INDEXES = ('mcq_options', 'matching_pairs', 'fill_answers', 'reorder_items', 'truefalse_answers')
+
+BATCH_SIZE = 1000
+
+
+# ---------------------------------------------------------------------------
+# Readers
+# ---------------------------------------------------------------------------
+
+def iter_json_array(path, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array without loading the file whole."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as f:
+        buf = f.read(chunk_size).lstrip()
+        if not buf.startswith('['):
+            raise ValueError(f"{path}: expected a JSON array")
+        pos, eof = 1, False
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            value = end = None
+            if pos < len(buf):
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            # need more input: nothing decodable yet, or a value that may continue
+            if end is None or (end == len(buf) and not eof):
+                if eof:
+                    raise ValueError(f"{path}: unterminated JSON array")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield value
+            pos = end
+
+
+COPY_ESCAPE_RE = re.compile(r'\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|(.))')
+COPY_ESCAPES = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+
+
+def _copy_unescape(match):
+    octal, hexa, char = match.groups()
+    if octal:
+        return chr(int(octal, 8))
+    if hexa:
+        return chr(int(hexa, 16))
+    return COPY_ESCAPES.get(char, char)
+
+
+def iter_copy_rows(path):
+    """Yield the rows of a COPY text-format file (gzip'd if *.gz) as tuples of str/None."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='\n') as f:
+        for line in f:
+            yield tuple(
+                None if field == '\\N' else COPY_ESCAPE_RE.sub(_copy_unescape, field) if '\\' in field else field
+                for field in line.rstrip('\n').split('\t')
+            )
+
+
+INSERT_RE = re.compile(r'INSERT\s+INTO\s+"?([\w.]+)"?\s*\(([^)]*)\)\s*VALUES\s*', re.IGNORECASE)
+
+VALUE_RE = re.compile(r"""
+    \s*(?:
+        (?P<str>'(?:[^']|'')*')
+      | (?P<num>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<kw>NULL|TRUE|FALSE)
+    )(?:::[\w ]+(?:\[\])?)?\s*(?P<sep>[,)])
+""", re.IGNORECASE | re.VERBOSE)
+
+KEYWORDS = {'null': None, 'true': True, 'false': False}
+
+
+def _parse_values(text, pos):
+    """Parse '(v, v, ...), (...)' starting at `pos`; yields one tuple per row."""
+    while True:
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(text) or text[pos] != '(':
+            return
+        pos += 1
+        row = []
+        while True:
+            match = VALUE_RE.match(text, pos)
+            if match is None:
+                raise ValueError(f"Cannot parse value near: {text[pos:pos + 60]!r}")
+            string, number, keyword, sep = match.group('str', 'num', 'kw', 'sep')
+            if string is not None:
+                row.append(string[1:-1].replace("''", "'") if "''" in string else string[1:-1])
+            elif number is not None:
+                row.append(int(number) if number.lstrip('-').isdigit() else float(number))
+            else:
+                row.append(KEYWORDS[keyword.lower()])
+            pos = match.end()
+            if sep == ')':
+                break
+        yield tuple(row)
+
+
+def iter_dump_statements(path):
+    """Yield complete SQL statements of a dump, streaming it line by line."""
+    lines, in_string = [], False
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not lines and not in_string and (not line.strip() or line.lstrip().startswith('--')):
+                continue
+            lines.append(line)
+            if line.count("'") % 2:
+                in_string = not in_string
+            if not in_string and line.rstrip().endswith(';'):
+                yield ''.join(lines)
+                lines = []
+
+
+def iter_dump_rows(path, tables=None):
+    """Yield (table, columns, row) for every INSERT in a dump (optionally only `tables`)."""
+    headers = {}  # one parse per distinct "INSERT INTO t (cols)" prefix
+    for statement in iter_dump_statements(path):
+        statement = statement.lstrip()
+        match = INSERT_RE.match(statement)
+        if match is None:
+            continue
+        header = match.group(1, 2)
+        if header not in headers:
+            headers[header] = (
+                header[0].split('.')[-1],
+                tuple(c.strip().strip('"') for c in header[1].split(',')),
+            )
+        table, columns = headers[header]
+        if tables is not None and table not in tables:
+            continue
+        for row in _parse_values(statement, match.end()):
+            yield table, columns, row
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+def normalize_timestamp(value):
+    """Normalise a timestamp to UTC ISO text so string comparison orders correctly."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00').replace(' ', 'T', 1))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec='microseconds')
+
+
+def _boolean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ('t', 'true', '1', 'yes')
+    return bool(value)
+
+
+CONVERTERS = {TS: normalize_timestamp, BOOL: _boolean}
+
+
+class _Table:
+    """Column bookkeeping for one table while it is loaded."""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.types = dict(SCHEMA.get(name, ()))
+        columns = ', '.join(
+            f'"{column}" {ctype}' + (' PRIMARY KEY' if column == 'id' else '')
+            for column, ctype in self.types.items()
+        ) or '"id" PRIMARY KEY'
+        conn.execute(f'CREATE TABLE IF NOT EXISTS "{name}" ({columns})')
+        if not self.types:
+            self.types = {'id': ''}
+        self.count = 0
+
+    def insert(self, columns, rows):
+        for column in columns:
+            if column not in self.types:
+                self.conn.execute(f'ALTER TABLE "{self.name}" ADD COLUMN "{column}"')
+                self.types[column] = ''
+        converters = [CONVERTERS.get(self.types[column]) for column in columns]
+        quoted = ', '.join(f'"{column}"' for column in columns)
+        sql = f'INSERT OR IGNORE INTO "{self.name}" ({quoted}) VALUES ({", ".join("?" * len(columns))})'
+        batch = []
+        for row in rows:
+            batch.append(tuple(
+                convert(value) if convert else _plain(value)
+                for convert, value in zip(converters, row)
+            ))
+            if len(batch) >= BATCH_SIZE:
+                self.count += len(batch)
+                self.conn.executemany(sql, batch)
+                batch = []
+        if batch:
+            self.count += len(batch)
+            self.conn.executemany(sql, batch)
+
+
+def _plain(value):
+    """SQLite cannot bind dicts/lists (json/array columns); store them as JSON text."""
+    return json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+
+
+def _json_rows(path):
+    """(columns, row) pairs from a streamed JSON array of objects, grouped by key set."""
+    columns, batch = None, []
+    for item in iter_json_array(path):
+        keys = tuple(item)
+        if keys != columns and batch:
+            yield columns, batch
+            batch = []
+        columns = keys
+        batch.append(tuple(item.values()))
+        if len(batch) >= BATCH_SIZE:
+            yield columns, batch
+            batch = []
+    if batch:
+        yield columns, batch
+
+
+def load_snapshot(directory, conn=None):
+    """
+    Load a snapshot directory into SQLite. Returns (sqlite3 connection, {table: rows}).
+
+    Tables listed in an export manifest come from their COPY files;
+    <table>.json files win over full_backup.sql, and the dump is only read
+    for the tables that have neither, in one pass.
+    """
+    if not os.path.isdir(directory):
+        raise RuntimeError(f"Snapshot directory not found: {directory}")
+    conn = conn or sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+    tables = {name: _Table(conn, name) for name in SCHEMA}
+
+    def table_for(name):
+        if name not in tables:
+            tables[name] = _Table(conn, name)
+        return tables[name]
+
+    from_json = set()
+    manifest = os.path.join(directory, MANIFEST)
+    if os.path.exists(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            exported = json.load(f)['tables']
+        for table_name, entry in exported.items():
+            table, batch = table_for(table_name), []
+            for row in iter_copy_rows(os.path.join(directory, entry['file'])):
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    table.insert(entry['columns'], batch)
+                    batch = []
+            table.insert(entry['columns'], batch)
+            from_json.add(table_name)
+
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json') or name == MANIFEST or name[:-len('.json')] in from_json:
+            continue
+        table_name = name[:-len('.json')]
+        table = table_for(table_name)
+        for columns, rows in _json_rows(os.path.join(directory, name)):
+            table.insert(columns, rows)
+        from_json.add(table_name)
+
+    dump = os.path.join(directory, DUMP_FILE)
+    if os.path.exists(dump):
+        pending = {}
+        for table_name, columns, row in iter_dump_rows(dump):
+            if table_name in from_json:
+                continue
+            pending.setdefault((table_name, columns), []).append(row)
+            if len(pending[(table_name, columns)]) >= BATCH_SIZE:
+                table_for(table_name).insert(columns, pending.pop((table_name, columns)))
+        for (table_name, columns), rows in pending.items():
+            table_for(table_name).insert(columns, rows)
+
+    for table_name in CHILD_INDEXES:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_question" ON "{table_name}" (question_id)')
+    conn.commit()
+    return conn, {name: table.count for name, table in tables.items()}
+
+
+# ---------------------------------------------------------------------------
+# psycopg2-shaped connection
+# ---------------------------------------------------------------------------
+
+sqlite3.register_converter(BOOL, lambda value: value not in (b'0', b''))
+
+WRITE_RE = re.compile(r'^\s*(INSERT|UPDATE|DELETE|CREATE|ALTER|DROP|TRUNCATE)\b', re.IGNORECASE)
+READ_ONLY = "The offline snapshot is read-only ({}); run writes against the live database"
+
+TIMESTAMP_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}\+00:00$')
+
+# Postgres idioms used by the read paths, rewritten for SQLite. Array
+# parameters are bound as JSON text and expanded with json_each().
+TRANSLATIONS = (
+    (re.compile(r'([\w.]+)\s+ILIKE\s+ANY\(%s\)', re.IGNORECASE),
+     r'EXISTS (SELECT 1 FROM json_each(%s) WHERE \1 LIKE json_each.value)'),
+    (re.compile(r'=\s*ANY\(%s(?:::\w+\[\])?\)', re.IGNORECASE), r'IN (SELECT value FROM json_each(%s))'),
+    (re.compile(r'\bILIKE\b', re.IGNORECASE), 'LIKE'),
+    (re.compile(r'\bIS\s+DISTINCT\s+FROM\b', re.IGNORECASE), 'IS NOT'),
+    (re.compile(r'\bNOW\(\)', re.IGNORECASE), "strftime('%%Y-%%m-%%dT%%H:%%M:%%f000+00:00', 'now')"),
+    (re.compile(r'\bbtrim\(', re.IGNORECASE), 'trim('),
+)
+
+
+def translate(sql, params=None):
+    """Rewrite a psycopg2 query (%s placeholders, = ANY(array)) for sqlite3."""
+    for pattern, replacement in TRANSLATIONS:
+        sql = pattern.sub(replacement, sql)
+    sql = sql.replace('%%', '\x00').replace('%s', '?').replace('\x00', '%')
+    if params is None:
+        return sql, ()
+    return sql, tuple(_bind(value) for value in params)
+
+
+def _bind(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return json.dumps([_bind(v) for v in value], default=str)
+    if isinstance(value, datetime):
+        return normalize_timestamp(value)
+    return value
+
+
+def _convert_row(row, timestamp_columns):
+    if not timestamp_columns:
+        return row
+    row = list(row)
+    for i in timestamp_columns:
+        if isinstance(row[i], str) and TIMESTAMP_RE.match(row[i]):
+            row[i] = datetime.fromisoformat(row[i])
+    return tuple(row)
+
+
+class SnapshotCursor:
+    """The subset of the psycopg2 cursor API the qbank read paths use."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._cursor = connection._conn.cursor()
+        self._timestamps = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def execute(self, sql, params=None):
+        write = WRITE_RE.match(sql)
+        if write:
+            raise RuntimeError(READ_ONLY.format(write.group(1).upper()))
+        sql, params = translate(sql, params)
+        self._cursor.execute(sql, params)
+        self._timestamps = None
+        return self
+
+    def executemany(self, sql, seq):
+        write = WRITE_RE.match(sql)
+        if write:
+            raise RuntimeError(READ_ONLY.format(write.group(1).upper()))
+        sql = translate(sql)[0]
+        self._cursor.executemany(sql, [tuple(_bind(v) for v in params) for params in seq])
+
+    def _rows(self, rows):
+        if self._timestamps is None:
+            # decide once per result set which columns hold timestamp text
+            first = rows[0] if rows else ()
+            self._timestamps = tuple(
+                i for i, value in enumerate(first) if isinstance(value, str) and TIMESTAMP_RE.match(value)
+            )
+        return [_convert_row(row, self._timestamps) for row in rows]
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def fetchmany(self, size=None):
+        return self._rows(self._cursor.fetchmany(size or self._cursor.arraysize))
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._rows([row])[0]
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def copy_expert(self, sql, file):
+        raise RuntimeError(READ_ONLY.format('COPY'))
+
+    def close(self):
+        self._cursor.close()
+
+
+class SnapshotConnection:
+    """In-memory SQLite copy of a snapshot, shaped like a psycopg2 connection."""
+
+    dialect = 'sqlite'
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self._conn, self.counts = load_snapshot(directory)
+        self.closed = 0
+
+    def cursor(self):
+        return SnapshotCursor(self)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+        self.closed = 1
+
+    def get_dsn_parameters(self):
+        return {'host': 'snapshot', 'port': '', 'dbname': self.directory}
+
+
+_snapshots = {}
+
+
+def connect(directory):
+    """The loaded snapshot for `directory` (loaded once per process)."""
+    key = os.path.abspath(directory)
+    if key not in _snapshots or _snapshots[key].closed:
+        _snapshots[key] = SnapshotConnection(directory)
+    return _snapshots[key]
@@ -0,0 +1,199 @@
+"""
+Delta sync of the question tables between two databases.
+
+    python -m qbank sync --to postgresql://localhost/qbank --dry-run
+    python -m qbank sync --from "$LOCAL_URL"                         # push local -> configured DB
+    python -m qbank sync --to "$LOCAL_URL" --tables questions mcq_options
+
+Replaces the whole-table copies of scripts/full-sync.mjs and
+scripts/clean-sync.mjs. --from and --to default to the configured
+database; give at least one. Tables go parents first (questions, then
+its answer tables). For each one the range hashing of qbank/fingerprint.py
+finds the rows that differ, and only those are applied to the target in
+one transaction:
+
+  - the source rows to insert or update are streamed with one COPY out
+    of the source and one COPY into a stage on the target,
+  - one INSERT ... ON CONFLICT (id) DO UPDATE applies them,
+  - one DELETE removes the rows the source does not have (answer rows of
+    deleted questions go with them, ON DELETE CASCADE),
+  - the id sequence is moved past the highest id.
+
+A table that already matches costs the fingerprint's first level only.
+"""
+import tempfile
+
+import psycopg2
+
+from qbank import db
+from qbank.fingerprint import KEY, Side, compare_table, paired, tables_present
+from qbank.restore import reset_sequences
+
+SYNC_TABLES = (
+    'questions',
+    'mcq_options',
+    'matching_pairs',
+    'fill_answers',
+    'reorder_items',
+    'truefalse_answers',
+)
+
+# COPY buffer kept in memory up to this size, then spilled to disk
+SPOOL_SIZE = 8 << 20
+
+
+class TableSync:
+    __slots__ = ('table', 'inserted', 'updated', 'deleted', 'identical', 'note')
+
+    def __init__(self, table):
+        self.table = table
+        self.inserted = []
+        self.updated = []
+        self.deleted = []
+        self.identical = False
+        self.note = None
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def apply_rows(source_cursor, target_cursor, table, columns, upsert_ids, delete_ids):
+    """Copy `upsert_ids` from source to target and delete `delete_ids` there."""
+    quoted = ', '.join(_quote(column) for column in columns)
+    if upsert_ids:
+        select = source_cursor.mogrify(
+            f"SELECT {quoted} FROM public.{_quote(table)} WHERE {_quote(KEY)} = ANY(%s::bigint[])",
+            (sorted(upsert_ids),),
+        ).decode()
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as buffer:
+            source_cursor.copy_expert(f"COPY ({select}) TO STDOUT", buffer)
+            buffer.seek(0)
+            target_cursor.execute(
+                f"CREATE TEMP TABLE sync_stage ON COMMIT DROP AS "
+                f"SELECT {quoted} FROM public.{_quote(table)} WITH NO DATA"
+            )
+            target_cursor.copy_expert(f"COPY sync_stage ({quoted}) FROM STDIN", buffer)
+        updates = ', '.join(f"{_quote(c)} = EXCLUDED.{_quote(c)}" for c in columns if c != KEY)
+        target_cursor.execute(
+            f"INSERT INTO public.{_quote(table)} ({quoted}) OVERRIDING SYSTEM VALUE "
+            f"SELECT {quoted} FROM sync_stage "
+            f"ON CONFLICT ({_quote(KEY)}) DO UPDATE SET {updates}"
+        )
+    if delete_ids:
+        target_cursor.execute(
+            f"DELETE FROM public.{_quote(table)} WHERE {_quote(KEY)} = ANY(%s::bigint[])",
+            (sorted(delete_ids),),
+        )
+    if upsert_ids:
+        reset_sequences(target_cursor, table)
+
+
+def sync_table(source, target, target_conn, table, both, dry_run=False):
+    """Compare one table, then apply the difference to the target in one transaction."""
+    target.begin()
+    comparison = compare_table(source, target, table, both)
+    target_conn.rollback()  # the comparison ran read-only
+
+    result = TableSync(table)
+    result.identical = comparison.identical
+    if comparison.identical:
+        return result
+    if comparison.note:
+        result.note = comparison.note
+        return result
+    result.inserted = comparison.removed   # only in the source
+    result.updated = comparison.changed
+    result.deleted = comparison.added      # only in the target
+
+    columns = sorted(set(source.columns(table)) & set(target.columns(table)))
+    try:
+        apply_rows(source.cursor, target.cursor, table, columns, result.inserted + result.updated, result.deleted)
+        if dry_run:
+            target_conn.rollback()
+        else:
+            target_conn.commit()
+    except Exception:
+        target_conn.rollback()
+        raise
+    return result
+
+
+def sync(source_conn, target_conn, tables=SYNC_TABLES, dry_run=False):
+    """
+    Sync `tables` from source to target. Returns ([TableSync], sides).
+
+    The source is read in one repeatable-read snapshot; each target table
+    is compared and written in its own transaction.
+    """
+    with source_conn.cursor() as source_cursor, target_conn.cursor() as target_cursor:
+        source = Side(db.describe(source_conn.get_dsn_parameters()), source_cursor)
+        target = Side(db.describe(target_conn.get_dsn_parameters()), target_cursor)
+        source.begin()
+        present = set(tables_present(target, tables))
+        target_conn.rollback()
+        results = []
+        try:
+            with paired(source, target) as both:
+                for table in tables_present(source, tables):
+                    if table in present:
+                        results.append(sync_table(source, target, target_conn, table, both, dry_run=dry_run))
+        finally:
+            source_conn.rollback()
+    return results, (source, target)
+
+
+def _ids(keys, limit=10):
+    shown = ', '.join(str(key) for key in keys[:limit])
+    return shown + (f" ... (+{len(keys) - limit})" if len(keys) > limit else '')
+
+
+def main(args):
+    if not (args.source or args.target) or args.source == args.target:
+        print("❌ Give --from and/or --to (each defaults to the configured database), and make them differ")
+        return 2
+    unknown = [table for table in args.tables or () if table not in SYNC_TABLES]
+    if unknown:
+        print(f"❌ Not a question table: {', '.join(unknown)} (choose from {' '.join(SYNC_TABLES)})")
+        return 2
+    tables = [table for table in SYNC_TABLES if table in (args.tables or SYNC_TABLES)]
+
+    try:
+        with db.connection(args.source) as source_conn, db.connection(args.target) as target_conn:
+            results, sides = sync(source_conn, target_conn, tables=tables, dry_run=args.dry_run)
+    except (RuntimeError, psycopg2.Error) as e:
+        print(f"❌ {e}")
+        return 2
+
+    source, target = sides
+    print(f"🔄 {source.label} -> {target.label}")
+    changed = 0
+    for result in results:
+        if result.identical:
+            print(f"✅ {result.table:20s} identical")
+            continue
+        if result.note:
+            print(f"⚠️  {result.table:20s} {result.note}; not synced")
+            continue
+        rows = len(result.inserted) + len(result.updated) + len(result.deleted)
+        changed += rows
+        print(f"🔧 {result.table:20s} +{len(result.inserted)} ~{len(result.updated)} -{len(result.deleted)}")
+        for label, keys in (('insert', result.inserted), ('update', result.updated), ('delete', result.deleted)):
+            if keys:
+                print(f"      {label:7s} {KEY} {_ids(keys)}")
+    for side in sides:
+        print(f"   {side.label}: {side.queries} queries, ~{side.bytes / 1024:.1f} KB compared")
+    verb = "Would sync" if args.dry_run else "Synced"
+    print(f"✅ {verb} {changed} row(s) across {len(results)} table(s)")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('sync', help='push only the differing question rows from one database to another')
+    parser.add_argument('--from', dest='source', metavar='DATABASE_URL',
+                        help='source database (default: the configured one)')
+    parser.add_argument('--to', dest='target', metavar='DATABASE_URL',
+                        help='target database (default: the configured one)')
+    parser.add_argument('--tables', nargs='+', metavar='TABLE', help=f"subset of: {' '.join(SYNC_TABLES)}")
+    parser.add_argument('--dry-run', action='store_true', help='apply each table, then roll it back')
+    parser.set_defaults(func=main, writes=True)
@@ -0,0 +1,300 @@
+"""
+Hidden-character scan of every text column of the question tables.
+
+    python -m qbank scan-text                        # counts per column and kind, with samples
+    python -m qbank scan-text -o text.plan.gz        # ... and write a normalization plan
+    python -m qbank fix-text text.plan.gz --dry-run
+    python -m qbank fix-text text.plan.gz
+
+detailed_answer_check.py hex-dumps one answer to find the NBSP or trailing
+space that makes "Port-Louis" fail to match. Here every question, option,
+pair, answer and step is streamed once (one query per table) through
+precompiled checks:
+
+  - edge       leading or trailing whitespace,
+  - nbsp       no-break spaces (U+00A0, U+2007, U+202F),
+  - zero_width zero-width characters, soft hyphens and BOMs,
+  - smart_quote typographic quotes and primes,
+  - control    control characters other than tab and newline,
+  - non_nfc    text that changes under NFC normalization.
+
+Pure-ASCII text (nearly all of it) only pays for the edge and control
+checks; the rest goes through one combined regex. The plan records each
+value's fixed form (NFC, spaces for NBSPs, ASCII quotes, hidden characters
+dropped, stripped) with the value it replaces. fix-text applies it in one
+journaled transaction (put it back with "revert"), skipping values that
+changed since the scan.
+"""
+import gzip
+import json
+import re
+import time
+import unicodedata
+
+from qbank import db
+from qbank.contenthash import has_column, refresh_hashes
+from qbank.journal import journaled
+from qbank.normalize import SMART_QUOTES
+
+PLAN_VERSION = 1
+# rows fetched per round trip while streaming a table
+BATCH_SIZE = 10000
+
+# table -> text columns scanned
+TEXT_COLUMNS = {
+    'questions': ('question_text', 'instruction'),
+    'mcq_options': ('option_text',),
+    'matching_pairs': ('left_item', 'right_item'),
+    'fill_answers': ('answer_text',),
+    'reorder_items': ('item_text',),
+    'truefalse_answers': ('explanation',),
+}
+
+NBSP = '\u00a0\u2007\u202f'
+ZERO_WIDTH = '\u200b\u200c\u200d\u2060\ufeff\u00ad'
+CONTROL = ''.join(map(chr, [*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f]))
+
+# every suspect character in one class; the kind of each is then looked up
+SPECIAL_KINDS = {
+    **dict.fromkeys(NBSP, 'nbsp'),
+    **dict.fromkeys(ZERO_WIDTH, 'zero_width'),
+    **dict.fromkeys(SMART_QUOTES, 'smart_quote'),
+    **dict.fromkeys(CONTROL, 'control'),
+}
+SPECIAL_RE = re.compile(f'[{re.escape("".join(SPECIAL_KINDS))}]')
+CONTROL_RE = re.compile(f'[{re.escape(CONTROL)}]')
+KINDS = ('edge', 'nbsp', 'zero_width', 'smart_quote', 'control', 'non_nfc')
+
+FIX_TABLE = str.maketrans({
+    **{char: ' ' for char in NBSP},
+    **{char: None for char in ZERO_WIDTH + CONTROL},
+    **SMART_QUOTES,
+})
+
+FIX_STAGE_SQL = """
+    CREATE TEMP TABLE text_fix_stage (
+        table_name TEXT NOT NULL,
+        column_name TEXT NOT NULL,
+        id BIGINT NOT NULL,
+        before TEXT NOT NULL,
+        after TEXT NOT NULL
+    ) ON COMMIT DROP
+"""
+
+
+def anomalies(text):
+    """The set of KINDS found in `text` (empty for clean text)."""
+    found = set()
+    if text[:1].isspace() or text[-1:].isspace():
+        found.add('edge')
+    if text.isascii():
+        if CONTROL_RE.search(text):
+            found.add('control')
+        return found
+    found.update(map(SPECIAL_KINDS.__getitem__, SPECIAL_RE.findall(text)))
+    if not unicodedata.is_normalized('NFC', text):
+        found.add('non_nfc')
+    return found
+
+
+def clean(text):
+    """The normalized form the fix plan writes back."""
+    return unicodedata.normalize('NFC', text).translate(FIX_TABLE).strip()
+
+
+class Finding:
+    __slots__ = ('table', 'column', 'id', 'question_id', 'kinds', 'before', 'after')
+
+    def __init__(self, table, column, id, question_id, kinds, before, after):
+        self.table = table
+        self.column = column
+        self.id = id
+        self.question_id = question_id
+        self.kinds = kinds
+        self.before = before
+        self.after = after
+
+    def to_list(self):
+        return [self.table, self.column, self.id, self.question_id, self.before, self.after]
+
+
+class Scan:
+    __slots__ = ('findings', 'strings', 'counts', 'elapsed')
+
+    def __init__(self):
+        self.findings = []
+        self.strings = 0
+        self.counts = {}   # (table, column) -> {kind: values}
+        self.elapsed = 0.0
+
+
+def _stream(conn, sql):
+    """Rows of `sql` in batches; a server-side cursor on PostgreSQL."""
+    cursor = conn.cursor() if db.dialect(conn) == 'sqlite' else conn.cursor(name='textscan')
+    try:
+        cursor.execute(sql)
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def scan(conn, tables=tuple(TEXT_COLUMNS)):
+    """Stream the text columns of `tables` once. Returns a Scan."""
+    result = Scan()
+    started = time.perf_counter()
+    for table in tables:
+        columns = TEXT_COLUMNS[table]
+        parent = 'id' if table == 'questions' else 'question_id'
+        counts = [result.counts.setdefault((table, column), {}) for column in columns]
+        for row in _stream(conn, f"SELECT id, {parent}, {', '.join(columns)} FROM {table} ORDER BY id"):
+            for position, text in enumerate(row[2:]):
+                if text is None:
+                    continue
+                result.strings += 1
+                kinds = anomalies(text)
+                if not kinds:
+                    continue
+                column_counts = counts[position]
+                for kind in kinds:
+                    column_counts[kind] = column_counts.get(kind, 0) + 1
+                result.findings.append(
+                    Finding(table, columns[position], row[0], row[1], kinds, text, clean(text))
+                )
+        conn.rollback()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def write_plan(path, findings):
+    payload = {
+        'version': PLAN_VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'changes': [finding.to_list() for finding in findings if finding.after != finding.before],
+    }
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    return len(payload['changes'])
+
+
+def read_plan(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported text plan version {payload.get('version')!r} in {path}")
+    return payload
+
+
+def apply_fixes(conn, plan, dry_run=False):
+    """
+    Write the planned values in one journaled transaction. Returns (written, drifted, journal path).
+
+    `written` maps (table, column) to the ids updated. A value is skipped
+    (drifted) when it is neither the plan's "before" nor its "after" value
+    any more; one already fixed is left alone and not reported.
+    """
+    groups = {}
+    for table, column, row_id, question_id, before, after in plan['changes']:
+        if column not in TEXT_COLUMNS.get(table, ()):
+            raise ValueError(f"{table}.{column} is not a scanned text column")
+        groups.setdefault((table, column), []).append((row_id, question_id))
+
+    written, drifted = {}, []
+    with journaled(conn, 'fix-text', dry_run=dry_run) as (cursor, journal):
+        cursor.execute(FIX_STAGE_SQL)
+        db.copy_rows(
+            cursor, 'text_fix_stage', ('table_name', 'column_name', 'id', 'before', 'after'),
+            ((table, column, row_id, before, after) for table, column, row_id, _, before, after in plan['changes']),
+        )
+        for (table, column), rows in groups.items():
+            captured = journal.capture(cursor, table, {question_id for _, question_id in rows})
+            cursor.execute(f"""
+                UPDATE {table} t SET {column} = s.after
+                FROM text_fix_stage s
+                WHERE s.table_name = %s AND s.column_name = %s AND t.id = s.id AND t.{column} = s.before
+                RETURNING t.id
+            """, (table, column))
+            ids = {row[0] for row in cursor.fetchall()}
+            written[(table, column)] = sorted(ids)
+            cursor.execute(f"""
+                SELECT s.id FROM text_fix_stage s LEFT JOIN {table} t ON t.id = s.id
+                WHERE s.table_name = %s AND s.column_name = %s AND t.{column} IS DISTINCT FROM s.after
+                ORDER BY s.id
+            """, (table, column))
+            drifted.extend((table, column, row[0]) for row in cursor.fetchall())
+            touched = {question_id for row_id, question_id in rows if row_id in ids}
+            journal.discard(table, captured - touched)
+        if any(written.get(('questions', column)) for column in TEXT_COLUMNS['questions']) and has_column(cursor):
+            refresh_hashes(cursor)
+    return written, drifted, journal.path
+
+
+def _sample(text, width=60):
+    return repr(text if len(text) <= width else text[:width] + '...')
+
+
+def scan_main(args):
+    with db.connection() as conn:
+        result = scan(conn)
+
+    print(f"🔍 Scanned {result.strings} text value(s) in {result.elapsed:.2f}s "
+          f"({result.strings / max(result.elapsed, 1e-9):,.0f}/s)")
+    for (table, column), counts in result.counts.items():
+        if counts:
+            detail = ', '.join(f"{kind} {counts[kind]}" for kind in KINDS if kind in counts)
+            print(f"   ⚠️  {table}.{column}: {detail}")
+    limit = None if args.all else 20
+    for finding in result.findings[:limit]:
+        kinds = ','.join(kind for kind in KINDS if kind in finding.kinds)
+        print(f"      {finding.table}.{finding.column} id {finding.id} (Q{finding.question_id}) [{kinds}] "
+              f"{_sample(finding.before)} -> {_sample(finding.after)}")
+    if limit and len(result.findings) > limit:
+        print(f"      ... and {len(result.findings) - limit} more (--all to list them)")
+    if args.output:
+        planned = write_plan(args.output, result.findings)
+        print(f"📝 {planned} fix(es) written to {args.output} (apply with: python -m qbank fix-text {args.output})")
+    print(f"{'⚠️ ' if result.findings else '✅'} {len(result.findings)} value(s) with hidden or stray characters")
+    return 1 if result.findings else 0
+
+
+def fix_main(args):
+    try:
+        plan = read_plan(args.plan)
+    except (OSError, ValueError) as e:
+        print(f"❌ {args.plan}: {e}")
+        return 2
+    print(f"📄 {args.plan}: {len(plan['changes'])} value(s), created {plan.get('created_at')}")
+
+    with db.connection() as conn:
+        try:
+            written, drifted, journal_path = apply_fixes(conn, plan, dry_run=args.dry_run)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 2
+
+    for (table, column), ids in written.items():
+        print(f"   🔧 {table}.{column}: {len(ids)} value(s)")
+    for table, column, row_id in drifted[:20]:
+        print(f"   ⚠️  skipped {table}.{column} id {row_id}: changed since the scan")
+    if len(drifted) > 20:
+        print(f"   ... and {len(drifted) - 20} more skipped")
+    if journal_path:
+        print(f"📝 Journal: {journal_path}")
+    verb = "Would normalize" if args.dry_run else "Normalized"
+    print(f"✅ {verb} {sum(map(len, written.values()))} value(s) in one transaction")
+    return 1 if drifted else 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('scan-text', help='find NBSP, zero-width, smart quotes and stray spaces in text')
+    parser.add_argument('-o', '--output', metavar='PLAN', help='write a normalization plan (gzip JSON) for "fix-text"')
+    parser.add_argument('--all', action='store_true', help='list every finding, not just the first 20')
+    parser.set_defaults(func=scan_main)
+
+    parser = subparsers.add_parser('fix-text', help='write back the normalized text of a scan-text plan')
+    parser.add_argument('plan', help='plan written by "scan-text -o"')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.set_defaults(func=fix_main, writes=True)
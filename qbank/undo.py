@@ -0,0 +1,98 @@
+"""
+List and revert journaled runs.
+
+    python -m qbank journal                          # recorded runs, newest last
+    python -m qbank revert 20260108T144359-fix       # run id or unique prefix
+    python -m qbank revert --last --dry-run
+
+A revert puts back the rows the run recorded as they were before it (the
+answer rows of its questions, and for import / merge / canonicalize the
+questions, subjects and levels rows too): one COPY plus one UPDATE, DELETE
+and INSERT per table, parents first, in one transaction, however many rows
+the run touched. Questions the run inserted are deleted again. The revert
+is journaled itself, so it can be reverted in turn.
+"""
+import psycopg2
+
+from qbank import db
+from qbank.journal import PREIMAGE_COLUMNS, find_run, journaled, list_runs, read_run, run_id
+from qbank.writer import restore_preimage
+
+
+def revert_run(conn, payload, dry_run=False, command='revert'):
+    """Restore a journal payload in one journaled transaction. Returns ({table: rows written}, journal path)."""
+    tables = payload['tables']
+    with journaled(conn, command, dry_run=dry_run) as (cursor, journal):
+        for table, image in tables.items():
+            journal.capture(cursor, table, image['question_ids'])
+        # deleting a question takes its answer rows with it (ON DELETE CASCADE)
+        if 'questions' in tables:
+            for table in PREIMAGE_COLUMNS:
+                journal.capture(cursor, table, tables['questions']['question_ids'])
+        restored = restore_preimage(cursor, tables)
+    return restored, journal.path
+
+
+def journal_main(args):
+    runs = list_runs()
+    if not runs:
+        print("No journaled runs")
+        return 0
+    for path in runs[-args.limit:] if args.limit else runs:
+        payload = read_run(path)
+        tables = ', '.join(
+            f"{table} {len(image['question_ids'])}q/{len(image['rows'])}r"
+            for table, image in payload['tables'].items()
+        )
+        print(f"{run_id(path):45s} {payload.get('command', ''):30s} {tables}")
+    print(f"{len(runs)} run(s)")
+    return 0
+
+
+def revert_main(args):
+    if not (args.run or args.last):
+        print("❌ Give a run id (see: python -m qbank journal) or --last")
+        return 2
+    runs = list_runs()
+    if args.last and not runs:
+        print("❌ No journaled runs")
+        return 2
+    try:
+        path = runs[-1] if args.last else find_run(args.run)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    try:
+        payload = read_run(path)
+    except (OSError, ValueError) as e:
+        print(f"❌ {path}: {e}")
+        return 2
+    name = run_id(path)
+    print(f"📄 {name}: {payload.get('command')} at {payload.get('created_at')}")
+    with db.connection() as conn:
+        try:
+            restored, journal_path = revert_run(conn, payload, dry_run=args.dry_run, command=f"revert {name}")
+        except psycopg2.Error as e:
+            print(f"❌ Revert of {name} failed, nothing was changed: {e}")
+            return 2
+
+    for table, count in restored.items():
+        print(f"   {table}: {count} row(s)")
+    verb = "Would restore" if args.dry_run else "Restored"
+    print(f"✅ {verb} {sum(restored.values())} row(s) in one transaction")
+    if journal_path:
+        print(f"📝 Journaled as {run_id(journal_path)}")
+    return 0
+
+
+def register(subparsers):
+    parser = subparsers.add_parser('journal', help='list the journaled write runs')
+    parser.add_argument('--limit', type=int, help='only the last N runs')
+    parser.set_defaults(func=journal_main)
+
+    parser = subparsers.add_parser('revert', help='restore the rows a journaled run changed')
+    parser.add_argument('run', nargs='?', help='run id (or unique prefix) or path to a journal file')
+    parser.add_argument('--last', action='store_true', help='revert the most recent run')
+    parser.add_argument('--dry-run', action='store_true', help='run the transaction, then roll it back')
+    parser.set_defaults(func=revert_main, writes=True)
@@ -0,0 +1,204 @@
+"""
+Streaming loader for the PSAC question workbook.
+
+The workbook has one sheet per question type (MCQ, Matching, Fill, Reorder,
+TrueFalse) with the column headers from lib/excel-utils.ts. Sheets are opened
+with read_only=True and walked with iter_rows(values_only=True); the header
+row is mapped to column indexes once, and each data row becomes a compact
+__slots__ record. Memory use does not grow with the number of rows when the
+records are consumed through iter_workbook().
+"""
+import os
+
+DEFAULT_WORKBOOK = os.getenv(
+    'QBANK_WORKBOOK',
+    r"C:\Users\Abdallah Peerally\Downloads\Questions_PSAC_History and Geography_2018.xlsx",
+)
+
+MCQ_LABELS = ('A', 'B', 'C', 'D')
+
+
+def cell_text(value):
+    """Cell value as stripped text; integral floats lose their '.0' (1722.0 -> '1722')."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _level(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return cell_text(value) or None
+
+
+class SheetRow:
+    """Columns shared by every question sheet."""
+    __slots__ = ('row', 'subject', 'level', 'type', 'question', 'instruction', 'image_url', 'timer')
+
+    qtype = None
+    # attribute -> header name; repeated column groups come from header_groups()
+    COLUMNS = {
+        'subject': 'subject',
+        'level': 'level',
+        'type': 'type',
+        'question': 'question',
+        'instruction': 'instruction',
+        'image_url': 'imageUrl',
+        'timer': 'timer',
+    }
+
+    @classmethod
+    def header_groups(cls):
+        """Extra header lists for multi-column fields, e.g. options -> [optionA, ...]."""
+        return {}
+
+    def __repr__(self):
+        return f"<{type(self).__name__} row {self.row}: {self.question[:40]!r}>"
+
+
+class McqRow(SheetRow):
+    __slots__ = ('options', 'correct_answer')
+    qtype = 'mcq'
+    COLUMNS = dict(SheetRow.COLUMNS, correct_answer='correctAnswer')
+
+    @classmethod
+    def header_groups(cls):
+        return {'options': [f'option{label}' for label in MCQ_LABELS]}
+
+
+class MatchingRow(SheetRow):
+    __slots__ = ('pairs',)
+    qtype = 'matching'
+
+    @classmethod
+    def header_groups(cls):
+        return {'pairs': [(f'leftItem{i}', f'rightItem{i}') for i in range(1, 5)]}
+
+
+class FillRow(SheetRow):
+    __slots__ = ('answer',)
+    qtype = 'fill'
+    COLUMNS = dict(SheetRow.COLUMNS, answer='answer')
+
+
+class ReorderRow(SheetRow):
+    __slots__ = ('steps',)
+    qtype = 'reorder'
+
+    @classmethod
+    def header_groups(cls):
+        return {'steps': [f'step{i}' for i in range(1, 5)]}
+
+
+class TrueFalseRow(SheetRow):
+    __slots__ = ('is_true',)
+    qtype = 'truefalse'
+    COLUMNS = dict(SheetRow.COLUMNS, is_true='isTrue')
+
+
+# sheet name -> record type
+SHEET_TYPES = {
+    'MCQ': McqRow,
+    'Matching': MatchingRow,
+    'Fill': FillRow,
+    'Reorder': ReorderRow,
+    'TrueFalse': TrueFalseRow,
+}
+
+
+def _column_map(record_cls, header):
+    """Resolve header names to column indexes once per sheet."""
+    positions = {}
+    for index, name in enumerate(header):
+        if name is not None:
+            positions.setdefault(str(name).strip(), index)
+
+    columns = [(attr, positions.get(name)) for attr, name in record_cls.COLUMNS.items()]
+    groups = []
+    for attr, names in record_cls.header_groups().items():
+        if names and isinstance(names[0], tuple):
+            groups.append((attr, [(positions.get(a), positions.get(b)) for a, b in names]))
+        else:
+            groups.append((attr, [positions.get(n) for n in names]))
+    return columns, groups
+
+
+def _get(values, index):
+    if index is None or index >= len(values):
+        return None
+    return values[index]
+
+
+def iter_sheet(ws, record_cls):
+    """Yield one record per non-blank row of a read-only worksheet."""
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    columns, groups = _column_map(record_cls, header)
+    question_index = dict(columns)['question']
+
+    for row_num, values in enumerate(rows, start=2):
+        if not cell_text(_get(values, question_index)):
+            continue
+        record = record_cls.__new__(record_cls)
+        record.row = row_num
+        for attr, index in columns:
+            value = _get(values, index)
+            setattr(record, attr, _level(value) if attr == 'level' else cell_text(value))
+        for attr, indexes in groups:
+            if indexes and isinstance(indexes[0], tuple):
+                items = tuple(
+                    (cell_text(_get(values, a)), cell_text(_get(values, b))) for a, b in indexes
+                )
+                items = tuple(pair for pair in items if pair[0] or pair[1])
+            else:
+                items = tuple(cell_text(_get(values, i)) for i in indexes)
+                if attr == 'steps':
+                    items = tuple(step for step in items if step)
+            setattr(record, attr, items)
+        yield record
+
+
+def record_fields(record_cls):
+    """All slot names of a record type, base columns first."""
+    return SheetRow.__slots__ + record_cls.__slots__
+
+
+def record_to_tuple(record):
+    return tuple(getattr(record, name) for name in record_fields(type(record)))
+
+
+def record_from_tuple(record_cls, values):
+    record = record_cls.__new__(record_cls)
+    for name, value in zip(record_fields(record_cls), values):
+        setattr(record, name, value)
+    return record
+
+
+def iter_workbook(path=None, sheets=None):
+    """Stream (sheet name, record) pairs from a read-only workbook."""
+    from openpyxl import load_workbook as openpyxl_load
+
+    path = path or DEFAULT_WORKBOOK
+    wb = openpyxl_load(path, read_only=True, data_only=True)
+    try:
+        for sheet_name in wb.sheetnames:
+            record_cls = SHEET_TYPES.get(sheet_name)
+            if record_cls is None or (sheets and sheet_name not in sheets):
+                continue
+            for record in iter_sheet(wb[sheet_name], record_cls):
+                yield sheet_name, record
+    finally:
+        wb.close()
+
+
+def load_workbook(path=None, sheets=None):
+    """Parse every question sheet once: {sheet name: [record, ...]}."""
+    result = {name: [] for name in SHEET_TYPES if not sheets or name in sheets}
+    for sheet_name, record in iter_workbook(path, sheets):
+        result[sheet_name].append(record)
+    return result
@@ -0,0 +1,123 @@
+"""
+On-disk cache of parsed workbook records.
+
+The PSAC workbook rarely changes between runs, so the parsed records are
+stored in a marshal file next to the key they were built from: file size,
+mtime and a BLAKE2 hash of the contents. A size mismatch is an immediate
+miss and a matching size and mtime an immediate hit, so a warm load reads
+neither the workbook nor openpyxl. Only when the mtime moved is the file
+hashed: a touched-but-unchanged file still hits (and its new mtime is
+stored), any real edit invalidates the entry.
+"""
+import hashlib
+import marshal
+import os
+
+from qbank.workbook import (
+    DEFAULT_WORKBOOK, SHEET_TYPES, iter_workbook, record_from_tuple, record_to_tuple,
+)
+
+CACHE_DIR = os.getenv('QBANK_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'qbank'))
+
+# Bump when the record layout in qbank/workbook.py changes.
+FORMAT_VERSION = 1
+MAGIC = b'QBWB'
+
+
+def content_hash(path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(path, cache_dir=None):
+    name = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=10).hexdigest()
+    return os.path.join(cache_dir or CACHE_DIR, f'workbook-{name}.bin')
+
+
+def read_entry(cache_file, magic=MAGIC, version=FORMAT_VERSION):
+    """
+    Load a marshal cache entry, or None when it is missing or stale.
+
+    `magic` is the file signature written by write_entry() and `version` the
+    value the entry's 'version' key must hold; other caches sharing this
+    format (qbank/ledger.py) pass their own pair so a file of one kind is
+    never read as the other. Unreadable or corrupt files count as misses.
+    """
+    try:
+        with open(cache_file, 'rb') as f:
+            if f.read(len(magic)) != magic:
+                return None
+            entry = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != version:
+        return None
+    return entry
+
+
+def write_entry(cache_file, entry, magic=MAGIC):
+    """
+    Atomically store `entry` (a marshal-able dict with a 'version' key)
+    behind the `magic` signature, creating the cache directory if needed.
+    """
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(magic)
+        marshal.dump(entry, f)
+    os.replace(tmp_file, cache_file)
+
+
+def _decode(entry, sheets):
+    return {
+        name: [record_from_tuple(SHEET_TYPES[name], values) for values in rows]
+        for name, rows in entry['sheets'].items()
+        if not sheets or name in sheets
+    }
+
+
+def load_cached(path=None, sheets=None, cache_dir=None, refresh=False):
+    """
+    Drop-in replacement for workbook.load_workbook() backed by the cache.
+
+    Returns {sheet name: [record, ...]}. The whole workbook is cached, the
+    `sheets` filter is applied on the way out.
+    """
+    path = path or DEFAULT_WORKBOOK
+    stat = os.stat(path)
+    cache_file = cache_path(path, cache_dir)
+
+    entry = None if refresh else read_entry(cache_file)
+    if entry is not None and entry['size'] == stat.st_size:
+        if entry['mtime_ns'] == stat.st_mtime_ns:
+            # same size and mtime: hit without reading the workbook
+            return _decode(entry, sheets)
+        if entry['hash'] == content_hash(path):
+            # touched but unchanged: refresh the stored key
+            entry['mtime_ns'] = stat.st_mtime_ns
+            try:
+                write_entry(cache_file, entry)
+            except OSError:
+                pass
+            return _decode(entry, sheets)
+
+    # Miss: parse once with the streaming loader
+    parsed = {name: [] for name in SHEET_TYPES}
+    for sheet_name, record in iter_workbook(path):
+        parsed[sheet_name].append(record_to_tuple(record))
+
+    entry = {
+        'version': FORMAT_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': content_hash(path),
+        'sheets': parsed,
+    }
+    try:
+        write_entry(cache_file, entry)
+    except OSError as e:
+        print(f"⚠️  Could not write workbook cache {cache_file}: {e}")
+    return _decode(entry, sheets)
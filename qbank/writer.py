@@ -0,0 +1,307 @@
+"""
+Bulk correction writer.
+
+Corrections are COPYed into a temporary staging table and applied with one
+set-based UPDATE ... FROM, all inside a single short transaction. There is no
+up-front "reset every flag" step, so the live game never sees an MCQ with no
+correct answer while a fix is running, and only rows whose value actually
+changes are written. Questions whose answer rows change get their updated_at
+bumped, which is what the reconciliation ledger (qbank/ledger.py) watches.
+
+Every stage_and_apply_* takes the run's Journal (qbank/journal.py) and
+captures the pre-image of the questions it staged before it writes.
+"""
+from qbank import db
+from qbank.journal import PREIMAGE_COLUMNS, RESTORE_ORDER, journaled, preimage_key
+
+MCQ_STAGE_SQL = """
+    CREATE TEMP TABLE mcq_correct_stage (
+        question_id BIGINT PRIMARY KEY,
+        option_order INT NOT NULL
+    ) ON COMMIT DROP
+"""
+
+# Staged questions whose target option does not exist would otherwise end up
+# with every flag cleared; drop them from the stage and report them instead.
+MCQ_REJECT_SQL = """
+    DELETE FROM mcq_correct_stage s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mcq_options mo
+        WHERE mo.question_id = s.question_id AND mo.option_order = s.option_order
+    )
+    RETURNING s.question_id, s.option_order
+"""
+
+MCQ_APPLY_SQL = """
+    UPDATE mcq_options mo
+    SET is_correct = (mo.option_order = s.option_order)
+    FROM mcq_correct_stage s
+    WHERE mo.question_id = s.question_id
+      AND mo.is_correct IS DISTINCT FROM (mo.option_order = s.option_order)
+    RETURNING mo.id, mo.question_id, mo.option_order, mo.is_correct
+"""
+
+
+TOUCH_SQL = "UPDATE questions SET updated_at = NOW() WHERE id = ANY(%s)"
+
+
+def touch_questions(cursor, question_ids):
+    question_ids = sorted(set(question_ids))
+    if question_ids:
+        cursor.execute(TOUCH_SQL, (question_ids,))
+
+
+def _capture(cursor, journal, table, question_ids):
+    return journal.capture(cursor, table, question_ids) if journal is not None else set()
+
+
+def _finish(cursor, journal, table, captured, changed):
+    """Bump updated_at of the changed questions; drop the unchanged ones from the journal."""
+    changed_ids = {row[1] for row in changed}
+    touch_questions(cursor, changed_ids)
+    if journal is not None:
+        journal.discard(table, captured - changed_ids)
+
+
+class WriteResult:
+    __slots__ = ('staged', 'changed', 'rejected', 'journal')
+
+    def __init__(self, staged, changed, rejected):
+        self.staged = staged      # number of questions staged
+        self.changed = changed    # [(option id, question id, option_order, new is_correct)]
+        self.rejected = rejected  # [(question id, option_order)] with no such option
+        self.journal = None       # journal file of the run, once saved
+
+    @property
+    def questions_changed(self):
+        return len({row[1] for row in self.changed})
+
+
+def stage_and_apply_mcq(cursor, corrections, journal=None):
+    """Run the staging/update statements on an open cursor (caller owns the transaction)."""
+    latest = dict(corrections)  # last correction per question wins
+    captured = _capture(cursor, journal, 'mcq_options', latest)
+    cursor.execute(MCQ_STAGE_SQL)
+    staged = db.copy_rows(cursor, 'mcq_correct_stage', ('question_id', 'option_order'), latest.items())
+    cursor.execute(MCQ_REJECT_SQL)
+    rejected = cursor.fetchall()
+    cursor.execute(MCQ_APPLY_SQL)
+    result = WriteResult(staged, cursor.fetchall(), rejected)
+    _finish(cursor, journal, 'mcq_options', captured, result.changed)
+    return result
+
+
+def apply_mcq_corrections(conn, corrections, dry_run=False, command='mcq-corrections'):
+    """
+    Make option `option_order` the only correct option of each question.
+
+    `corrections` is an iterable of (question_id, option_order). Everything
+    runs in one journaled transaction: COPY into the stage, one UPDATE ...
+    FROM, journal saved, commit (or roll back when dry_run is set).
+    """
+    with journaled(conn, command, dry_run=dry_run) as (cursor, journal):
+        result = stage_and_apply_mcq(cursor, corrections, journal)
+    result.journal = journal.path
+    return result
+
+
+FILL_STAGE_SQL = """
+    CREATE TEMP TABLE fill_answer_stage (
+        question_id BIGINT PRIMARY KEY,
+        answer_text TEXT NOT NULL
+    ) ON COMMIT DROP
+"""
+
+FILL_APPLY_SQL = """
+    UPDATE fill_answers fa
+    SET answer_text = s.answer_text
+    FROM fill_answer_stage s
+    WHERE fa.question_id = s.question_id
+      AND fa.answer_text IS DISTINCT FROM s.answer_text
+    RETURNING fa.id, fa.question_id, fa.answer_text
+"""
+
+FILL_INSERT_SQL = """
+    INSERT INTO fill_answers (question_id, answer_text, case_sensitive)
+    SELECT s.question_id, s.answer_text, FALSE
+    FROM fill_answer_stage s
+    WHERE NOT EXISTS (SELECT 1 FROM fill_answers fa WHERE fa.question_id = s.question_id)
+    RETURNING id, question_id, answer_text
+"""
+
+
+def stage_and_apply_fill(cursor, answers, journal=None):
+    """Set the fill answer of each (question_id, answer_text); questions without a row get one."""
+    latest = dict(answers)
+    captured = _capture(cursor, journal, 'fill_answers', latest)
+    cursor.execute(FILL_STAGE_SQL)
+    staged = db.copy_rows(cursor, 'fill_answer_stage', ('question_id', 'answer_text'), latest.items())
+    cursor.execute(FILL_APPLY_SQL)
+    changed = cursor.fetchall()
+    cursor.execute(FILL_INSERT_SQL)
+    changed.extend(cursor.fetchall())
+    _finish(cursor, journal, 'fill_answers', captured, changed)
+    return WriteResult(staged, changed, [])
+
+
+TRUEFALSE_STAGE_SQL = """
+    CREATE TEMP TABLE truefalse_answer_stage (
+        question_id BIGINT PRIMARY KEY,
+        correct_answer BOOLEAN NOT NULL
+    ) ON COMMIT DROP
+"""
+
+TRUEFALSE_APPLY_SQL = """
+    UPDATE truefalse_answers ta
+    SET correct_answer = s.correct_answer
+    FROM truefalse_answer_stage s
+    WHERE ta.question_id = s.question_id
+      AND ta.correct_answer IS DISTINCT FROM s.correct_answer
+    RETURNING ta.id, ta.question_id, ta.correct_answer
+"""
+
+TRUEFALSE_INSERT_SQL = """
+    INSERT INTO truefalse_answers (question_id, correct_answer)
+    SELECT s.question_id, s.correct_answer
+    FROM truefalse_answer_stage s
+    WHERE NOT EXISTS (SELECT 1 FROM truefalse_answers ta WHERE ta.question_id = s.question_id)
+    RETURNING id, question_id, correct_answer
+"""
+
+
+def stage_and_apply_truefalse(cursor, answers, journal=None):
+    """Set the true/false answer of each (question_id, bool); questions without a row get one."""
+    latest = dict(answers)
+    captured = _capture(cursor, journal, 'truefalse_answers', latest)
+    cursor.execute(TRUEFALSE_STAGE_SQL)
+    staged = db.copy_rows(cursor, 'truefalse_answer_stage', ('question_id', 'correct_answer'), latest.items())
+    cursor.execute(TRUEFALSE_APPLY_SQL)
+    changed = cursor.fetchall()
+    cursor.execute(TRUEFALSE_INSERT_SQL)
+    changed.extend(cursor.fetchall())
+    _finish(cursor, journal, 'truefalse_answers', captured, changed)
+    return WriteResult(staged, changed, [])
+
+
+# One row per item: item_rank is the item's 1-based rank by item_order, so
+# specs do not depend on whether a question's item_order starts at 0 or 1.
+REORDER_STAGE_SQL = """
+    CREATE TEMP TABLE reorder_position_stage (
+        question_id BIGINT NOT NULL,
+        item_rank INT NOT NULL,
+        correct_position INT NOT NULL,
+        PRIMARY KEY (question_id, item_rank)
+    ) ON COMMIT DROP
+"""
+
+# A question whose staged positions do not cover exactly its stored items
+# would end up half re-ordered; drop it from the stage and report it instead.
+REORDER_REJECT_SQL = """
+    DELETE FROM reorder_position_stage s
+    USING (
+        SELECT st.question_id, st.n AS staged, COALESCE(ri.n, 0) AS stored
+        FROM (SELECT question_id, count(*) AS n FROM reorder_position_stage GROUP BY question_id) st
+        LEFT JOIN (
+            SELECT question_id, count(*) AS n FROM reorder_items
+            WHERE question_id IN (SELECT question_id FROM reorder_position_stage)
+            GROUP BY question_id
+        ) ri USING (question_id)
+        WHERE st.n <> COALESCE(ri.n, 0)
+    ) bad
+    WHERE s.question_id = bad.question_id
+    RETURNING s.question_id, bad.staged, bad.stored
+"""
+
+REORDER_APPLY_SQL = """
+    UPDATE reorder_items ri
+    SET correct_position = s.correct_position
+    FROM (
+        SELECT id, question_id,
+               row_number() OVER (PARTITION BY question_id ORDER BY item_order, id) AS item_rank
+        FROM reorder_items
+        WHERE question_id IN (SELECT question_id FROM reorder_position_stage)
+    ) r
+    JOIN reorder_position_stage s ON s.question_id = r.question_id AND s.item_rank = r.item_rank
+    WHERE ri.id = r.id
+      AND ri.correct_position IS DISTINCT FROM s.correct_position
+    RETURNING ri.id, ri.question_id, ri.item_order, ri.correct_position
+"""
+
+
+def stage_and_apply_reorder(cursor, positions, journal=None):
+    """
+    Set correct_position of every item of each (question_id, [positions]).
+
+    `positions` lists the correct position of each item in item_order order;
+    questions whose item count does not match are rejected untouched.
+    """
+    latest = dict(positions)
+    captured = _capture(cursor, journal, 'reorder_items', latest)
+    cursor.execute(REORDER_STAGE_SQL)
+    db.copy_rows(
+        cursor, 'reorder_position_stage', ('question_id', 'item_rank', 'correct_position'),
+        ((question_id, rank, position)
+         for question_id, items in latest.items()
+         for rank, position in enumerate(items, 1)),
+    )
+    cursor.execute(REORDER_REJECT_SQL)
+    rejected = sorted(set(cursor.fetchall()))
+    cursor.execute(REORDER_APPLY_SQL)
+    result = WriteResult(len(latest), cursor.fetchall(), rejected)
+    _finish(cursor, journal, 'reorder_items', captured, result.changed)
+    return result
+
+
+def restore_preimage(cursor, preimage):
+    """
+    Put the rows of a pre-image (or journal run) back: one COPY and one
+    UPDATE, DELETE and INSERT per table, parents first.
+
+    For the pre-image's questions, rows that changed are updated back, rows
+    added since are deleted and rows deleted since are re-inserted under
+    their old ids (OVERRIDING SYSTEM VALUE: every id is GENERATED ALWAYS AS
+    IDENTITY). questions, subjects and levels images are keyed on the row's
+    own id. Returns {table: number of rows written}.
+    """
+    restored = {}
+    for table in sorted(preimage, key=RESTORE_ORDER.index):
+        image = preimage[table]
+        key = preimage_key(table)
+        columns = image['columns']
+        stage = f"{table}_restore_stage"
+        values = [c for c in columns if c != 'id']
+        cursor.execute(
+            f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {', '.join(columns)} FROM {table} WITH NO DATA"
+        )
+        db.copy_rows(cursor, stage, columns, image['rows'])
+
+        touched = []
+        if values:
+            target = ', '.join(f"t.{c}" for c in values)
+            source = ', '.join(f"s.{c}" for c in values)
+            cursor.execute(f"""
+                UPDATE {table} t SET {', '.join(f'{c} = s.{c}' for c in values)}
+                FROM {stage} s
+                WHERE t.id = s.id AND ({target}) IS DISTINCT FROM ({source})
+                RETURNING t.{key}
+            """)
+            touched.extend(row[0] for row in cursor.fetchall())
+        cursor.execute(f"""
+            DELETE FROM {table} t
+            WHERE t.{key} = ANY(%s) AND NOT EXISTS (SELECT 1 FROM {stage} s WHERE s.id = t.id)
+            RETURNING t.{key}
+        """, (image['question_ids'],))
+        deleted = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)}) OVERRIDING SYSTEM VALUE
+            SELECT {', '.join(f's.{c}' for c in columns)} FROM {stage} s
+            WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = s.id)
+            RETURNING {key}
+        """)
+        touched.extend(row[0] for row in cursor.fetchall())
+        if table in PREIMAGE_COLUMNS:
+            touch_questions(cursor, touched + deleted)
+        elif table == 'questions':
+            touch_questions(cursor, touched)
+        restored[table] = len(touched) + len(deleted)
+    return restored
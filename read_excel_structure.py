@@ -4,7 +4,8 @@ sys.stdout.reconfigure(encoding='utf-8')
 import openpyxl
 
 excel_path = r"C:\Users\Abdallah Peerally\Downloads\Questions_PSAC_History and Geography_2018.xlsx"
-wb = openpyxl.load_workbook(excel_path, data_only=True)
+# read_only streams rows instead of materializing every cell
+wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
 
 print("EXCEL FILE ANALYSIS")
 print("=" * 80)
@@ -16,19 +17,16 @@ for sheet_name in wb.sheetnames:
     print(f"SHEET: {sheet_name}")
     print(f"Rows: {ws.max_row}, Columns: {ws.max_column}")
     
+    rows = ws.iter_rows(max_row=6, values_only=True)
+    
     # Print header row
-    headers = []
-    for col in range(1, ws.max_column + 1):
-        val = ws.cell(row=1, column=col).value
-        headers.append(str(val) if val else f"Col{col}")
+    headers = [str(val) if val else f"Col{col}" for col, val in enumerate(next(rows, ()), start=1)]
     print(f"Headers: {headers}")
     
     # Print first 5 data rows
     print(f"\nFirst 5 data rows:")
-    for row in range(2, min(ws.max_row + 1, 7)):
-        row_data = {}
-        for col in range(1, ws.max_column + 1):
-            val = ws.cell(row=row, column=col).value
-            if val is not None:
-                row_data[headers[col-1]] = val
+    for row, values in enumerate(rows, start=2):
+        row_data = {headers[col]: val for col, val in enumerate(values) if val is not None and col < len(headers)}
         print(f"  Row {row}: {row_data}")
+
+wb.close()
@@ -1,15 +1,8 @@
-import psycopg2
+from qbank import db
 import json
 
 try:
-    conn = psycopg2.connect(
-        host="dpg-d63imsvpm1nc73bmh530-a.singapore-postgres.render.com",
-        database="mauriitus_game",
-        user="mauriitus_game_user",
-        password="7mNtoGVnBZiQqiNdxc990ZWsY0Dbw1xt",
-        port=5432,
-        sslmode="require"
-    )
+    conn = db.get_connection()
     cursor = conn.cursor()
     
     # Simulate what the API returns for question 142
@@ -81,7 +74,7 @@ try:
         print("❌ Question not found!")
     
     cursor.close()
-    conn.close()
+    db.release(conn)
 
 except Exception as e:
     print(f"❌ Error: {e}")
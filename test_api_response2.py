@@ -1,4 +1,4 @@
-import psycopg2
+from qbank import db
 import json
 import sys
 
@@ -6,14 +6,7 @@ import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
 try:
-    conn = psycopg2.connect(
-        host="dpg-d63imsvpm1nc73bmh530-a.singapore-postgres.render.com",
-        database="mauriitus_game",
-        user="mauriitus_game_user",
-        password="7mNtoGVnBZiQqiNdxc990ZWsY0Dbw1xt",
-        port=5432,
-        sslmode="require"
-    )
+    conn = db.get_connection()
     cursor = conn.cursor()
     
     # Simulate what the API returns for question 142
@@ -85,7 +78,7 @@ try:
         print("Question not found!")
     
     cursor.close()
-    conn.close()
+    db.release(conn)
 
 except Exception as e:
     print(f"Error: {e}")
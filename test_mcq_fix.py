@@ -4,45 +4,16 @@ Test script to verify the MCQ correct answer matching fix.
 Tests all three tiers of the fallback matching system.
 """
 
-import psycopg2
-from urllib.parse import urlparse
-import os
+from types import SimpleNamespace
 
-# Connect to database
-DATABASE_URL = os.environ.get('DATABASE_URL', '')
-if not DATABASE_URL:
-    # Try .env.local
-    try:
-        with open('.env.local', 'r') as f:
-            for line in f:
-                if line.startswith('DATABASE_URL='):
-                    DATABASE_URL = line.split('=', 1)[1].strip()
-                    break
-    except:
-        pass
+from qbank import db
+from qbank.bank import McqOption
+from qbank.integrity import audit
+from qbank.reconcile import expected_mcq_option
+from qbank.workbook import MCQ_LABELS
 
-if not DATABASE_URL:
-    print("❌ DATABASE_URL not found in environment or .env.local")
-    exit(1)
-
-# Parse connection string
-parsed = urlparse(DATABASE_URL)
-conn_params = {
-    'host': parsed.hostname,
-    'port': parsed.port or 5432,
-    'database': parsed.path.lstrip('/').split('?')[0],
-    'user': parsed.username,
-    'password': parsed.password,
-    'sslmode': 'require'
-}
-
-try:
-    conn = psycopg2.connect(**conn_params)
-    cursor = conn.cursor()
-    print("✅ Connected to database")
-except Exception as e:
-    print(f"❌ Database connection failed: {e}")
-    exit(1)
+conn = db.connect_or_exit()
+print("✅ Connected to database")
 
 # Test the matching logic with different answer formats
 test_cases = [
@@ -94,43 +65,19 @@ for i, test in enumerate(test_cases, 1):
     print(f"\n[Test {i}] {test['name']}")
     print(f"   Question: Match correctAnswer='{test['correctAnswer']}'")
     
-    # Simulate the matching logic from the fixed code
-    correctAnswerNorm = test['correctAnswer'].strip().lower()
+    # The matching logic shared with the import route and reconcile()
     options = [
-        {'text': test['optionA'].strip(), 'label': 'A'},
-        {'text': test['optionB'].strip(), 'label': 'B'},
-        {'text': test['optionC'].strip(), 'label': 'C'},
-        {'text': test['optionD'].strip(), 'label': 'D'},
+        McqOption(None, None, order, test[f'option{label}'], False)
+        for order, label in enumerate(MCQ_LABELS, 1)
     ]
-    
-    # Tier 1: Exact match
-    foundIndex = -1
-    for i_opt, opt in enumerate(options):
-        if opt['text'].lower() == correctAnswerNorm:
-            foundIndex = i_opt
-            break
-    
-    # Tier 2: Single letter match
-    if foundIndex == -1 and len(correctAnswerNorm) == 1:
-        letterChar = ord(correctAnswerNorm[0])
-        aCharCode = ord('a')
-        letterIndex = letterChar - aCharCode
-        if 0 <= letterIndex < 4:
-            foundIndex = letterIndex
-    
-    # Tier 3: Partial match
-    if foundIndex == -1 and len(correctAnswerNorm) > 0:
-        searchPrefix = correctAnswerNorm[:min(10, len(correctAnswerNorm))]
-        for i_opt, opt in enumerate(options):
-            if opt['text'].lower().startswith(searchPrefix):
-                foundIndex = i_opt
-                break
-    
+    match = expected_mcq_option(SimpleNamespace(correct_answer=test['correctAnswer']), options)
+    foundIndex = next((i_opt for i_opt, opt in enumerate(options) if opt is match), -1)
+
     if foundIndex != -1:
-        matchedLabel = options[foundIndex]['label']
+        matchedLabel = MCQ_LABELS[foundIndex]
         if matchedLabel == test['expected_match']:
             print(f"   ✅ PASS - Correctly matched to option {matchedLabel}")
-            print(f"              Option {matchedLabel}: '{options[foundIndex]['text']}'")
+            print(f"              Option {matchedLabel}: '{options[foundIndex].option_text}'")
         else:
             print(f"   ❌ FAIL - Matched to {matchedLabel}, expected {test['expected_match']}")
             all_passed = False
@@ -144,36 +91,23 @@ print("\n" + "="*70)
 print("\nDATABASE INTEGRITY CHECK")
 print("="*70)
 
-cursor.execute("""
-  SELECT 
-    COUNT(*) as total_mcq_questions,
-    COUNT(CASE WHEN correct_count = 1 THEN 1 END) as with_one_correct,
-    COUNT(CASE WHEN correct_count = 0 THEN 1 END) as with_zero_correct,
-    COUNT(CASE WHEN correct_count > 1 THEN 1 END) as with_multiple_correct
-  FROM (
-    SELECT question_id, COUNT(*) as correct_count
-    FROM mcq_options
-    WHERE is_correct = true
-    GROUP BY question_id
-  ) as counts
-""")
+report = audit(conn)
+total = report.totals.get('mcq', 0)
+zero_correct = len(report.by_kind('zero_correct'))
+multiple_correct = len(report.by_kind('multiple_correct'))
+one_correct = total - zero_correct - multiple_correct
+print(f"✅ Total MCQ questions: {total}")
+print(f"   ✅ With exactly 1 correct answer: {one_correct} ({100*one_correct//max(total,1)}%)")
+print(f"   ⚠️  With 0 correct answers: {zero_correct}")
+print(f"   ⚠️  With multiple correct answers: {multiple_correct}")
 
-result = cursor.fetchone()
-if result:
-    total, one_correct, zero_correct, multiple_correct = result
-    print(f"✅ Total MCQ questions: {total}")
-    print(f"   ✅ With exactly 1 correct answer: {one_correct} ({100*one_correct//max(total,1)}%)")
-    print(f"   ⚠️  With 0 correct answers: {zero_correct}")
-    print(f"   ⚠️  With multiple correct answers: {multiple_correct}")
-    
-    if zero_correct > 0 or multiple_correct > 0:
-        print(f"\n   ❌ Data integrity issue detected!")
-        all_passed = False
-    else:
-        print(f"\n   ✅ All MCQ questions have exactly one correct answer")
+if zero_correct > 0 or multiple_correct > 0:
+    print(f"\n   ❌ Data integrity issue detected!")
+    all_passed = False
+else:
+    print(f"\n   ✅ All MCQ questions have exactly one correct answer")
 
-cursor.close()
-conn.close()
+db.release(conn)
 
 print("\n" + "="*70)
 if all_passed:
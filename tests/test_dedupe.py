@@ -0,0 +1,110 @@
+"""MinHash signatures, LSH bucketing and merge plans of the near-duplicate scan (no database needed)."""
+import gzip
+import json
+
+import pytest
+
+from qbank.bank import FillAnswer, McqOption, Question, QuestionBank
+from qbank.dedupe import (
+    NUM_HASHES, PLAN_VERSION, _split, features, find_duplicates, jaccard, read_plan, signature, write_plan,
+)
+
+
+def _mcq(question_id, text, options=('Port-Louis', 'Curepipe', 'Mahebourg'), subject='History', level=1):
+    question = Question(question_id, subject, level, 'mcq', text, None, 30, None)
+    question.children = [
+        McqOption(question_id * 10 + order, question_id, order, option, order == 1)
+        for order, option in enumerate(options, 1)
+    ]
+    return question
+
+
+def _fill(question_id, text, answer):
+    question = Question(question_id, 'History', 1, 'fill', text, None, 30, None)
+    question.children = [FillAnswer(question_id, question_id, answer, False)]
+    return question
+
+
+def _bank(*questions):
+    return QuestionBank({question.id: question for question in questions})
+
+
+def _estimate(a, b):
+    return sum(x == y for x, y in zip(signature(a), signature(b))) / NUM_HASHES
+
+
+def test_signature_shape():
+    sig = signature(frozenset({'only one feature'}))
+    # every empty bin borrows a value, so a single feature fills the signature
+    assert len(sig) == NUM_HASHES and None not in sig
+    assert signature(frozenset({'a', 'b', 'c'})) == signature(frozenset({'c', 'b', 'a'}))
+
+
+@pytest.mark.parametrize('shared', [1000, 800, 500, 100])
+def test_signature_estimates_jaccard(shared):
+    a = frozenset(f'f{i}' for i in range(1000))
+    b = frozenset(f'f{i}' for i in range(1000 - shared, 2000 - shared))
+    assert abs(_estimate(a, b) - jaccard(a, b)) < 0.2
+
+
+def test_jaccard():
+    assert jaccard({1, 2}, {2, 3}) == 1 / 3
+    assert jaccard(set(), set()) == 1.0
+    assert jaccard({1}, set()) == 0.0
+
+
+def test_features_include_answers():
+    question = _mcq(1, 'Capital?')
+    assert {'option|port-louis', 'option|curepipe', 'correct|port-louis'} <= features(question)
+    assert 'correct|curepipe' not in features(question)
+    assert 'answer|1968' in features(_fill(2, 'Independence in ____', ' 1968 '))
+
+
+def test_find_duplicates():
+    bank = _bank(
+        _mcq(1, 'What is the capital of Mauritius?'),
+        _mcq(2, '  What is the CAPITAL of  Mauritius?'),
+        _mcq(3, 'What is the capital of Mauritius?', subject='Geography'),
+        _mcq(4, 'What is the capital of Mauritius?', options=('Rodrigues', 'Agalega', 'St Brandon')),
+        _mcq(5, 'Which river flows through Grand River South East?'),
+        _mcq(6, 'What is the capital of Mauritius?'),
+        _fill(7, 'Mauritius became independent in ____.', '1968'),
+        _fill(8, 'Mauritius became independent in ____.', '1968'),
+    )
+    clusters, stats = find_duplicates(bank, 0.9)
+    # subject partitions the scan (3); other options make another question (4)
+    assert [(c.keep.id, [q.id for q in c.drop]) for c in clusters] == [(1, [2, 6]), (7, [8])]
+    assert clusters[0].similarity == {2: 1.0, 6: 1.0}
+    assert jaccard(features(bank.get(1)), features(bank.get(4))) < 0.9
+    assert stats['questions'] == 8 and stats['pairs_checked'] >= 4
+
+
+def test_split_transitive_group():
+    bank = _bank(*(_mcq(i, f'q{i}') for i in range(1, 5)))
+    feature_sets = {
+        1: {1, 2, 3, 4},
+        2: {1, 2, 3, 4, 5},           # 0.8 to 1
+        3: {1, 2, 3, 4, 5, 6, 7},     # 0.57 to 1, 0.71 to 2
+        4: {1, 2, 3, 4, 5, 6, 7, 8},  # 0.875 to 3, 0.5 to 1
+    }
+    clusters = _split(bank, feature_sets, [1, 2, 3, 4], 0.7)
+    assert [(c.keep.id, [q.id for q in c.drop]) for c in clusters] == [(1, [2]), (3, [4])]
+
+
+def test_plan_round_trip(tmp_path):
+    bank = _bank(_mcq(1, 'What is the capital of Mauritius?'), _mcq(2, 'What is the capital of Mauritius?'))
+    clusters, _ = find_duplicates(bank, 0.9)
+    path = tmp_path / 'merge.plan.gz'
+    write_plan(path, clusters, 0.9)
+
+    plan = read_plan(path)
+    assert (plan['version'], plan['threshold']) == (PLAN_VERSION, 0.9)
+    (cluster,) = plan['clusters']
+    assert (cluster['keep'], cluster['drop']) == (1, [2])
+    # identical content, identical digests
+    assert cluster['digests']['1'] == cluster['digests']['2']
+
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(dict(plan, version=PLAN_VERSION + 1), f)
+    with pytest.raises(ValueError, match='Unsupported merge plan version'):
+        read_plan(path)
@@ -0,0 +1,50 @@
+"""Fix spec validation (no database needed)."""
+import json
+
+import pytest
+
+from qbank.fixspec import FixSpec
+
+
+def test_valid_spec(tmp_path):
+    path = tmp_path / 'fixes.json'
+    path.write_text(json.dumps({
+        'mcq': {'74': 2, '46': 1},
+        'fill': {'142': '1722'},
+        'truefalse': {'12': False},
+        'reorder': {'163': [2, 1, 4, 3]},
+    }), encoding='utf-8')
+    spec = FixSpec.load(path)
+    assert spec.fixes['mcq'] == {74: 2, 46: 1}
+    assert spec.fixes['truefalse'] == {12: False}
+    assert len(spec) == 5
+    assert spec.question_ids() == [12, 46, 74, 142, 163]
+    assert spec.question_ids('mcq') == [46, 74]
+
+
+def test_empty_sections():
+    spec = FixSpec.from_dict({'mcq': None, 'fill': {}})
+    assert len(spec) == 0
+    assert spec.fixes == {'mcq': {}, 'fill': {}, 'truefalse': {}, 'reorder': {}}
+
+
+def test_every_problem_reported():
+    with pytest.raises(ValueError) as excinfo:
+        FixSpec.from_dict({
+            'mcq': {'74': True, '46': '2', 'x': 1},
+            'fill': {'142': '   '},
+            'truefalse': {'12': 'false'},
+            'reorder': {'163': [1, 3, 4], '164': [1, 1, 2]},
+            'matching': {'1': [1]},
+        })
+    lines = str(excinfo.value).splitlines()
+    assert lines[0] == 'Invalid fix spec:'
+    assert [line.strip().split(':')[0] for line in lines[1:]] == [
+        "unknown section 'matching'",
+        'mcq 74', 'mcq 46', 'mcq x',
+        'fill 142',
+        'truefalse 12',
+        'reorder 163', 'reorder 164',
+    ]
+    assert "  mcq 74: expected an option_order, got True" in lines
+    assert "  reorder 163: expected a permutation of 1..n, got [1, 3, 4]" in lines
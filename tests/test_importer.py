@@ -0,0 +1,48 @@
+"""Workbook row validation and lookups of the importer (no database server needed)."""
+import sqlite3
+
+import pytest
+
+from qbank.importer import ImportResult, _lookups, stage_records
+from qbank.workbook import FillRow, record_from_tuple
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(':memory:')
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE subjects (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE levels (id INTEGER PRIMARY KEY, level_number INTEGER);
+        CREATE TABLE question_types (id INTEGER PRIMARY KEY, name TEXT);
+        INSERT INTO subjects VALUES (1, 'history'), (2, 'Géographie'), (3, 'GEOGRAPHIE'), (4, 'Histoire  locale');
+        INSERT INTO levels VALUES (1, 1), (2, 2);
+        INSERT INTO question_types VALUES (1, 'mcq'), (3, 'fill');
+    """)
+    yield cursor
+    conn.close()
+
+
+def _fill(row, subject, question='The Dutch arrived in ____.'):
+    return record_from_tuple(FillRow, (row, subject, 1, 'fill', question, None, None, None, '1638'))
+
+
+def test_subjects_keyed_on_normalized_name(cursor):
+    subjects, levels, qtypes = _lookups(cursor)
+    # accent-folded variants share a key; the lowest id wins
+    assert subjects == {'history': 1, 'geographie': 2, 'histoire locale': 4}
+    assert levels == {1: 1, 2: 2}
+    assert qtypes == {'mcq': 1, 'fill': 3}
+
+
+def test_accented_and_spaced_subjects_resolve(cursor):
+    result = ImportResult()
+    sheets = {'Fill': [
+        _fill(2, 'géographie', 'Q1 ____'),
+        _fill(3, 'Geographie ', 'Q2 ____'),
+        _fill(4, ' histoire   LOCALE', 'Q3 ____'),
+        _fill(5, 'Physics', 'Q4 ____'),
+    ]}
+    staged = stage_records(sheets, *_lookups(cursor), 'MES', result)
+    assert [row[1] for _, row, _ in staged.values()] == [2, 2, 4]
+    assert [(record.row, reason) for _, record, reason in result.rejected] == [(5, "unknown subject 'Physics'")]
@@ -0,0 +1,17 @@
+"""Question id arguments of the inspector (no database needed)."""
+import pytest
+
+from qbank.inspector import parse_ids
+
+
+def test_parse_ids():
+    assert parse_ids(['107', '46,74', '100-103']) == [46, 74, 100, 101, 102, 103, 107]
+    assert parse_ids([' 5 , 3,,', 3, '3-3']) == [3, 5]
+    assert parse_ids(['10-8']) == []
+    assert parse_ids([]) == []
+
+
+@pytest.mark.parametrize('spec', ['abc', '1-x', '-5'])
+def test_parse_ids_rejects(spec):
+    with pytest.raises(ValueError):
+        parse_ids([spec])
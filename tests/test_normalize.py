@@ -0,0 +1,58 @@
+"""normalize_text(): the ASCII fast path and the Unicode path agree (no database needed)."""
+import unicodedata
+
+import pytest
+
+from qbank.normalize import QUOTE_TABLE, fold_accents, normalize_text
+
+# (non-ASCII input, the ASCII text it must compare equal to)
+EQUIVALENT = [
+    ('Port\u00a0Louis', 'port louis'),  # NBSP
+    ('Port\u202fLouis\u3000', 'Port Louis'),  # narrow NBSP, ideographic space
+    ('Port\u200bLouis', 'PortLouis'),  # zero-width space
+    ('\ufeffMahe\u00adbourg\u200d', 'Mahebourg'),  # BOM, soft hyphen, zero-width joiner
+    ('Rivi\u00e8re Noire', 'Riviere Noire'),  # precomposed accent
+    ('Rivie\u0300re Noire', 'riviere noire'),  # combining accent
+    ('MAH\u00c9BOURG', 'mahebourg'),
+    ('\u2018Dodo\u2019 is \u201cextinct\u201d', '\'Dodo\' is "extinct"'),  # smart quotes
+    ('\ufb01nal \ufb02ag', 'final flag'),  # NFKC ligatures
+    ('\uff2c\uff45\uff56\uff45\uff4c 2', 'Level 2'),  # full-width letters
+    ('Stra\u00dfe', 'strasse'),  # casefold, not lower
+    ('  Grand\u00a0\u00a0Baie \t\n', 'grand baie'),
+]
+
+
+def _unicode_path(text):
+    """The non-ASCII branch of normalize_text(), applied unconditionally."""
+    text = fold_accents(unicodedata.normalize('NFKC', text).casefold()).translate(QUOTE_TABLE)
+    return ' '.join(text.lower().split())
+
+
+@pytest.mark.parametrize('text, ascii_text', EQUIVALENT)
+def test_unicode_matches_ascii(text, ascii_text):
+    assert not text.isascii() and ascii_text.isascii()
+    assert normalize_text(text) == normalize_text(ascii_text)
+
+
+@pytest.mark.parametrize('text', [
+    'Port Louis', '  What is   the CAPITAL?\t', "L'ile \"Maurice\"", 'A\r\nB', '', '   ', 'x' * 300,
+])
+def test_ascii_fast_path_is_the_unicode_path(text):
+    assert normalize_text(text) == _unicode_path(text)
+
+
+def test_whitespace_and_case():
+    assert normalize_text('  Port\t\tLOUIS \n') == 'port louis'
+    assert normalize_text('\u00a0\u2003') == ''
+
+
+def test_non_strings():
+    assert normalize_text(None) == ''
+    assert normalize_text(12) == '12'
+    assert normalize_text(1.5) == '1.5'
+    assert normalize_text(True) == 'true'
+
+
+def test_results_are_interned():
+    assert normalize_text('Rivière Noire') is normalize_text(' riviere  NOIRE')
+    assert normalize_text(''.join(['Port', ' Louis'])) is normalize_text('port louis')
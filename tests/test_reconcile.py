@@ -0,0 +1,48 @@
+"""Workbook <-> bank comparison of MCQ questions (no database needed)."""
+from qbank.bank import McqOption, Question
+from qbank.reconcile import compare_mcq
+from qbank.workbook import McqRow, record_from_tuple
+
+
+def _record(options, correct):
+    # row, subject, level, type, question, instruction, image_url, timer, options, correct_answer
+    return record_from_tuple(McqRow, (2, 'history', 1, 'mcq', 'Capital?', None, None, None, options, correct))
+
+
+def _question(texts, correct_order):
+    question = Question(7, 'history', 1, 'mcq', 'Capital?', None, 30, None)
+    question.children = [
+        McqOption(order, 7, order, text, order == correct_order) for order, text in enumerate(texts, 1)
+    ]
+    return question
+
+
+def _fields(differences):
+    return [(d.field, d.expected, d.actual) for d in differences]
+
+
+def test_matching_options():
+    record = _record(('Port-Louis', 'Curepipe', 'Mahebourg', 'Rose-Hill'), 'Port Louis'.replace(' ', '-'))
+    assert compare_mcq(record, _question(record.options, 1)) == []
+
+
+def test_wrong_correct_option():
+    record = _record(('Port-Louis', 'Curepipe', 'Mahebourg', 'Rose-Hill'), 'B')
+    assert _fields(compare_mcq(record, _question(record.options, 1))) == [('correct_option', 2, [1])]
+
+
+def test_fewer_stored_options():
+    record = _record(('Port-Louis', 'Curepipe', 'Mahebourg', 'Rose-Hill'), 'D')
+    question = _question(('Port-Louis', 'Curepipe', 'Mahebourg'), 1)
+    assert _fields(compare_mcq(record, question)) == [('option_count', 4, 3)]
+
+
+def test_extra_stored_options():
+    record = _record(('Port-Louis', 'Curepipe', 'Mahebourg', 'Rose-Hill'), 'A')
+    question = _question(('Port-Louis', 'Curepipe', 'Mahebourg', 'Rose-Hill', 'Vacoas'), 1)
+    assert _fields(compare_mcq(record, question)) == [('option_count', 4, 5)]
+
+
+def test_trailing_blank_workbook_options():
+    record = _record(('Port-Louis', 'Curepipe', 'Mahebourg', ''), 'A')
+    assert compare_mcq(record, _question(('Port-Louis', 'Curepipe', 'Mahebourg'), 1)) == []
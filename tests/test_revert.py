@@ -0,0 +1,179 @@
+"""
+Journaled writes and "revert" against the real schema (scripts/01_create_schema.sql).
+
+Needs a PostgreSQL server: set QBANK_TEST_DATABASE_URL to any database on
+it. Each test creates a scratch database there, loads the schema and drops
+the database again.
+
+    QBANK_TEST_DATABASE_URL=postgresql://postgres@localhost/postgres python -m pytest tests
+"""
+import os
+import uuid
+
+import psycopg2
+import pytest
+
+from qbank import db, journal
+from qbank.bank import load_bank
+from qbank.canonical import canonicalize_table
+from qbank.contenthash import migrate
+from qbank.dedupe import find_duplicates, merge, read_plan, write_plan
+from qbank.fixspec import FixSpec, apply_fix_spec
+from qbank.importer import import_records
+from qbank.undo import revert_run
+from qbank.workbook import FillRow, record_from_tuple
+
+TEST_DATABASE_URL = os.getenv('QBANK_TEST_DATABASE_URL')
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+SCHEMA = ('01_create_schema.sql', '04_add_image_url_column.sql', '14_add_instruction_column.sql')
+TABLES = ('subjects', 'levels', 'questions', 'mcq_options', 'fill_answers')
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason='QBANK_TEST_DATABASE_URL is not set')
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'JOURNAL_DIR', str(tmp_path / 'journal'))
+    params = db.resolve_dsn(database_url=TEST_DATABASE_URL)
+    name = f"qbank_test_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(**params)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE {name}")
+    try:
+        connection = psycopg2.connect(**{**params, 'dbname': name})
+        try:
+            with connection.cursor() as cursor:
+                for script in SCHEMA:
+                    with open(os.path.join(SCRIPTS, script), encoding='utf-8') as f:
+                        cursor.execute(f.read())
+            connection.commit()
+            yield connection
+        finally:
+            connection.close()
+    finally:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE {name}")
+        admin.close()
+
+
+def _question(cursor, text, subject='history', qtype='mcq', options=('Port-Louis', 'Curepipe', 'Mahebourg')):
+    cursor.execute("""
+        INSERT INTO questions (subject_id, level_id, question_type_id, question_text, created_by)
+        SELECT s.id, l.id, qt.id, %s, 'MES'
+        FROM subjects s, levels l, question_types qt
+        WHERE s.name = %s AND l.level_number = 1 AND qt.name = %s
+        RETURNING id
+    """, (text, subject, qtype))
+    question_id = cursor.fetchone()[0]
+    for order, option in enumerate(options, 1):
+        cursor.execute(
+            "INSERT INTO mcq_options (question_id, option_order, option_text, is_correct) VALUES (%s, %s, %s, %s)",
+            (question_id, order, option, order == 1),
+        )
+    return question_id
+
+
+def _snapshot(conn):
+    """Every row of TABLES, minus questions.updated_at (a revert touches it)."""
+    rows = {}
+    with conn.cursor() as cursor:
+        for table in TABLES:
+            cursor.execute(f"SELECT * FROM {table} ORDER BY id")
+            columns = [column[0] for column in cursor.description]
+            rows[table] = [
+                {c: v for c, v in zip(columns, row) if c != 'updated_at'} for row in cursor.fetchall()
+            ]
+    conn.rollback()
+    return rows
+
+
+def _revert(conn, path):
+    restored, _ = revert_run(conn, journal.read_run(path))
+    return restored
+
+
+def test_fix_spec_revert(conn):
+    with conn.cursor() as cursor:
+        question_id = _question(cursor, 'What is the capital of Mauritius?')
+    conn.commit()
+    before = _snapshot(conn)
+
+    results, path = apply_fix_spec(conn, FixSpec.from_dict({'mcq': {str(question_id): 2}}))
+    assert results['mcq'].questions_changed == 1
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM mcq_options WHERE question_id = %s AND option_order = 3", (question_id,))
+    conn.commit()
+    assert _snapshot(conn) != before
+
+    _revert(conn, path)
+    assert _snapshot(conn) == before
+
+
+def test_import_revert(conn):
+    with conn.cursor() as cursor:
+        _question(cursor, 'Mauritius became a republic in ____.', qtype='fill', options=())
+    conn.commit()
+    migrate(conn)
+    before = _snapshot(conn)
+
+    sheets = {'Fill': [
+        # row, subject, level, type, question, instruction, image_url, timer, answer
+        record_from_tuple(FillRow, (2, 'History', 1, 'fill', 'Mauritius became a republic in ____.',
+                                    'Give the year.', None, 45, '1992')),
+        record_from_tuple(FillRow, (3, 'History', 1, 'fill', 'Mauritius became independent in ____.',
+                                    None, None, None, '1968')),
+    ]}
+    result = import_records(conn, sheets)
+    assert (len(result.updated), len(result.inserted), result.rejected) == (1, 1, [])
+    assert len(_snapshot(conn)['fill_answers']) == 1
+
+    _revert(conn, result.journal_path)
+    assert _snapshot(conn) == before
+
+
+def test_merge_revert(conn, tmp_path):
+    with conn.cursor() as cursor:
+        kept = _question(cursor, 'Which river flows through Grand River South East?')
+        dropped = _question(cursor, 'Which river flows through Grand River South East?')
+    conn.commit()
+    before = _snapshot(conn)
+
+    clusters, _ = find_duplicates(load_bank(conn), 0.9)
+    conn.rollback()
+    write_plan(tmp_path / 'merge.plan.gz', clusters, 0.9)
+    deleted, drifted, dissimilar, path = merge(conn, read_plan(tmp_path / 'merge.plan.gz'))
+    assert (deleted, drifted, dissimilar) == ([dropped], [], [])
+    assert [row['id'] for row in _snapshot(conn)['questions']] == [kept]
+
+    _revert(conn, path)
+    assert _snapshot(conn) == before
+
+
+def test_canonicalize_revert(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO subjects (name) VALUES ('History ') RETURNING id")
+        variant = cursor.fetchone()[0]
+        question_id = _question(cursor, 'When did Mauritius become independent?', subject='History ')
+    conn.commit()
+    before = _snapshot(conn)
+
+    result = canonicalize_table(conn, 'subjects')
+    assert result.variant_ids == [variant]
+    after = _snapshot(conn)
+    assert variant not in [row['id'] for row in after['subjects']]
+    assert [row['subject_id'] for row in after['questions'] if row['id'] == question_id] != [variant]
+
+    _revert(conn, result.journal_path)
+    assert _snapshot(conn) == before
+
+
+def test_canonicalize_keeps_accents(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("INSERT INTO subjects (name) VALUES ('Géographie'), ('GEOGRAPHIE  '), ('Histoire  Locale')")
+    conn.commit()
+
+    canonicalize_table(conn, 'subjects')
+    names = {row['name'] for row in _snapshot(conn)['subjects']}
+    assert {'géographie', 'histoire locale'} <= names
+    assert not {'Géographie', 'GEOGRAPHIE  ', 'Histoire  Locale'} & names
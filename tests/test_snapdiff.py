@@ -0,0 +1,90 @@
+"""Snapshot diff: the spilling hash join and cross-format comparison (no database needed)."""
+import gzip
+import json
+import os
+
+import pytest
+
+from qbank.snapdiff import MAX_ROWS, canonical, diff_snapshots, hash_join
+
+OLD = [((i,), (f'q{i}', i % 3)) for i in range(500)]
+# 40 removed, every 7th changed, 25 added
+NEW = [((i,), (f'q{i}', i % 3 + (1 if i % 7 == 0 else 0))) for i in range(40, 500)] + [
+    ((i,), (f'q{i}', 0)) for i in range(500, 525)
+]
+
+
+def _join(old, new, workdir, max_rows=MAX_ROWS):
+    events = []
+    hash_join(old, new, lambda op, key, before, after: events.append((op, key, before, after)), str(workdir), max_rows)
+    return sorted(events)
+
+
+def _spilled(workdir):
+    return [name for _, _, files in os.walk(workdir) for name in files]
+
+
+def test_join_in_memory(tmp_path):
+    events = _join(OLD, NEW, tmp_path)
+    ops = [op for op, _, _, _ in events]
+    assert (ops.count('removed'), ops.count('added'), ops.count('changed')) == (40, 25, 66)
+    assert ops.count('same') == 460 - 66
+    assert ('changed', (42,), ('q42', 0), ('q42', 1)) in events
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('max_rows', [100, 10, 1])
+def test_spilled_join_matches_in_memory(tmp_path, max_rows):
+    expected = _join(OLD, NEW, tmp_path / 'memory')
+    spilled = _join(iter(OLD), iter(NEW), tmp_path, max_rows)
+    assert spilled == expected
+    # every spilled partition file is read back and removed
+    assert len(os.listdir(tmp_path)) >= 2
+    assert _spilled(tmp_path) == []
+
+
+def test_canonical():
+    assert canonical(True) == 't'
+    assert canonical(12) == '12'
+    assert canonical({'b': 1, 'a': [1, 2]}) == '{"a": [1, 2], "b": 1}'
+    assert canonical('2026-01-08 14:43:59+04') == '2026-01-08T10:43:59.000000+00:00'
+    assert canonical(None) is None
+
+
+def _export(directory, table, columns, rows):
+    os.makedirs(directory)
+    with gzip.open(directory / f'{table}.copy.gz', 'wt', encoding='utf-8', newline='\n') as f:
+        for row in rows:
+            f.write('\t'.join('\\N' if value is None else str(value) for value in row) + '\n')
+    with open(directory / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'tables': {table: {'file': f'{table}.copy.gz', 'columns': columns}}}, f)
+    return directory
+
+
+def _backup(directory, table, items):
+    os.makedirs(directory)
+    with open(directory / f'{table}.json', 'w', encoding='utf-8') as f:
+        json.dump(items, f)
+    return directory
+
+
+def test_json_backup_against_copy_export(tmp_path):
+    old = _backup(tmp_path / 'old', 'mcq_options', [
+        {'id': i, 'option_text': f'option {i}', 'is_correct': i % 4 == 1, 'created_at': '2026-01-08T10:00:00.000Z'}
+        for i in range(1, 61)
+    ])
+    new = _export(tmp_path / 'new', 'mcq_options', ['id', 'option_text', 'is_correct', 'created_at'], [
+        (i, 'option 2b' if i == 2 else f'option {i}', 't' if i % 4 == 1 else 'f', '2026-01-08 14:00:00+04')
+        for i in range(2, 62)
+    ])
+    records = []
+    # max_rows=5 takes the partitioned path even for this small table
+    results, only_old, only_new = diff_snapshots(str(old), str(new), max_rows=5, sink=records.append)
+
+    (result,) = results
+    assert (only_old, only_new) == ([], [])
+    assert result.counts == {'added': 1, 'removed': 1, 'changed': 1, 'same': 58}
+    assert sorted((r['op'], r['key']['id']) for r in records) == [('added', '61'), ('changed', '2'), ('removed', '1')]
+    (changed,) = [r for r in records if r['op'] == 'changed']
+    assert changed['changes'] == {'option_text': ['option 2', 'option 2b']}
+
@@ -0,0 +1,207 @@
+"""
+The offline snapshot backend and the SQLite integrity audit (no database needed).
+
+The fixture snapshot mixes all three layouts the loader reads: COPY files
+listed in manifest.json, <table>.json arrays and full_backup.sql.
+"""
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from qbank import snapshot
+from qbank.integrity import audit, integrity_sql
+from qbank.snapshot import (
+    SnapshotConnection, iter_copy_rows, iter_dump_rows, iter_json_array, normalize_timestamp, translate,
+)
+
+QUESTION_COLUMNS = ('id', 'subject_id', 'level_id', 'question_type_id', 'question_text', 'created_at')
+QUESTIONS = [
+    (1, 1, 1, 1, 'What is the capital of Mauritius?', '2026-01-08 14:43:59.5+04'),
+    (2, 1, 1, 1, 'Which port is in the south-east?', '2026-01-08 10:00:00+00'),
+    (3, 2, 1, 1, 'Tab\there, newline\nthere, back\\slash', None),
+    (4, 1, 1, 2, 'Mauritius became a republic in ____.', None),
+    (5, 2, 1, 3, 'Order the rivers by length', None),
+]
+OPTION_COLUMNS = ('id', 'question_id', 'option_order', 'option_text', 'is_correct')
+OPTIONS = [
+    (1, 1, 1, 'Port-Louis', 't'), (2, 1, 2, 'Curepipe', 'f'),
+    (3, 2, 1, 'Mahebourg', 'f'), (4, 2, 2, 'Souillac', 'f'),
+    (5, 3, 1, 'A', 't'), (6, 3, 3, '  ', 't'),
+    (7, 99, 1, 'orphan', 'f'),
+]
+
+DUMP = """\
+-- full_backup.sql
+INSERT INTO public.subjects (id, name) VALUES (1, 'from the dump') ON CONFLICT DO NOTHING;
+INSERT INTO fill_answers (id, question_id, answer_text, case_sensitive) VALUES
+    (1, 4, '   ', FALSE),
+    (2, 4, NULL, TRUE) ON CONFLICT DO NOTHING;
+INSERT INTO reorder_items (id, question_id, item_order, item_text, correct_position) VALUES
+    (1, 5, 1, 'Grand River South East; the longest', 1),
+    (2, 5, 2, 'Riviere du Rempart''s
+    lower course', 1::integer);
+"""
+
+
+def _copy_field(value):
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+def _write_copy(path, rows):
+    with gzip.open(path, 'wt', encoding='utf-8', newline='\n') as f:
+        for row in rows:
+            f.write('\t'.join(_copy_field(value) for value in row) + '\n')
+
+
+def _write_json(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f)
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    _write_copy(tmp_path / 'questions.copy.gz', QUESTIONS)
+    _write_copy(tmp_path / 'mcq_options.copy.gz', OPTIONS)
+    _write_json(tmp_path / 'manifest.json', {'version': 1, 'tables': {
+        'questions': {'file': 'questions.copy.gz', 'columns': QUESTION_COLUMNS},
+        'mcq_options': {'file': 'mcq_options.copy.gz', 'columns': OPTION_COLUMNS},
+    }})
+    _write_json(tmp_path / 'subjects.json', [{'id': 1, 'name': 'History'}, {'id': 2, 'name': 'Geography'}])
+    _write_json(tmp_path / 'levels.json', [{'id': 1, 'level_number': 1}])
+    _write_json(tmp_path / 'question_types.json', [
+        {'id': 1, 'name': 'mcq'}, {'id': 2, 'name': 'fill'}, {'id': 3, 'name': 'reorder'},
+    ])
+    (tmp_path / 'full_backup.sql').write_text(DUMP, encoding='utf-8')
+    return tmp_path
+
+
+@pytest.fixture
+def conn(snapshot_dir):
+    connection = SnapshotConnection(str(snapshot_dir))
+    yield connection
+    connection.close()
+
+
+def test_copy_rows_unescape(tmp_path):
+    path = tmp_path / 'rows.copy'
+    path.write_text('1\t\\N\ta\\tb\\nc\\\\d\n2\t\\101\\x42\t\n', encoding='utf-8')
+    assert list(iter_copy_rows(str(path))) == [('1', None, 'a\tb\nc\\d'), ('2', 'AB', '')]
+
+
+def test_dump_rows(tmp_path):
+    path = tmp_path / 'full_backup.sql'
+    path.write_text(DUMP, encoding='utf-8')
+    rows = list(iter_dump_rows(str(path)))
+    assert rows[0] == ('subjects', ('id', 'name'), (1, 'from the dump'))
+    assert [row for table, _, row in rows if table == 'fill_answers'] == [(1, 4, '   ', False), (2, 4, None, True)]
+    # quoted semicolons, doubled quotes, newlines inside strings and casts
+    assert [row for table, _, row in rows if table == 'reorder_items'] == [
+        (1, 5, 1, 'Grand River South East; the longest', 1),
+        (2, 5, 2, "Riviere du Rempart's\n    lower course", 1),
+    ]
+    assert [table for table, _, _ in iter_dump_rows(str(path), tables={'reorder_items'})] == ['reorder_items'] * 2
+
+
+def test_json_array_across_chunks(tmp_path):
+    items = [{'id': i, 'text': 'x' * i, 'tags': [i, None, True]} for i in range(40)]
+    path = tmp_path / 'items.json'
+    _write_json(path, items)
+    assert list(iter_json_array(str(path), chunk_size=7)) == items
+
+    path.write_text('[{"id": 1}, {"id"', encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(path), chunk_size=4))
+
+
+def test_normalize_timestamp():
+    assert normalize_timestamp('2026-01-08 14:43:59.5+04') == '2026-01-08T10:43:59.500000+00:00'
+    assert normalize_timestamp('2026-01-08T10:00:00Z') == '2026-01-08T10:00:00.000000+00:00'
+    assert normalize_timestamp(datetime(2026, 1, 8, 10)) == '2026-01-08T10:00:00.000000+00:00'
+    assert normalize_timestamp('') is None
+
+
+def test_translate():
+    sql, params = translate(
+        "SELECT id FROM questions WHERE id = ANY(%s::int[]) AND question_text ILIKE %s", ([1, 2], '%x%'),
+    )
+    assert sql == "SELECT id FROM questions WHERE id IN (SELECT value FROM json_each(?)) AND question_text LIKE ?"
+    assert params == ('[1, 2]', '%x%')
+
+    sql, _ = translate("SELECT 1 WHERE q.text ILIKE ANY(%s) AND a IS DISTINCT FROM b AND c LIKE 'x%%'", (['a%'],))
+    assert sql == (
+        "SELECT 1 WHERE EXISTS (SELECT 1 FROM json_each(?) WHERE q.text LIKE json_each.value) "
+        "AND a IS NOT b AND c LIKE 'x%'"
+    )
+    assert translate("SELECT btrim(name) FROM subjects") == ("SELECT trim(name) FROM subjects", ())
+
+
+def test_load_layouts(conn):
+    assert conn.counts['questions'] == 5
+    assert conn.counts['mcq_options'] == 7
+    assert conn.counts['fill_answers'] == 2
+    with conn.cursor() as cursor:
+        # subjects.json wins over the dump's INSERT
+        cursor.execute("SELECT name FROM subjects ORDER BY id")
+        assert cursor.fetchall() == [('History',), ('Geography',)]
+        cursor.execute("SELECT question_text, created_at FROM questions WHERE id = ANY(%s) ORDER BY id", ([1, 3],))
+        (_, created), (escaped, missing) = cursor.fetchall()
+    assert created == datetime(2026, 1, 8, 10, 43, 59, 500000, tzinfo=timezone.utc)
+    assert (escaped, missing) == ('Tab\there, newline\nthere, back\\slash', None)
+
+
+def test_booleans_and_read_only(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT is_correct FROM mcq_options WHERE question_id = %s ORDER BY id", (1,))
+        assert cursor.fetchall() == [(True,), (False,)]
+        with pytest.raises(RuntimeError, match='read-only'):
+            cursor.execute("UPDATE questions SET question_text = 'x'")
+        with pytest.raises(RuntimeError, match='COPY'):
+            cursor.copy_expert("COPY questions FROM STDIN", None)
+
+
+def test_connect_is_cached(snapshot_dir, monkeypatch):
+    monkeypatch.setattr(snapshot, '_snapshots', {})
+    first = snapshot.connect(str(snapshot_dir))
+    assert snapshot.connect(str(snapshot_dir)) is first
+    first.close()
+    second = snapshot.connect(str(snapshot_dir))
+    assert second is not first
+    second.close()
+
+
+def test_integrity_sql_dialects():
+    sqlite, postgresql = integrity_sql('sqlite'), integrity_sql()
+    assert 'json_group_array' in sqlite and 'json_agg' not in sqlite
+    assert 'json_agg' in postgresql and 'json_group_array' not in postgresql
+    with pytest.raises(KeyError):
+        integrity_sql('mysql')
+
+
+def test_audit_on_snapshot(conn):
+    report = audit(conn)
+    assert report.totals == {'mcq': 3, 'fill': 1, 'reorder': 1}
+    counts = {kind: n for kind, n in report.counts().items() if n}
+    assert counts == {
+        'zero_correct': 1, 'multiple_correct': 1, 'missing_fill_answer': 1, 'order_gap': 1,
+        'orphan_child': 1, 'empty_text': 1, 'invalid_reorder_positions': 1,
+    }
+
+    (zero,) = report.by_kind('zero_correct')
+    assert (zero.question_id, zero.qtype, zero.subject, zero.level) == (2, 'mcq', 'History', 1)
+    assert zero.detail['options'] == [
+        {'id': 3, 'order': 1, 'text': 'Mahebourg', 'correct': False},
+        {'id': 4, 'order': 2, 'text': 'Souillac', 'correct': False},
+    ]
+    (multiple,) = report.by_kind('multiple_correct')
+    assert (multiple.question_id, multiple.detail['correct']) == (3, 2)
+    assert report.by_kind('order_gap')[0].detail == {'table': 'mcq_options', 'orders': [1, 3]}
+    (orphan,) = report.by_kind('orphan_child')
+    assert (orphan.question_id, orphan.detail) == (
+        99, {'table': 'mcq_options', 'child_id': 7, 'question_type': None})
+    assert report.by_kind('empty_text')[0].detail == {'table': 'mcq_options', 'child_ids': [6]}
+    assert report.by_kind('missing_fill_answer')[0].detail == {'answers': ['   ', None]}
+    assert [item['position'] for item in report.by_kind('invalid_reorder_positions')[0].detail['items']] == [1, 1]
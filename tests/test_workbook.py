@@ -0,0 +1,139 @@
+"""Workbook parsing and the on-disk workbook cache (no database needed)."""
+import os
+
+import pytest
+
+from qbank import workbook_cache
+from qbank.workbook import McqRow, iter_sheet, load_workbook, record_to_tuple
+from qbank.workbook_cache import MAGIC, cache_path, load_cached, read_entry, write_entry
+
+openpyxl = pytest.importorskip('openpyxl')
+
+MCQ_HEADER = ('subject', 'level', 'type', 'question', 'optionA', 'optionB', 'optionC', 'optionD',
+              'correctAnswer', 'instruction', 'imageUrl', 'timer')
+
+
+def _save(path, sheets):
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+    return path
+
+
+def _workbook(tmp_path, question='What is the capital of Mauritius?'):
+    return _save(tmp_path / 'questions.xlsx', {
+        'MCQ': [
+            MCQ_HEADER,
+            ('History', 1, 'mcq', question, 'Port-Louis', 'Curepipe', 'Mahebourg', None, 'A', None, None, 30),
+            (None, None, None, None),
+            ('History', '2', 'mcq', '  When did the Dutch arrive?  ', 1598.0, 1638.0, 1715, 1810, 'B'),
+        ],
+        'Fill': [
+            ('question', 'answer', 'subject', 'level', 'type'),
+            ('Mauritius became a republic in ____.', 1992.0, 'History', 'one', 'fill'),
+        ],
+        'Matching': [
+            ('subject', 'level', 'type', 'question', 'leftItem1', 'rightItem1', 'leftItem2', 'rightItem2'),
+            ('Geography', 1, 'matching', 'Match the districts', 'Pamplemousses', 'North', None, None),
+        ],
+        'Notes': [('not', 'a', 'question', 'sheet')],
+    })
+
+
+def test_parse_sheets(tmp_path):
+    sheets = load_workbook(_workbook(tmp_path))
+    assert sorted(sheets) == ['Fill', 'MCQ', 'Matching', 'Reorder', 'TrueFalse']
+
+    first, second = sheets['MCQ']
+    assert (first.row, first.subject, first.level, first.options, first.correct_answer, first.timer) == (
+        2, 'History', 1, ('Port-Louis', 'Curepipe', 'Mahebourg', ''), 'A', '30')
+    # blank row 3 is skipped; integral floats lose their '.0' and text is stripped
+    assert (second.row, second.level, second.question) == (4, 2, 'When did the Dutch arrive?')
+    assert second.options == ('1598', '1638', '1715', '1810')
+    assert second.instruction == ''
+
+    (fill,) = sheets['Fill']
+    assert (fill.question, fill.answer, fill.level) == ('Mauritius became a republic in ____.', '1992', 'one')
+    (matching,) = sheets['Matching']
+    assert matching.pairs == (('Pamplemousses', 'North'),)
+
+
+def test_sheet_filter_and_empty_sheet(tmp_path):
+    path = _workbook(tmp_path)
+    assert list(load_workbook(path, sheets=['Fill'])) == ['Fill']
+
+    wb = openpyxl.Workbook()
+    assert list(iter_sheet(wb.active, McqRow)) == []
+
+
+def _tuples(sheets):
+    return {name: [record_to_tuple(record) for record in records] for name, records in sheets.items()}
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Count the workbook parses behind load_cached()."""
+    calls = []
+    original = workbook_cache.iter_workbook
+
+    def counting(path, *args, **kwargs):
+        calls.append(path)
+        return original(path, *args, **kwargs)
+
+    monkeypatch.setattr(workbook_cache, 'iter_workbook', counting)
+    return calls
+
+
+def test_cache_hit_and_touch(tmp_path, parses):
+    path, cache_dir = _workbook(tmp_path), tmp_path / 'cache'
+    parsed = load_cached(path, cache_dir=cache_dir)
+    assert _tuples(parsed) == _tuples(load_workbook(path))
+    assert len(parses) == 1
+
+    assert _tuples(load_cached(path, cache_dir=cache_dir)) == _tuples(parsed)
+    assert len(parses) == 1
+
+    # touched but unchanged: still a hit, and the new mtime is stored
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    assert _tuples(load_cached(path, cache_dir=cache_dir, sheets=['MCQ'])) == {'MCQ': _tuples(parsed)['MCQ']}
+    assert len(parses) == 1
+    assert read_entry(cache_path(path, cache_dir))['mtime_ns'] == os.stat(path).st_mtime_ns
+
+
+def test_cache_invalidated_by_edit(tmp_path, parses):
+    path, cache_dir = _workbook(tmp_path), tmp_path / 'cache'
+    load_cached(path, cache_dir=cache_dir)
+    stat = os.stat(path)
+
+    # a new mtime, whatever the filesystem's timestamp resolution
+    _workbook(tmp_path, question='What is the capital of Rodrigues?')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_cached(path, cache_dir=cache_dir)['MCQ'][0].question == 'What is the capital of Rodrigues?'
+    assert len(parses) == 2
+
+    load_cached(path, cache_dir=cache_dir, refresh=True)
+    assert len(parses) == 3
+
+
+def test_entry_format(tmp_path):
+    cache_file = str(tmp_path / 'cache' / 'entry.bin')
+    assert read_entry(cache_file) is None
+
+    write_entry(cache_file, {'version': 1, 'rows': [1, 2]})
+    assert read_entry(cache_file) == {'version': 1, 'rows': [1, 2]}
+    # another cache's signature or version is a miss, not a misread
+    assert read_entry(cache_file, magic=b'QBLG') is None
+    assert read_entry(cache_file, version=2) is None
+
+    write_entry(cache_file, {'version': 3}, magic=b'QBLG')
+    assert read_entry(cache_file, magic=b'QBLG', version=3) == {'version': 3}
+    assert read_entry(cache_file) is None
+
+    with open(cache_file, 'wb') as f:
+        f.write(MAGIC + b'\x00garbage')
+    assert read_entry(cache_file) is None